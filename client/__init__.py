@@ -1,5 +1,17 @@
-from .login_window import LoginWindow
-from .verification_window import VerificationWindow
-from .main_window import MainWindow
+import importlib
 
-__all__ = ['LoginWindow', 'VerificationWindow', 'MainWindow'] 
\ No newline at end of file
+# Окна импортируются при первом обращении: импорт пакета не тянет PyQt6 и requests
+_WINDOWS = {
+    'LoginWindow': '.login_window',
+    'VerificationWindow': '.verification_window',
+    'MainWindow': '.main_window',
+}
+
+__all__ = ['LoginWindow', 'VerificationWindow', 'MainWindow']
+
+
+def __getattr__(name):
+    module = _WINDOWS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module, __name__), name)
@@ -0,0 +1,158 @@
+import threading
+import time
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import client_config
+from .net_stats import NetworkStats, endpoint_name, get_network_stats
+
+
+class ApiClient:
+    """HTTP-клиент сервера склада поверх пула keep-alive соединений.
+
+    Все окна и диалоги ходят на сервер через один экземпляр (см.
+    get_api_client), поэтому TCP-соединения переиспользуются между
+    запросами вместо установки нового соединения на каждый вызов.
+    Каждый запрос учитывается в NetworkStats.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, timeout: Optional[float] = None,
+                 pool_size: Optional[int] = None):
+        self.base_url = (base_url or client_config.SERVER_URL).rstrip('/')
+        self.timeout = client_config.API_TIMEOUT if timeout is None else timeout
+        pool_size = pool_size or client_config.API_POOL_SIZE
+        self.stats = get_network_stats()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def url(self, path: str) -> str:
+        return f'{self.base_url}{path}'
+
+    def request(self, method: str, path: str, token: Optional[str] = None,
+                headers: Optional[dict] = None, **kwargs) -> requests.Response:
+        """Выполняет запрос к API.
+
+        path указывается относительно SERVER_URL ('/warehouses'). Если
+        передан token, добавляется заголовок Authorization.
+        """
+        headers = dict(headers or {})
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        kwargs.setdefault('timeout', self.timeout)
+        endpoint = endpoint_name(method, path)
+        gui_thread = threading.current_thread() is threading.main_thread()
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.url(path), headers=headers, **kwargs)
+        except requests.RequestException as e:
+            self.stats.observe_request(endpoint, time.perf_counter() - started, error=e,
+                                       gui_thread=gui_thread)
+            raise
+        elapsed = time.perf_counter() - started
+        body = response.request.body
+        sent = len(body) if isinstance(body, (bytes, str)) else 0
+        if kwargs.get('stream'):
+            # Тело потокового ответа читается позже: учитываем его при закрытии
+            received = 0
+            _count_on_close(response, self.stats, endpoint)
+        else:
+            received = len(response.content)
+        self.stats.observe_request(endpoint, elapsed, response.status_code, sent=sent,
+                                   received=received, gui_thread=gui_thread)
+        if 'If-None-Match' in headers:
+            self.stats.cache_lookup('http', response.status_code == 304)
+        return response
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+    @staticmethod
+    def json(response: requests.Response, default=None):
+        """Декодирует тело ответа, возвращая default для пустого или не-JSON тела."""
+        try:
+            return response.json()
+        except ValueError:
+            return default
+
+    @classmethod
+    def error_detail(cls, response: requests.Response, default: str) -> str:
+        """Возвращает сообщение об ошибке из поля detail ответа сервера."""
+        data = cls.json(response)
+        if isinstance(data, dict) and data.get('detail'):
+            return str(data['detail'])
+        return default
+
+    def close(self):
+        self.session.close()
+
+
+def _count_on_close(response: requests.Response, stats: NetworkStats, endpoint: str):
+    close = response.close
+    counted = False
+
+    def close_and_count():
+        nonlocal counted
+        if not counted and response.raw is not None:
+            counted = True
+            stats.add_received(endpoint, response.raw.tell())
+        close()
+
+    response.close = close_and_count
+
+
+def batch_results(response: requests.Response, size: int) -> Optional[List[dict]]:
+    """Результаты пачечного запроса (/batch) из ответа 200.
+
+    None, если ответ не похож на ответ пачкой: тело не JSON-объект или
+    список results не той длины, что отправленная пачка.
+    """
+    if response.status_code != 200:
+        return None
+    try:
+        results = response.json().get('results')
+    except (ValueError, AttributeError):
+        return None
+    if (not isinstance(results, list) or len(results) != size or
+            not all(isinstance(result, dict) for result in results)):
+        return None
+    return results
+
+
+def batch_unsupported(status: int) -> bool:
+    """Ответ на пачечный запрос, после которого пачки больше не отправляются.
+
+    Кроме 404/405 это любые 4xx, кроме 401 и повторяемых 408/429: сервер,
+    не принявший пачку, обычно примет те же строки по одной.
+    """
+    return status == 200 or (400 <= status < 500 and status not in (401, 408, 429))
+
+
+def network_error_message(error: Exception, context: str) -> str:
+    """Возвращает текст предупреждения для ошибки сетевого запроса."""
+    if isinstance(error, requests.exceptions.Timeout):
+        return 'Сервер не отвечает'
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return 'Не удалось подключиться к серверу'
+    return f'{context}: {error}'
+
+
+_api_client: Optional[ApiClient] = None
+_api_client_lock = threading.Lock()
+
+
+def get_api_client() -> ApiClient:
+    """Возвращает общий для процесса экземпляр ApiClient."""
+    global _api_client
+    if _api_client is None:
+        with _api_client_lock:
+            if _api_client is None:
+                _api_client = ApiClient()
+    return _api_client
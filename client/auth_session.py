@@ -0,0 +1,178 @@
+import base64
+import json
+import threading
+import time
+from typing import Optional
+
+import requests
+
+import client_config
+from .api_client import ApiClient, get_api_client
+from .net_stats import get_network_stats
+from .token_storage import TokenStorage, get_token_storage
+
+
+class SessionExpiredError(Exception):
+    """Сессия пользователя истекла и не может быть обновлена."""
+
+
+def jwt_expiry(token: str) -> Optional[float]:
+    """Возвращает время истечения токена из claim exp или None.
+
+    Подпись не проверяется: значение используется только для того,
+    чтобы заранее понять, когда токен пора обновлять.
+    """
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get('exp')
+        return float(exp) if exp is not None else None
+    except (IndexError, ValueError, AttributeError, TypeError):
+        return None
+
+
+def token_expiry(data: dict) -> Optional[float]:
+    """Определяет время истечения токена доступа по ответу сервера.
+
+    Используется время жизни из ответа (expires_in), а если его нет -
+    claim exp из самого токена.
+    """
+    expires_in = data.get('expires_in')
+    if expires_in is not None:
+        return time.time() + float(expires_in)
+    return jwt_expiry(data['access_token'])
+
+
+class AuthSession:
+    """Авторизованные запросы к API от имени пользователя.
+
+    Токен доступа прикладывается к запросу без предварительной проверки
+    через /test-auth. Срок его действия отслеживается локально: незадолго
+    до истечения токен обновляется заранее, а если сервер все же ответил
+    401, токен обновляется и запрос повторяется один раз.
+
+    Экземпляры создаются через SessionManager, чтобы на пользователя
+    приходилась одна сессия на весь процесс.
+    """
+
+    def __init__(self, email: str, token_storage: Optional[TokenStorage] = None,
+                 api: Optional[ApiClient] = None):
+        self.email = email
+        self.token_storage = token_storage or get_token_storage()
+        self.api = api or get_api_client()
+        self._refresh_lock = threading.Lock()
+        self._failed_token: Optional[str] = None
+
+    def _tokens(self) -> dict:
+        tokens = self.token_storage.get_tokens(self.email)
+        if not tokens:
+            raise SessionExpiredError('Токены не найдены')
+        return tokens
+
+    def _expires_soon(self, tokens: dict) -> bool:
+        expires_at = tokens.get('expires_at') or jwt_expiry(tokens['access_token'])
+        if expires_at is None:
+            return False
+        return time.time() >= expires_at - client_config.TOKEN_REFRESH_MARGIN
+
+    def access_token(self) -> str:
+        """Возвращает действующий токен доступа, при необходимости обновляя его."""
+        tokens = self._tokens()
+        if self._expires_soon(tokens):
+            return self.refresh(tokens['access_token'])
+        return tokens['access_token']
+
+    def refresh(self, stale_token: Optional[str] = None) -> str:
+        """Обновляет пару токенов через /refresh-token.
+
+        Одновременно выполняется не более одного обновления. Потоки,
+        ожидавшие его, получают уже обновленный токен: если токен
+        отличается от stale_token, повторный запрос не выполняется.
+        """
+        with self._refresh_lock:
+            tokens = self._tokens()
+            if stale_token is not None and tokens['access_token'] != stale_token:
+                return tokens['access_token']
+            if self._failed_token == tokens['access_token']:
+                raise SessionExpiredError('Сессия истекла')
+
+            response = self.api.post(
+                '/refresh-token',
+                json={'current_refresh_token': tokens['refresh_token']}
+            )
+            get_network_stats().count('token_refreshes',
+                                      result='ok' if response.status_code == 200 else 'failed')
+            if response.status_code != 200:
+                self._failed_token = tokens['access_token']
+                raise SessionExpiredError(self.api.error_detail(response, 'Сессия истекла'))
+            data = response.json()
+            self.token_storage.store_tokens(
+                self.email,
+                data['access_token'],
+                data['refresh_token'],
+                token_expiry(data)
+            )
+            return data['access_token']
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        token = self.access_token()
+        response = self.api.request(method, path, token=token, **kwargs)
+        if response.status_code == 401:
+            response.close()
+            get_network_stats().count('retries', reason='unauthorized')
+            response = self.api.request(method, path, token=self.refresh(token), **kwargs)
+        return response
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request('POST', path, **kwargs)
+
+
+class SessionManager:
+    """Общий для процесса реестр сессий пользователей.
+
+    Все окна и диалоги получают сессию через get_session, поэтому
+    используют одно хранилище токенов и одно обновление токена на
+    пользователя вместо собственных копий.
+    """
+
+    def __init__(self, token_storage: Optional[TokenStorage] = None,
+                 api: Optional[ApiClient] = None):
+        self.token_storage = token_storage or get_token_storage()
+        self.api = api or get_api_client()
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session(self, email: str) -> AuthSession:
+        with self._lock:
+            session = self._sessions.get(email)
+            if session is None:
+                session = AuthSession(email, self.token_storage, self.api)
+                self._sessions[email] = session
+            return session
+
+    def end_session(self, email: str):
+        """Удаляет сессию пользователя вместе с сохраненными токенами."""
+        with self._lock:
+            self._sessions.pop(email, None)
+        self.token_storage.clear_tokens(email)
+
+
+_session_manager: Optional[SessionManager] = None
+_session_manager_lock = threading.Lock()
+
+
+def get_session_manager() -> SessionManager:
+    """Возвращает общий для процесса экземпляр SessionManager."""
+    global _session_manager
+    if _session_manager is None:
+        with _session_manager_lock:
+            if _session_manager is None:
+                _session_manager = SessionManager()
+    return _session_manager
+
+
+def get_session(email: str) -> AuthSession:
+    return get_session_manager().session(email)
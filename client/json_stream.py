@@ -0,0 +1,84 @@
+import codecs
+import json
+from typing import Iterable, Iterator
+
+import requests
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_whitespace = json.decoder.WHITESPACE
+_delimiters = ",] \t\n\r"
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator:
+    """Разбирает JSON-массив по частям и возвращает его элементы по одному.
+
+    В памяти держится только еще не разобранный хвост текста, поэтому
+    большой ответ не нужно целиком загружать перед разбором.
+    """
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    started = False
+
+    def parse(buffer: str, final: bool):
+        nonlocal started
+        position = 0
+        while True:
+            position = _whitespace.match(buffer, position).end()
+            if position == len(buffer):
+                return position, False
+            char = buffer[position]
+            if not started:
+                if char != "[":
+                    raise ValueError("Ожидался JSON-массив")
+                started = True
+                position += 1
+            elif char == "]":
+                return position + 1, True
+            elif char == ",":
+                position += 1
+            else:
+                try:
+                    value, end = _decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    return position, False
+                # Число в конце буфера ("12", "1.") может продолжиться в следующей части
+                if not final and (end == len(buffer) or buffer[end] not in _delimiters):
+                    return position, False
+                values.append(value)
+                position = end
+
+    values = []
+    for chunk in chunks:
+        buffer += text_decoder.decode(chunk)
+        position, done = parse(buffer, False)
+        buffer = buffer[position:]
+        yield from values
+        values.clear()
+        if done:
+            return
+
+    buffer += text_decoder.decode(b"", final=True)
+    _, done = parse(buffer, True)
+    yield from values
+    if not done:
+        raise ValueError("Неполный JSON-массив")
+
+
+def iter_json_items(response: requests.Response,
+                    chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator:
+    """Возвращает элементы списка из потокового ответа (stream=True).
+
+    Понимает как обычный JSON-массив, так и NDJSON (по объекту в строке).
+    """
+    content_type = response.headers.get("Content-Type", "")
+    if NDJSON_CONTENT_TYPE in content_type:
+        for line in response.iter_lines(chunk_size=chunk_size):
+            if line.strip():
+                yield json.loads(line)
+    else:
+        yield from iter_json_array(response.iter_content(chunk_size=chunk_size))
@@ -0,0 +1,223 @@
+import codecs
+import json
+from itertools import takewhile
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import requests
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+import client_config
+from .auth_session import AuthSession, SessionExpiredError
+from .net_stats import get_network_stats
+from .workers import TaskGroup
+
+EVENT_STREAM_CONTENT_TYPE = "text/event-stream"
+# Ответы, по которым ясно, что сервер не поддерживает поток событий
+UNSUPPORTED_STATUSES = {404, 405, 406, 501}
+_CONNECTED = "connected"
+
+
+class ServerEvent(NamedTuple):
+    id: Optional[str]
+    type: str
+    data: dict
+
+
+def _iter_chunks(response: requests.Response) -> Iterator[bytes]:
+    # read1 отдает уже пришедшие байты, не дожидаясь заполнения буфера
+    read1 = getattr(response.raw, "read1", None)
+    if read1 is None:
+        yield from response.iter_content(chunk_size=None)
+        return
+    while True:
+        chunk = read1(64 * 1024)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_server_events(chunks: Iterable[bytes]) -> Iterator[ServerEvent]:
+    """Разбирает поток text/event-stream на события по мере поступления данных.
+
+    Комментарии (пинги сервера) пропускаются, события с телом не в
+    формате JSON-объекта игнорируются.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    event_id, event_type, data = None, "message", []
+    for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            line = line.rstrip("\r")
+            if not line:
+                if data:
+                    try:
+                        payload = json.loads("\n".join(data))
+                    except ValueError:
+                        payload = None
+                    if isinstance(payload, dict):
+                        yield ServerEvent(event_id, event_type, payload)
+                event_type, data = "message", []
+                continue
+            if line.startswith(":"):
+                continue
+            field, _, value = line.partition(":")
+            value = value[1:] if value.startswith(" ") else value
+            if field == "data":
+                data.append(value)
+            elif field == "event":
+                event_type = value
+            elif field == "id":
+                event_id = value
+
+
+class LiveUpdates(QObject):
+    """Подписка на изменения товаров открытого склада.
+
+    Сервер присылает события движений и созданных товаров потоком
+    /warehouses/{id}/events (Server-Sent Events). Товары из событий
+    копятся и передаются сигналом changed не чаще раза за LIVE_FRAME_MS,
+    поэтому всплеск событий дает одну перерисовку таблицы; из нескольких
+    событий одного товара остается последнее.
+
+    Пока поток не подключен, сигнал poll каждые LIVE_POLL_INTERVAL
+    секунд просит запросить изменения обычным дельта-запросом. Оборванный
+    поток переподключается с нарастающей паузой и продолжается с
+    последнего полученного события (Last-Event-ID); если сервер потока не
+    поддерживает, остается только опрос. connected сообщает о каждом
+    подключении: события, пришедшие до него, нужно забрать дельта-запросом.
+    """
+
+    changed = pyqtSignal(list, list)   # товары, ключи движений (Idempotency-Key) из событий
+    connected = pyqtSignal()
+    poll = pyqtSignal()
+
+    def __init__(self, session: AuthSession, warehouse_id: int, parent=None):
+        super().__init__(parent)
+        self.session = session
+        self.warehouse_id = warehouse_id
+        self.tasks = TaskGroup(self)
+        self.supported: Optional[bool] = None
+        self.is_connected = False
+        self.running = False
+        self.last_event_id: Optional[str] = None
+        self._retry_delay = 0
+        self._products: Dict[int, dict] = {}
+        self._movement_keys: List[str] = []
+
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.timeout.connect(self._emit_changes)
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self._connect)
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll)
+
+    @property
+    def path(self) -> str:
+        return f"/warehouses/{self.warehouse_id}/events"
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.poll_timer.start(int(client_config.LIVE_POLL_INTERVAL * 1000))
+        if self.supported is not False:
+            self._connect()
+
+    def stop(self):
+        # Поток отменяется сразу; его соединение закроется на ближайшем пинге сервера
+        self.running = False
+        self.is_connected = False
+        self.tasks.cancel_all()
+        self.retry_timer.stop()
+        self.poll_timer.stop()
+        self.frame_timer.stop()
+        self._products.clear()
+        self._movement_keys.clear()
+
+    # --- Поток событий ---
+
+    def _connect(self):
+        if not self.running:
+            return
+        last_event_id = self.last_event_id
+        self.tasks.run(
+            lambda task: self._listen(task, last_event_id),
+            self._stream_ended,
+            self._stream_failed,
+            self._stream_progress,
+            key="events",
+            dedicated=True
+        )
+
+    def _listen(self, task, last_event_id: Optional[str]) -> Optional[int]:
+        headers = {"Accept": EVENT_STREAM_CONTENT_TYPE, "Cache-Control": "no-cache"}
+        if last_event_id:
+            headers["Last-Event-ID"] = last_event_id
+        response = self.session.get(self.path, headers=headers, stream=True,
+                                    timeout=(client_config.API_TIMEOUT, client_config.LIVE_READ_TIMEOUT))
+        with response:
+            if (response.status_code != 200 or
+                    not response.headers.get("Content-Type", "").startswith(EVENT_STREAM_CONTENT_TYPE)):
+                return response.status_code
+            task.report(_CONNECTED)
+            # Отмена проверяется на каждой порции данных, включая пинги сервера
+            chunks = takewhile(lambda chunk: not task.cancelled, _iter_chunks(response))
+            for event in iter_server_events(chunks):
+                task.report(event)
+        return None
+
+    def _stream_progress(self, event):
+        if event == _CONNECTED:
+            self.supported = True
+            self.is_connected = True
+            self._retry_delay = 0
+            self.poll_timer.stop()
+            self.connected.emit()
+            return
+        if event.id:
+            self.last_event_id = event.id
+        product = event.data.get("product")
+        if isinstance(product, dict) and "id" in product:
+            # Из нескольких событий товара за кадр применяется последнее
+            self._products.pop(product["id"], None)
+            self._products[product["id"]] = product
+        key = (event.data.get("movement") or {}).get("idempotency_key")
+        if key:
+            self._movement_keys.append(key)
+        if not self.frame_timer.isActive():
+            self.frame_timer.start(client_config.LIVE_FRAME_MS)
+
+    def _emit_changes(self):
+        products, keys = list(self._products.values()), self._movement_keys
+        self._products, self._movement_keys = {}, []
+        if products or keys:
+            self.changed.emit(products, keys)
+
+    def _stream_ended(self, status: Optional[int]):
+        if status in UNSUPPORTED_STATUSES:
+            # Сервер без потока событий: остаемся на опросе
+            self.supported = False
+            self.is_connected = False
+            return
+        self._disconnected()
+
+    def _stream_failed(self, error):
+        if isinstance(error, SessionExpiredError):
+            self.stop()
+            return
+        self._disconnected()
+
+    def _disconnected(self):
+        self.is_connected = False
+        if not self.running:
+            return
+        if not self.poll_timer.isActive():
+            self.poll_timer.start(int(client_config.LIVE_POLL_INTERVAL * 1000))
+        get_network_stats().count("retries", reason="events")
+        self._retry_delay = min(max(self._retry_delay * 2, client_config.LIVE_RETRY_MIN),
+                                client_config.LIVE_RETRY_MAX)
+        self.retry_timer.start(int(self._retry_delay * 1000))
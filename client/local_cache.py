@@ -0,0 +1,270 @@
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterable, List, NamedTuple, Optional
+
+import client_config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS warehouses (
+    email TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (email, id)
+);
+CREATE TABLE IF NOT EXISTS product_types (
+    email TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    PRIMARY KEY (email, id)
+);
+CREATE TABLE IF NOT EXISTS product_lists (
+    email TEXT NOT NULL,
+    warehouse_id INTEGER NOT NULL,
+    etag TEXT,
+    cursor TEXT,
+    size INTEGER NOT NULL DEFAULT 0,
+    used_at REAL NOT NULL,
+    complete INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (email, warehouse_id)
+);
+CREATE TABLE IF NOT EXISTS products (
+    email TEXT NOT NULL,
+    warehouse_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    product_type_id INTEGER,
+    category TEXT,
+    name TEXT NOT NULL,
+    current_quantity INTEGER NOT NULL,
+    updated_at TEXT,
+    UNIQUE (email, warehouse_id, id)
+);
+CREATE TABLE IF NOT EXISTS staged_products (
+    email TEXT NOT NULL,
+    warehouse_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    product_type_id INTEGER,
+    category TEXT,
+    name TEXT NOT NULL,
+    current_quantity INTEGER NOT NULL,
+    updated_at TEXT,
+    UNIQUE (email, warehouse_id, id)
+);
+"""
+
+_PRODUCT_COLUMNS = ("id", "product_type_id", "category", "name", "current_quantity", "updated_at")
+
+
+class CachedProducts(NamedTuple):
+    products: List[dict]
+    etag: Optional[str]
+    cursor: Optional[str]
+
+
+class LocalCache:
+    """Локальный кэш данных сервера в SQLite, разделенный по email пользователя.
+
+    Окна сначала показывают сохраненные данные, а затем сверяют их с
+    сервером в фоне. Товары хранятся списками по складам вместе с ETag
+    и курсором ProductSync; при превышении лимитов удаляются списки
+    складов, которые открывались давнее всего.
+
+    Кэш не должен мешать работе клиента: ошибки SQLite не пробрасываются,
+    чтение в этом случае возвращает None, а запись пропускается. Все
+    методы можно вызывать из фоновых потоков.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_products: Optional[int] = None,
+                 max_warehouses: Optional[int] = None):
+        self.path = path or client_config.CACHE_FILE
+        self.max_products = max_products or client_config.CACHE_MAX_PRODUCTS
+        self.max_warehouses = max_warehouses or client_config.CACHE_MAX_WAREHOUSES
+        self._lock = threading.Lock()
+        try:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+        except sqlite3.Error:
+            self._db = None
+
+    def _execute(self, fn: Callable[[sqlite3.Connection], object], default=None):
+        """Выполняет fn(db) в одной транзакции."""
+        if self._db is None:
+            return default
+        with self._lock:
+            try:
+                with self._db:
+                    return fn(self._db)
+            except sqlite3.Error:
+                return default
+
+    # --- Склады и категории ---
+
+    def warehouses(self, email: str) -> Optional[List[dict]]:
+        rows = self._execute(lambda db: db.execute(
+            "SELECT id, name FROM warehouses WHERE email = ? ORDER BY rowid", (email,)).fetchall())
+        if not rows:
+            return None
+        return [{"id": id, "name": name} for id, name in rows]
+
+    def store_warehouses(self, email: str, warehouses: List[dict]):
+        def store(db):
+            db.execute("DELETE FROM warehouses WHERE email = ?", (email,))
+            db.executemany("INSERT OR REPLACE INTO warehouses (email, id, name) VALUES (?, ?, ?)",
+                           [(email, w["id"], w["name"]) for w in warehouses])
+            # Списки товаров удаленных складов больше не нужны
+            ids = {w["id"] for w in warehouses}
+            for (warehouse_id,) in db.execute(
+                    "SELECT warehouse_id FROM product_lists WHERE email = ?", (email,)).fetchall():
+                if warehouse_id not in ids:
+                    self._drop_products(db, email, warehouse_id)
+        self._execute(store)
+
+    def product_types(self, email: str) -> Optional[List[dict]]:
+        rows = self._execute(lambda db: db.execute(
+            "SELECT id, category FROM product_types WHERE email = ? ORDER BY rowid",
+            (email,)).fetchall())
+        if not rows:
+            return None
+        return [{"id": id, "category": category} for id, category in rows]
+
+    def store_product_types(self, email: str, product_types: List[dict]):
+        def store(db):
+            db.execute("DELETE FROM product_types WHERE email = ?", (email,))
+            db.executemany(
+                "INSERT OR REPLACE INTO product_types (email, id, category) VALUES (?, ?, ?)",
+                [(email, t["id"], t["category"]) for t in product_types])
+        self._execute(store)
+
+    # --- Товары ---
+
+    def products(self, email: str, warehouse_id: int) -> Optional[CachedProducts]:
+        """Возвращает сохраненный список товаров склада, если он загружен полностью."""
+        def load(db):
+            meta = db.execute(
+                "SELECT etag, cursor FROM product_lists"
+                " WHERE email = ? AND warehouse_id = ? AND complete = 1",
+                (email, warehouse_id)).fetchone()
+            if meta is None:
+                return None
+            db.execute("UPDATE product_lists SET used_at = ? WHERE email = ? AND warehouse_id = ?",
+                       (time.time(), email, warehouse_id))
+            rows = db.execute(
+                f"SELECT {', '.join(_PRODUCT_COLUMNS)} FROM products"
+                " WHERE email = ? AND warehouse_id = ? ORDER BY rowid",
+                (email, warehouse_id)).fetchall()
+            products = [dict(zip(_PRODUCT_COLUMNS, row)) for row in rows]
+            return CachedProducts(products, meta[0], meta[1])
+        return self._execute(load)
+
+    def begin_products(self, email: str, warehouse_id: int):
+        """Начинает запись полного списка товаров склада.
+
+        Товары пишутся в staged_products и заменяют сохраненный список
+        только в finish_products(), поэтому прерванная загрузка не
+        оставляет в кэше половину склада и не стирает прежний список.
+        """
+        def begin(db):
+            db.execute("DELETE FROM staged_products WHERE email = ? AND warehouse_id = ?",
+                       (email, warehouse_id))
+            db.execute(
+                "INSERT OR IGNORE INTO product_lists (email, warehouse_id, used_at, complete)"
+                " VALUES (?, ?, ?, 0)", (email, warehouse_id, time.time()))
+        self._execute(begin)
+
+    def append_products(self, email: str, warehouse_id: int, products: Iterable[dict]):
+        self._execute(lambda db: self._upsert(db, email, warehouse_id, products, "staged_products"))
+
+    def finish_products(self, email: str, warehouse_id: int, etag: Optional[str],
+                        cursor: Optional[str]):
+        def finish(db):
+            columns = ", ".join(_PRODUCT_COLUMNS)
+            db.execute("DELETE FROM products WHERE email = ? AND warehouse_id = ?",
+                       (email, warehouse_id))
+            db.execute(f"INSERT INTO products (email, warehouse_id, {columns})"
+                       f" SELECT email, warehouse_id, {columns} FROM staged_products"
+                       " WHERE email = ? AND warehouse_id = ? ORDER BY rowid",
+                       (email, warehouse_id))
+            db.execute("DELETE FROM staged_products WHERE email = ? AND warehouse_id = ?",
+                       (email, warehouse_id))
+            db.execute("UPDATE product_lists SET complete = 1 WHERE email = ? AND warehouse_id = ?",
+                       (email, warehouse_id))
+            self._update_list(db, email, warehouse_id, etag, cursor)
+        self._execute(finish)
+
+    def update_products(self, email: str, warehouse_id: int, products: Iterable[dict],
+                        etag: Optional[str], cursor: Optional[str]):
+        """Применяет к сохраненному списку изменения, полученные с сервера."""
+        def update(db):
+            if db.execute("SELECT 1 FROM product_lists"
+                          " WHERE email = ? AND warehouse_id = ? AND complete = 1",
+                          (email, warehouse_id)).fetchone() is None:
+                return
+            self._upsert(db, email, warehouse_id, products)
+            self._update_list(db, email, warehouse_id, etag, cursor)
+        self._execute(update)
+
+    @staticmethod
+    def _upsert(db, email: str, warehouse_id: int, products: Iterable[dict], table: str = "products"):
+        db.executemany(
+            f"INSERT INTO {table} (email, warehouse_id, {', '.join(_PRODUCT_COLUMNS)})"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (email, warehouse_id, id) DO UPDATE SET"
+            " product_type_id = excluded.product_type_id, category = excluded.category,"
+            " name = excluded.name, current_quantity = excluded.current_quantity,"
+            " updated_at = excluded.updated_at",
+            [(email, warehouse_id) + tuple(p.get(column) for column in _PRODUCT_COLUMNS)
+             for p in products])
+
+    def _update_list(self, db, email: str, warehouse_id: int, etag: Optional[str],
+                     cursor: Optional[str]):
+        size = db.execute("SELECT COUNT(*) FROM products WHERE email = ? AND warehouse_id = ?",
+                          (email, warehouse_id)).fetchone()[0]
+        db.execute("UPDATE product_lists SET etag = ?, cursor = ?, size = ?, used_at = ?"
+                   " WHERE email = ? AND warehouse_id = ?",
+                   (etag, cursor, size, time.time(), email, warehouse_id))
+        self._evict(db, keep=(email, warehouse_id))
+
+    @staticmethod
+    def _drop_products(db, email: str, warehouse_id: int):
+        db.execute("DELETE FROM products WHERE email = ? AND warehouse_id = ?",
+                   (email, warehouse_id))
+        db.execute("DELETE FROM staged_products WHERE email = ? AND warehouse_id = ?",
+                   (email, warehouse_id))
+        db.execute("DELETE FROM product_lists WHERE email = ? AND warehouse_id = ?",
+                   (email, warehouse_id))
+
+    def _evict(self, db, keep):
+        """Удаляет давно открывавшиеся склады, пока кэш не уложится в лимиты."""
+        lists = db.execute(
+            "SELECT email, warehouse_id, size FROM product_lists ORDER BY used_at DESC").fetchall()
+        total, count = 0, 0
+        for email, warehouse_id, size in lists:
+            total += size
+            count += 1
+            if (email, warehouse_id) != keep and (
+                    total > self.max_products or count > self.max_warehouses):
+                self._drop_products(db, email, warehouse_id)
+                total -= size
+                count -= 1
+
+    def close(self):
+        if self._db is not None:
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+
+_local_cache: Optional[LocalCache] = None
+_local_cache_lock = threading.Lock()
+
+
+def get_local_cache() -> LocalCache:
+    """Возвращает общий для процесса экземпляр LocalCache."""
+    global _local_cache
+    if _local_cache is None:
+        with _local_cache_lock:
+            if _local_cache is None:
+                _local_cache = LocalCache()
+    return _local_cache
@@ -1,52 +1,92 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, 
                             QLabel, QPushButton, QLineEdit, QMessageBox)
-from PyQt6.QtCore import Qt
-import requests
+from PyQt6.QtCore import Qt, QTimer
 import hashlib
+import time
 import client_config as client_config
-from client.token_storage import TokenStorage
+from client.startup import get_startup_profile
+from client.token_storage import get_token_storage
+from client.workers import TaskGroup
 
 class LoginWindow(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.token_storage = TokenStorage()
+        self.token_storage = get_token_storage()
+        self.tasks = TaskGroup(self)
+        self.session_checks = {}
+        # Общий срок проверки сохраненных сессий
+        self.session_deadline = QTimer(self)
+        self.session_deadline.setSingleShot(True)
+        self.session_deadline.timeout.connect(self.stop_session_checks)
         self.initUI()
 
-    def check_saved_session(self) -> bool:
-        # Проверяем все сохраненные сессии
-        all_tokens = self.token_storage.get_all_tokens()
-        for email, tokens in all_tokens.items():
-            try:
-                # Пробуем сделать тестовый запрос с токеном
-                headers = {'Authorization': f'Bearer {tokens["access_token"]}'}
-                response = requests.get(
-                    f'{client_config.SERVER_URL}/test-auth',
-                    headers=headers
-                )
-                
-                if response.status_code == 200:
-                    print(f"Сессия активна для {email}")
-                    self.open_main_window(email)
-                    return True
-                    
-                # Если токен истек, пробуем обновить через refresh token
-                response = requests.post(
-                    f'{client_config.SERVER_URL}/refresh-token',
-                    json={'current_refresh_token': tokens['refresh_token']}
-                )
-                if response.status_code == 200:
-                    data = response.json()
-                    self.token_storage.store_tokens(
-                        email,
-                        data['access_token'],
-                        data['refresh_token']
-                    )
-                    self.open_main_window(email)
-                    return True
-            except Exception as e:
-                print(f"Ошибка проверки сессии: {e}")
-                self.token_storage.clear_tokens(email)
-        return False
+    @property
+    def api(self):
+        # requests импортируется при первом запросе, а не при создании окна
+        from .api_client import get_api_client
+        return get_api_client()
+
+    def check_saved_session(self):
+        """Проверяет сохраненные сессии параллельно, не блокируя форму входа.
+
+        Каждая учетная запись проверяется отдельной фоновой задачей, все
+        вместе ограничены общим сроком SESSION_CHECK_DEADLINE. Для первой
+        действующей сессии сразу открывается главное окно, остальные
+        проверки отменяются.
+        """
+        emails = self.token_storage.emails()
+        if not emails:
+            get_startup_profile().finish()
+            return
+        self.status_label.setText("Проверка сохраненных сессий...")
+        deadline = time.monotonic() + client_config.SESSION_CHECK_DEADLINE
+        self.session_checks = {}
+        for email in emails:
+            self.session_checks[email] = f"session:{email}"
+            self.tasks.run(
+                lambda task, email=email: self.validate_session(email, deadline),
+                lambda result, email=email: self.saved_session_checked(result, email),
+                lambda error, email=email: self.saved_session_checked(None, email),
+                key=self.session_checks[email]
+            )
+        self.session_deadline.start(int(client_config.SESSION_CHECK_DEADLINE * 1000))
+
+    def validate_session(self, email, deadline):
+        """Возвращает email, если сессия действует (выполняется в фоне)"""
+        from .auth_session import SessionExpiredError, get_session
+        timeout = max(deadline - time.monotonic(), 0.1)
+        try:
+            # Токен обновляется автоматически, если он истек
+            response = get_session(email).get('/test-auth', timeout=timeout)
+        except SessionExpiredError:
+            self.token_storage.clear_tokens(email)
+            return None
+        if response.status_code == 200:
+            return email
+        if response.status_code == 401:
+            self.token_storage.clear_tokens(email)
+        return None
+
+    def saved_session_checked(self, active_email, checked_email):
+        if active_email:
+            self.open_main_window(active_email)
+            self.stop_session_checks()
+            return
+        # Сетевые ошибки не удаляют сессию: она будет проверена при следующем запуске
+        self.session_checks.pop(checked_email, None)
+        if not self.session_checks:
+            self.stop_session_checks()
+
+    def stop_session_checks(self):
+        """Отменяет незавершенные проверки сессий"""
+        self.session_deadline.stop()
+        for key in self.session_checks.values():
+            self.tasks.cancel(key)
+        self.session_checks = {}
+        self.status_label.setText("")
+        # Ни одна сохраненная сессия не открылась: запуск закончен на окне входа
+        if not self.isHidden():
+            get_startup_profile().finish()
 
     def initUI(self):
         self.setWindowTitle('Вход в систему')
@@ -74,66 +114,92 @@ class LoginWindow(QMainWindow):
         layout.addWidget(self.password_input)
 
         # Кнопки
-        login_button = QPushButton("Войти")
-        login_button.clicked.connect(self.login)
-        layout.addWidget(login_button)
+        self.login_button = QPushButton("Войти")
+        self.login_button.clicked.connect(self.login)
+        layout.addWidget(self.login_button)
+
+        self.register_button = QPushButton("Зарегистрироваться")
+        self.register_button.clicked.connect(self.register)
+        layout.addWidget(self.register_button)
 
-        register_button = QPushButton("Зарегистрироваться")
-        register_button.clicked.connect(self.register)
-        layout.addWidget(register_button)
+        # Состояние фоновых операций
+        self.status_label = QLabel()
+        self.status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.status_label)
+
+    def set_busy(self, busy: bool, message: str = ""):
+        """Блокирует форму на время запроса к серверу"""
+        for widget in (self.email_input, self.password_input,
+                       self.login_button, self.register_button):
+            widget.setEnabled(not busy)
+        self.status_label.setText(message if busy else "")
+
+    def connection_failed(self, error):
+        self.set_busy(False)
+        QMessageBox.warning(self, 'Ошибка', 'Ошибка подключения к серверу')
 
     def hash_password(self, password: str) -> str:
         salted = password + client_config.HASH_SALT
         return hashlib.sha256(salted.encode()).hexdigest()
 
     def login(self):
+        # Пользователь входит сам: найденная позже сохраненная сессия не нужна
+        self.stop_session_checks()
         email = self.email_input.text()
         password = self.hash_password(self.password_input.text())
 
-        try:
-            response = requests.post(f'{client_config.SERVER_URL}/login',
-                                   json={'email': email, 'password': password})
-            
-            if response.status_code == 200:
-                data = response.json()
-                print(data.get("message"))
-                if data.get("message") == "Код для входа отправлен на ваш email":
-                    print(f"Успешный вход для пользователя {email}")
-                    # Импортируем здесь для избежания циклического импорта
-                    from .verification_window import VerificationWindow
-                    self.verification_window = VerificationWindow(email)
-                    self.verification_window.show()
-                    self.hide()
-                else:
-                    print(f"Ошибка входа для пользователя {email}")
-                    QMessageBox.warning(self, 'Ошибка', 'Неверные данные для входа')
+        self.set_busy(True, "Вход...")
+        self.tasks.run(
+            lambda task: self.api.post('/login',
+                                       json={'email': email, 'password': password}),
+            lambda response: self.login_finished(email, response),
+            self.connection_failed
+        )
+
+    def login_finished(self, email, response):
+        self.set_busy(False)
+        if response.status_code == 200:
+            data = self.api.json(response, {})
+            if data.get("message") == "Код для входа отправлен на ваш email":
+                # Импортируем здесь для избежания циклического импорта
+                from .verification_window import VerificationWindow
+                self.verification_window = VerificationWindow(email)
+                self.verification_window.show()
+                self.hide()
             else:
-                error_data = response.json()
-                error_message = error_data.get("detail", "Неизвестная ошибка")
-                QMessageBox.warning(self, 'Ошибка', error_message)
-        except:
-            QMessageBox.warning(self, 'Ошибка', 'Ошибка подключения к серверу')
+                QMessageBox.warning(self, 'Ошибка', 'Неверные данные для входа')
+        else:
+            error_message = self.api.error_detail(response, "Неизвестная ошибка")
+            QMessageBox.warning(self, 'Ошибка', error_message)
 
     def register(self):
+        self.stop_session_checks()
         email = self.email_input.text()
         password = self.hash_password(self.password_input.text())
 
-        try:
-            response = requests.post(f'{client_config.SERVER_URL}/register',
-                                   json={'email': email, 'password': password})
-            
-            if response.status_code == 200:
-                QMessageBox.information(self, 'Успех', 'Регистрация успешна')
-            else:
-                error_data = response.json()
-                error_message = error_data.get("detail", "Ошибка при регистрации")
-                QMessageBox.warning(self, 'Ошибка', error_message)
-        except:
-            QMessageBox.warning(self, 'Ошибка', 'Ошибка подключения к серверу')
+        self.set_busy(True, "Регистрация...")
+        self.tasks.run(
+            lambda task: self.api.post('/register',
+                                       json={'email': email, 'password': password}),
+            self.register_finished,
+            self.connection_failed
+        )
+
+    def register_finished(self, response):
+        self.set_busy(False)
+        if response.status_code == 200:
+            QMessageBox.information(self, 'Успех', 'Регистрация успешна')
+        else:
+            error_message = self.api.error_detail(response, "Ошибка при регистрации")
+            QMessageBox.warning(self, 'Ошибка', error_message)
 
     def open_main_window(self, email):
+        profile = get_startup_profile()
         # Импортируем здесь для избежания циклического импорта
-        from .main_window import MainWindow
+        with profile.phase("импорт главного окна"):
+            from .main_window import MainWindow
         self.main_window = MainWindow(email)
+        profile.mark("создание главного окна")
+        profile.watch_first_paint(self.main_window, "первая отрисовка главного окна", finish=True)
         self.main_window.show()
         self.hide() 
\ No newline at end of file
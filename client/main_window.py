@@ -1,20 +1,42 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-                            QLabel, QPushButton, QLineEdit, QMessageBox, QListWidget,
-                            QInputDialog, QStackedWidget)
+                            QLabel, QPushButton, QLineEdit, QMessageBox, QListView,
+                            QInputDialog, QStackedWidget, QAbstractItemView)
 from PyQt6.QtCore import Qt
-import requests
-import client_config as client_config
-from client.token_storage import TokenStorage
+from PyQt6.QtGui import QKeySequence, QShortcut
+from collections import OrderedDict
+import time
+import client_config
+from client.api_client import network_error_message
+from client.auth_session import SessionExpiredError, get_session, get_session_manager
+from client.local_cache import get_local_cache
+from client.movement_outbox import get_movement_outbox, stop_movement_outbox
+from client.net_stats import get_network_stats, watch_gui_thread
+from client.network_overlay import NetworkOverlay
+from client.product_prefetch import ProductPrefetcher
+from client.workers import TaskGroup, run_detached
+from .warehouse_model import WarehouseListModel
 from .warehouse_view import WarehouseView
-from typing import Optional
 
 class MainWindow(QMainWindow):
     def __init__(self, email):
         super().__init__()
         self.email = email
-        self.token_storage = TokenStorage()
+        self.session = get_session(email)
+        self.cache = get_local_cache()
+        self.tasks = TaskGroup(self)
+        self.warehouses = WarehouseListModel(self)
+        self.warehouses_updated_at = None  # когда список складов последний раз сверялся с сервером
+        self.prefetcher = ProductPrefetcher(self.session, self.cache, self)
+        # Открытые склады в порядке последнего показа, давно не показанные первыми
+        self.warehouse_views = OrderedDict()
         self.initUI()
         self.load_warehouses()
+        # Отправляем движения, оставшиеся в очереди с прошлого запуска
+        self.outbox = get_movement_outbox(email)
+        self.outbox.rejected.connect(self.movement_rejected)
+        self.outbox.delivered.connect(self.prefetcher.invalidate)
+        self.outbox.flush()
+        watch_gui_thread()
 
     def initUI(self):
         self.setWindowTitle('Система управления складом')
@@ -36,10 +58,18 @@ class MainWindow(QMainWindow):
         warehouses_label.setStyleSheet("font-size: 16px; font-weight: bold; margin: 10px;")
         left_layout.addWidget(warehouses_label)
 
-        self.warehouses_list = QListWidget()
-        self.warehouses_list.itemClicked.connect(self.warehouse_selected)
+        self.warehouses_list = QListView()
+        self.warehouses_list.setModel(self.warehouses)
+        self.warehouses_list.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.warehouses_list.clicked.connect(self.warehouse_selected)
+        # Склад под курсором прогревается заранее
+        self.warehouses_list.setMouseTracking(True)
+        self.warehouses_list.entered.connect(self.warehouse_hovered)
         left_layout.addWidget(self.warehouses_list)
 
+        self.status_label = QLabel()
+        left_layout.addWidget(self.status_label)
+
         add_warehouse_button = QPushButton("+ Добавить склад")
         add_warehouse_button.clicked.connect(self.add_warehouse)
         left_layout.addWidget(add_warehouse_button)
@@ -73,167 +103,223 @@ class MainWindow(QMainWindow):
         # Добавляем главный экран в стек
         self.stacked_widget.addWidget(self.main_screen)
 
-    def get_auth_headers(self):
-        """Получает заголовки авторизации с автоматическим обновлением токена"""
-        tokens = self.token_storage.get_tokens(self.email)
-        if not tokens:
-            QMessageBox.warning(self, 'Ошибка', 'Токены не найдены')
-            return None
+        # Метрики сети поверх любого экрана, F12 - показать или скрыть
+        self.network_overlay = NetworkOverlay(self)
+        QShortcut(QKeySequence(Qt.Key.Key_F12), self, self.toggle_network_overlay)
+        if client_config.NET_OVERLAY:
+            self.network_overlay.show()
 
-        headers = {'Authorization': f'Bearer {tokens["access_token"]}'}
-        
-        # Пробуем сделать тестовый запрос
-        try:
-            response = requests.get(
-                f'{client_config.SERVER_URL}/test-auth',
-                headers=headers
-            )
-            if response.status_code == 200:
-                return headers
-            
-            # Если токен истек, пробуем обновить
-            response = requests.post(
-                f'{client_config.SERVER_URL}/refresh-token',
-                json={'current_refresh_token': tokens['refresh_token']}
-            )
-            if response.status_code == 200:
-                data = response.json()
-                self.token_storage.store_tokens(
-                    self.email,
-                    data['access_token'],
-                    data['refresh_token']
-                )
-                return {'Authorization': f'Bearer {data["access_token"]}'}
-            else:
-                QMessageBox.warning(self, 'Ошибка', 'Сессия истекла')
-                self.logout()
-                return None
-        except Exception as e:
-            QMessageBox.warning(self, 'Ошибка', f'Ошибка проверки сессии: {str(e)}')
-            return None
+    def session_expired(self):
+        """Сообщает об истечении сессии и возвращает к окну входа"""
+        QMessageBox.warning(self, 'Ошибка', 'Сессия истекла')
+        self.logout()
+
+    def request_failed(self, error, context):
+        """Обрабатывает ошибку фонового запроса"""
+        self.set_loading(False)
+        if isinstance(error, SessionExpiredError):
+            self.session_expired()
+        else:
+            QMessageBox.warning(self, 'Ошибка', network_error_message(error, context))
+
+    def toggle_network_overlay(self):
+        self.network_overlay.toggle()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.network_overlay.reposition()
+
+    def set_loading(self, loading: bool, message: str = ''):
+        """Показывает состояние загрузки списка складов"""
+        self.warehouses_list.setEnabled(not loading)
+        self.status_label.setText(message if loading else '')
 
     def load_warehouses(self):
-        """Загружает список складов с сервера"""
-        headers = self.get_auth_headers()
-        if not headers:
-            return
+        """Показывает склады из локального кэша и обновляет их с сервера"""
+        cached = self.cache.warehouses(self.email)
+        if cached is not None:
+            self.show_warehouses(cached)
+            self.status_label.setText('Обновление...')
+        else:
+            self.set_loading(True, 'Загрузка складов...')
+        self.refresh_warehouses()
 
-        try:
-            response = requests.get(
-                f'{client_config.SERVER_URL}/warehouses',
-                headers=headers
-            )
-            
-            if response.status_code == 200:
-                warehouses = response.json()
-                self.warehouses_list.clear()
-                for warehouse in warehouses:
-                    self.warehouses_list.addItem(warehouse['name'])
-            else:
-                QMessageBox.warning(self, 'Ошибка', 'Не удалось загрузить список складов')
-        except Exception as e:
-            QMessageBox.warning(self, 'Ошибка', f'Ошибка загрузки складов: {str(e)}')
+    def refresh_warehouses(self):
+        """Сверяет список складов с сервером в фоне"""
+        self.tasks.run(
+            self.fetch_warehouses,
+            self.warehouses_loaded,
+            lambda error: self.request_failed(error, 'Ошибка загрузки складов'),
+            key='warehouses'
+        )
+
+    def fetch_warehouses(self, task):
+        """Загружает и разбирает список складов в фоне; None, если сервер его не отдал"""
+        response = self.session.get('/warehouses')
+        if response.status_code != 200:
+            return None
+        warehouses = response.json()
+        self.cache.store_warehouses(self.email, warehouses)
+        return warehouses
+
+    def warehouses_loaded(self, warehouses):
+        self.set_loading(False)
+        if warehouses is not None:
+            self.warehouses_updated_at = time.monotonic()
+            self.show_warehouses(warehouses)
+        else:
+            QMessageBox.warning(self, 'Ошибка', 'Не удалось загрузить список складов')
+
+    def show_warehouses(self, warehouses):
+        self.warehouses.set_warehouses(warehouses)
+        for warehouse_id in list(self.warehouse_views):
+            if self.warehouses.row_for_id(warehouse_id) is None:
+                self.close_warehouse_view(warehouse_id)
+        self.prefetcher.set_candidates([warehouse['id'] for warehouse in warehouses])
+
+    def warehouse_hovered(self, index):
+        self.prefetcher.hovered(index.data(Qt.ItemDataRole.UserRole))
+
+    def warehouse_unavailable(self, warehouse_id):
+        """Склад удален или недоступен: его вид закрывается, а список складов устарел"""
+        self.warehouses_updated_at = None
+        self.close_warehouse_view(warehouse_id)
+
+    def warehouses_stale(self) -> bool:
+        return (self.warehouses_updated_at is None or
+                time.monotonic() - self.warehouses_updated_at > client_config.WAREHOUSES_MAX_AGE)
+
+    def movement_rejected(self, warehouse_id, detail):
+        QMessageBox.warning(self, 'Ошибка', f'Сервер отклонил движение товара: {detail}')
 
     def add_warehouse(self):
         """Добавляет новый склад"""
         name, ok = QInputDialog.getText(self, 'Новый склад', 'Введите название склада:')
         
         if ok and name:
-            headers = self.get_auth_headers()
-            if not headers:
-                return
-
-            try:
-                response = requests.post(
-                    f'{client_config.SERVER_URL}/warehouses',
-                    headers=headers,
-                    json={'name': name}
-                )
-                
-                if response.status_code == 200:
-                    QMessageBox.information(self, 'Успех', 'Склад успешно создан')
-                    self.load_warehouses()
-                else:
-                    QMessageBox.warning(self, 'Ошибка', 'Не удалось создать склад')
-            except Exception as e:
-                QMessageBox.warning(self, 'Ошибка', f'Ошибка создания склада: {str(e)}')
-
-    def warehouse_selected(self, item):
-        """Обработчик выбора склада из списка"""
-        headers = self.get_auth_headers()
-        if not headers:
-            return
-
-        try:
-            # Сначала проверяем доступ к складу
-            response = requests.get(
-                f'{client_config.SERVER_URL}/warehouses',
-                headers=headers,
-                timeout=client_config.API_TIMEOUT
+            self.tasks.run(
+                lambda task: self.session.post('/warehouses', json={'name': name}),
+                self.warehouse_added,
+                lambda error: self.request_failed(error, 'Ошибка создания склада')
             )
-            
-            if response.status_code == 200:
-                warehouses = response.json()
-                selected_warehouse = next(
-                    (w for w in warehouses if w['name'] == item.text()),
-                    None
-                )
-                
-                if selected_warehouse:
-                    # Удаляем предыдущий виджет склада, если он есть
-                    current = self.stacked_widget.currentWidget()
-                    if current != self.main_screen:
-                        self.stacked_widget.removeWidget(current)
-                        current.deleteLater()
-                        
-                    # Создаем новый виджет склада
-                    warehouse_view = WarehouseView(
-                        selected_warehouse['id'],
-                        selected_warehouse['name'],
-                        self.email,
-                        self
-                    )
-                    self.stacked_widget.addWidget(warehouse_view)
-                    self.stacked_widget.setCurrentWidget(warehouse_view)
-                else:
-                    QMessageBox.warning(self, 'Ошибка', 'Склад не найден')
+
+    def warehouse_added(self, response):
+        if response.status_code == 200:
+            warehouse = self.session.api.json(response, {})
+            if isinstance(warehouse, dict) and 'id' in warehouse:
+                # Сервер вернул созданный склад: список дополняется без повторной загрузки
+                self.warehouses.add_warehouse(warehouse)
+                self.cache.store_warehouses(self.email, self.warehouses.warehouses())
+                self.prefetcher.set_candidates([w['id'] for w in self.warehouses.warehouses()])
             else:
-                QMessageBox.warning(self, 'Ошибка', 'Не удалось получить информацию о складе')
-        except requests.exceptions.Timeout:
-            QMessageBox.warning(self, 'Ошибка', 'Сервер не отвечает')
-        except requests.exceptions.ConnectionError:
-            QMessageBox.warning(self, 'Ошибка', 'Не удалось подключиться к серверу')
-        except Exception as e:
-            QMessageBox.warning(self, 'Ошибка', f'Ошибка при открытии склада: {str(e)}')
+                self.refresh_warehouses()
+            QMessageBox.information(self, 'Успех', 'Склад успешно создан')
+        else:
+            QMessageBox.warning(self, 'Ошибка', 'Не удалось создать склад')
+
+    def warehouse_selected(self, index):
+        """Открывает склад, выбранный в списке, без запросов к серверу.
+
+        Доступ к складу проверяется загрузкой его товаров в WarehouseView.
+        """
+        self.open_warehouse(self.warehouses.warehouse(index.row()))
+
+    def open_warehouse(self, selected_warehouse):
+        warehouse_id = selected_warehouse['id']
+        self.prefetcher.opened(warehouse_id)
+
+        # Склад уже открывался: показываем сохраненный вид и сверяем его с сервером
+        warehouse_view = self.warehouse_views.get(warehouse_id)
+        get_network_stats().cache_lookup('views', warehouse_view is not None)
+        if warehouse_view is not None:
+            self.warehouse_views.move_to_end(warehouse_id)
+            self.stacked_widget.setCurrentWidget(warehouse_view)
+            warehouse_view.revalidate()
+            return
+
+        # Создаем новый виджет склада, передав ему прогретые товары, если они есть
+        prefetched = self.prefetcher.take(warehouse_id)
+        warehouse_view = WarehouseView(
+            warehouse_id,
+            selected_warehouse['name'],
+            self.email,
+            self,
+            prefetched
+        )
+        self.warehouse_views[warehouse_id] = warehouse_view
+        self.prefetcher.retain(self.warehouse_views)
+        self.stacked_widget.addWidget(warehouse_view)
+        self.stacked_widget.setCurrentWidget(warehouse_view)
+        self.evict_warehouse_views()
+
+    def evict_warehouse_views(self):
+        """Закрывает давно не показанные склады сверх WAREHOUSE_VIEWS_MAX и лимита памяти"""
+        current = self.stacked_widget.currentWidget()
+        max_bytes = client_config.WAREHOUSE_VIEWS_MAX_MB * 1024 * 1024
+        views = list(self.warehouse_views.items())
+        total = sum(view.memory_estimate() for _, view in views)
+        count = len(views)
+        for warehouse_id, view in views:
+            if count <= client_config.WAREHOUSE_VIEWS_MAX and total <= max_bytes:
+                break
+            if view is current:
+                continue
+            total -= view.memory_estimate()
+            count -= 1
+            self.close_warehouse_view(warehouse_id)
+
+    def close_warehouse_view(self, warehouse_id):
+        """Удаляет виджет склада и отменяет его запросы"""
+        view = self.warehouse_views.pop(warehouse_id, None)
+        if view is None:
+            return
+        view.stop()
+        if self.stacked_widget.currentWidget() is view:
+            self.stacked_widget.setCurrentWidget(self.main_screen)
+        self.stacked_widget.removeWidget(view)
+        view.deleteLater()  # Освобождаем память
+        self.prefetcher.retain(self.warehouse_views)
 
     def show_main_screen(self):
-        """Возвращает на главный экран"""
-        # Удаляем текущий виджет склада из стека
-        current_widget = self.stacked_widget.currentWidget()
-        if current_widget != self.main_screen:
-            self.stacked_widget.removeWidget(current_widget)
-            current_widget.deleteLater()  # Освобождаем память
+        """Возвращает на главный экран; открытый склад остается в памяти"""
         self.stacked_widget.setCurrentWidget(self.main_screen)
-        self.load_warehouses()  # Обновляем список складов
+        # Склады сверх лимита закрываются, когда уже не видны
+        self.evict_warehouse_views()
+        self.prefetcher.resume()
+        # Список складов обновляется, только если давно не сверялся с сервером
+        if self.warehouses_stale() and not self.tasks.busy:
+            self.refresh_warehouses()
 
     def test_session(self):
-        headers = self.get_auth_headers()
-        if headers:
+        self.tasks.run(
+            lambda task: self.session.get('/test-auth'),
+            self.session_tested,
+            lambda error: self.request_failed(error, 'Ошибка проверки сессии')
+        )
+
+    def session_tested(self, response):
+        if response.status_code == 200:
             QMessageBox.information(self, 'Успех', 'Сессия активна')
+        else:
+            self.session_expired()
 
     def logout(self):
         try:
-            headers = self.get_auth_headers()
-            if headers:
-                requests.post(
-                    f'{client_config.SERVER_URL}/logout',
-                    headers=headers
-                )
-            self.token_storage.clear_tokens(self.email)
+            self.tasks.cancel_all()
+            self.prefetcher.stop()
+            for view in self.warehouse_views.values():
+                view.stop()
+            tokens = self.session.token_storage.get_tokens(self.email)
+            if tokens:
+                # Сервер уведомляется в фоне: локальный выход от него не зависит
+                api = self.session.api
+                run_detached(lambda task: api.post('/logout', token=tokens['access_token']))
+            stop_movement_outbox(self.email)
+            get_session_manager().end_session(self.email)
             
             from .login_window import LoginWindow
             self.login_window = LoginWindow()
             self.login_window.show()
             self.close()
         except:
-            QMessageBox.warning(self, 'Ошибка', 'Ошибка при выходе из системы') 
\ No newline at end of file
+            QMessageBox.warning(self, 'Ошибка', 'Ошибка при выходе из системы')
@@ -0,0 +1,334 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, NamedTuple, Optional
+
+import requests
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+import client_config
+from .api_client import batch_results, batch_unsupported
+from .auth_session import AuthSession, SessionExpiredError, get_session
+from .net_stats import get_network_stats
+from .workers import TaskGroup
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS movements (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT NOT NULL,
+    warehouse_id INTEGER NOT NULL,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    movement TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS movements_email ON movements (email, id);
+"""
+
+# Ответы, после которых запрос имеет смысл повторить позже
+RETRY_STATUSES = {408, 425, 429}
+
+logger = logging.getLogger(__name__)
+
+
+MEMORY_STORE = ":memory:"
+
+
+class OutboxEntry(NamedTuple):
+    id: int
+    warehouse_id: int
+    key: str
+    movement: dict
+
+
+class MovementOutcome(NamedTuple):
+    warehouse_id: int
+    key: str                             # Idempotency-Key движения из OutboxEntry
+    detail: Optional[str]                # сообщение сервера об отказе; None - движение принято
+    product: Optional[dict]              # товар после движения, если сервер вернул его в ответе
+
+
+class FlushResult(NamedTuple):
+    delivered: Dict[int, int]            # склад -> сколько движений принято
+    rejected: List[tuple]                # (склад, сообщение сервера)
+    outcomes: List[MovementOutcome]      # результаты по каждому движению в порядке отправки
+    error: Optional[Exception]           # причина остановки отправки
+    remaining: int                       # сколько движений еще ждет отправки
+
+
+class OutboxStore:
+    """Очередь движений товара в SQLite, переживающая перезапуск клиента.
+
+    В отличие от LocalCache ошибки SQLite пробрасываются: движение,
+    которое не удалось записать, не должно считаться сохраненным.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or client_config.OUTBOX_FILE
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    @property
+    def durable(self) -> bool:
+        """False, если очередь хранится только в памяти и пропадет при выходе."""
+        return self.path != MEMORY_STORE
+
+    def add(self, email: str, warehouse_id: int, movements: List[dict]) -> List[OutboxEntry]:
+        """Записывает движения одной транзакцией: документ сохраняется целиком или никак."""
+        entries = []
+        with self._lock, self._db:
+            for movement in movements:
+                key = str(uuid.uuid4())
+                cursor = self._db.execute(
+                    "INSERT INTO movements"
+                    " (email, warehouse_id, idempotency_key, movement, created_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (email, warehouse_id, key, json.dumps(movement), time.time()))
+                entries.append(OutboxEntry(cursor.lastrowid, warehouse_id, key, movement))
+        return entries
+
+    def pending(self, email: str, limit: int) -> List[OutboxEntry]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, warehouse_id, idempotency_key, movement FROM movements"
+                " WHERE email = ? ORDER BY id LIMIT ?", (email, limit)).fetchall()
+        return [OutboxEntry(id, warehouse_id, key, json.loads(movement))
+                for id, warehouse_id, key, movement in rows]
+
+    def remove(self, ids: List[int]):
+        with self._lock, self._db:
+            self._db.executemany("DELETE FROM movements WHERE id = ?", [(id,) for id in ids])
+
+    def count(self, email: str, warehouse_id: Optional[int] = None) -> int:
+        query, args = "SELECT COUNT(*) FROM movements WHERE email = ?", (email,)
+        if warehouse_id is not None:
+            query, args = query + " AND warehouse_id = ?", args + (warehouse_id,)
+        with self._lock:
+            return self._db.execute(query, args).fetchone()[0]
+
+
+class MovementOutbox(QObject):
+    """Отложенная отправка движений товара пользователя.
+
+    add() только записывает движение в OutboxStore и сразу возвращает
+    управление, а отправку выполняет фоновая задача: по порядку записи,
+    пачками через /movements/batch, если сервер его поддерживает, иначе
+    по одному запросу на движение. Каждое движение отправляется со своим
+    Idempotency-Key, поэтому повтор после обрыва связи не создаст дубль.
+
+    Если сервер недоступен, отправка повторяется с нарастающей паузой.
+    Движение, отклоненное сервером (например, нехватка товара), удаляется
+    из очереди и передается в сигнал rejected.
+
+    queued и settled сообщают о каждом движении: окна склада показывают
+    его сразу после постановки в очередь и сверяют (или откатывают) по
+    ответу сервера.
+    """
+
+    changed = pyqtSignal(int)         # изменилось число ожидающих движений склада
+    delivered = pyqtSignal(int)       # сервер принял движения склада
+    rejected = pyqtSignal(int, str)   # сервер отклонил движение склада
+    queued = pyqtSignal(int, list)    # склад, [OutboxEntry] - движения поставлены в очередь
+    settled = pyqtSignal(int, list)   # склад, [MovementOutcome] - сервер ответил на движения
+
+    def __init__(self, session: AuthSession, store: OutboxStore, parent=None):
+        super().__init__(parent)
+        self.session = session
+        self.store = store
+        self.batch_supported: Optional[bool] = None
+        self.tasks = TaskGroup(self)
+        self._retry_delay = 0
+        self._flush_again = False
+        self.retry_timer = QTimer(self)
+        self.retry_timer.setSingleShot(True)
+        self.retry_timer.timeout.connect(self.flush)
+
+    @property
+    def email(self) -> str:
+        return self.session.email
+
+    def add(self, warehouse_id: int, movement: dict) -> OutboxEntry:
+        return self.add_many(warehouse_id, [movement])[0]
+
+    def add_many(self, warehouse_id: int, movements: List[dict]) -> List[OutboxEntry]:
+        """Ставит в очередь строки документа; они уйдут пачками по OUTBOX_BATCH_SIZE."""
+        entries = self.store.add(self.email, warehouse_id, movements)
+        self.queued.emit(warehouse_id, entries)
+        self.changed.emit(warehouse_id)
+        self.flush()
+        return entries
+
+    def pending_count(self, warehouse_id: Optional[int] = None) -> int:
+        return self.store.count(self.email, warehouse_id)
+
+    def pending(self, warehouse_id: int) -> List[OutboxEntry]:
+        """Движения склада, еще не принятые сервером, в порядке отправки."""
+        return [entry for entry in self.store.pending(self.email, -1)
+                if entry.warehouse_id == warehouse_id]
+
+    def flush(self):
+        """Запускает отправку ожидающих движений, если она еще не идет."""
+        if self.tasks.busy:
+            self._flush_again = True
+            return
+        self.retry_timer.stop()
+        self._flush_again = False
+        self.tasks.run(self._send_pending, self._flushed, self._flush_failed)
+
+    def stop(self):
+        self.retry_timer.stop()
+        self.tasks.cancel_all()
+
+    # --- Фоновая отправка ---
+
+    def _send_pending(self, task) -> FlushResult:
+        delivered, rejected, outcomes = {}, [], []
+        error = None
+        try:
+            while not task.cancelled:
+                entries = self.store.pending(self.email, client_config.OUTBOX_BATCH_SIZE)
+                if not entries:
+                    break
+                # Пачка содержит только подряд идущие движения одного склада
+                warehouse_id = entries[0].warehouse_id
+                batch = []
+                for entry in entries:
+                    if entry.warehouse_id != warehouse_id:
+                        break
+                    batch.append(entry)
+                for entry, detail, product in self._send_batch(warehouse_id, batch):
+                    self.store.remove([entry.id])
+                    outcomes.append(MovementOutcome(warehouse_id, entry.key, detail, product))
+                    if detail is None:
+                        delivered[warehouse_id] = delivered.get(warehouse_id, 0) + 1
+                    else:
+                        rejected.append((warehouse_id, detail))
+        except (requests.RequestException, SessionExpiredError, _RetryLater) as e:
+            error = e
+        return FlushResult(delivered, rejected, outcomes, error, self.store.count(self.email))
+
+    def _send_batch(self, warehouse_id: int, batch: List[OutboxEntry]):
+        """Отправляет движения, выдавая (entry, отказ или None, товар или None) по мере ответов.
+
+        Результаты обрабатываются до следующего запроса, поэтому при обрыве
+        связи в очереди остаются только неотправленные движения.
+        """
+        if len(batch) > 1 and self.batch_supported is not False:
+            response = self.session.post(
+                f"/warehouses/{warehouse_id}/movements/batch",
+                json={"movements": [dict(entry.movement, idempotency_key=entry.key)
+                                    for entry in batch]})
+            results = batch_results(response, len(batch))
+            if results is not None:
+                self.batch_supported = True
+                for entry, result in zip(batch, results):
+                    detail = self._rejection(result.get("status", 200), result.get("detail"))
+                    yield entry, detail, None if detail else result.get("product")
+                return
+            _check_retry(response)
+            if batch_unsupported(response.status_code):
+                self.batch_supported = False
+
+        for entry in batch:
+            response = self.session.post(
+                f"/warehouses/{warehouse_id}/movements",
+                json=entry.movement, headers={"Idempotency-Key": entry.key})
+            _check_retry(response)
+            detail = product = None
+            if response.status_code != 200:
+                detail = self.session.api.error_detail(response, response.text)
+            else:
+                product = _response_product(response)
+            yield entry, detail, product
+
+    @staticmethod
+    def _rejection(status: int, detail: Optional[str]) -> Optional[str]:
+        if status == 200:
+            return None
+        if status >= 500 or status in RETRY_STATUSES:
+            raise _RetryLater(detail or f"HTTP {status}")
+        return detail or f"HTTP {status}"
+
+    # --- Результаты в потоке GUI ---
+
+    def _flushed(self, result: FlushResult):
+        settled: Dict[int, List[MovementOutcome]] = {}
+        for outcome in result.outcomes:
+            settled.setdefault(outcome.warehouse_id, []).append(outcome)
+        for warehouse_id, outcomes in settled.items():
+            self.settled.emit(warehouse_id, outcomes)
+        for warehouse_id in result.delivered:
+            self.delivered.emit(warehouse_id)
+            self.changed.emit(warehouse_id)
+        for warehouse_id, detail in result.rejected:
+            self.rejected.emit(warehouse_id, detail)
+            self.changed.emit(warehouse_id)
+
+        if result.error is None:
+            self._retry_delay = 0
+            if self._flush_again:
+                self.flush()
+        elif result.remaining and not isinstance(result.error, SessionExpiredError):
+            self._schedule_retry()
+
+    def _flush_failed(self, error):
+        self._schedule_retry()
+
+    def _schedule_retry(self):
+        get_network_stats().count("retries", reason="outbox")
+        self._retry_delay = min(max(self._retry_delay * 2, client_config.OUTBOX_RETRY_MIN),
+                                client_config.OUTBOX_RETRY_MAX)
+        self.retry_timer.start(int(self._retry_delay * 1000))
+
+
+class _RetryLater(Exception):
+    """Сервер временно не может принять движения."""
+
+
+def _check_retry(response: requests.Response):
+    if response.status_code >= 500 or response.status_code in RETRY_STATUSES:
+        raise _RetryLater(f"HTTP {response.status_code}")
+
+
+def _response_product(response: requests.Response) -> Optional[dict]:
+    try:
+        body = response.json()
+    except ValueError:
+        return None
+    return body.get("product") if isinstance(body, dict) else None
+
+
+_store: Optional[OutboxStore] = None
+_outboxes: Dict[str, MovementOutbox] = {}
+
+
+def get_movement_outbox(email: str) -> MovementOutbox:
+    """Возвращает очередь движений пользователя (создается в потоке GUI)."""
+    global _store
+    if _store is None:
+        try:
+            _store = OutboxStore()
+        except sqlite3.Error as e:
+            # Движения по-прежнему отправляются, но не переживут перезапуск;
+            # окна склада показывают это рядом с числом ожидающих движений
+            logger.warning("Не удалось открыть очередь движений %s (%s), "
+                           "неотправленные движения хранятся только в памяти",
+                           client_config.OUTBOX_FILE, e)
+            _store = OutboxStore(MEMORY_STORE)
+    outbox = _outboxes.get(email)
+    if outbox is None:
+        outbox = MovementOutbox(get_session(email), _store)
+        _outboxes[email] = outbox
+    return outbox
+
+
+def stop_movement_outbox(email: str):
+    """Останавливает отправку при выходе; движения остаются в очереди до следующего входа."""
+    outbox = _outboxes.pop(email, None)
+    if outbox is not None:
+        outbox.stop()
+        outbox.deleteLater()
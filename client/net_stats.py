@@ -0,0 +1,319 @@
+import atexit
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from PyQt6.QtCore import QObject, Qt, QTimer
+
+import client_config
+
+# Границы корзин гистограмм, секунды (как у гистограмм Prometheus по умолчанию)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_PREFIX = "warehouse_client"
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_name(method: str, path: str) -> str:
+    """Шаблон эндпоинта без параметров и идентификаторов: 'GET /warehouses/{id}/products'."""
+    path = path.split("?", 1)[0]
+    return f"{method.upper()} {_ID_SEGMENT.sub('/{id}', path)}"
+
+
+class LatencyHistogram:
+    """Гистограмма длительностей с фиксированными корзинами LATENCY_BUCKETS."""
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # последняя - больше всех границ
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Оценка квантиля линейной интерполяцией внутри корзины."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            if count and seen + count >= rank:
+                lower = LATENCY_BUCKETS[index - 1] if index else 0.0
+                upper = LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 6),
+            "max": round(self.max, 6),
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], self.buckets)),
+        }
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.statuses = Counter()
+        self.errors = Counter()       # тип исключения -> сколько раз
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.gui_thread_requests = 0
+        self.gui_thread_seconds = 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "latency": self.latency.snapshot(),
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "errors": dict(self.errors),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "gui_thread_requests": self.gui_thread_requests,
+            "gui_thread_seconds": round(self.gui_thread_seconds, 6),
+        }
+
+
+class NetworkStats:
+    """Счетчики сетевого слоя клиента для разбора жалоб на медленную работу.
+
+    ApiClient сообщает о каждом запросе: длительность (для потоковых
+    ответов - до получения заголовков), статус или ошибку, байты в обе
+    стороны и то, выполнялся ли запрос в потоке GUI. Остальные модули
+    считают события через count(): повторы, обновления токена, попадания
+    в кэши. GuiBlockMonitor добавляет время, когда поток GUI не успевал
+    обрабатывать события.
+
+    snapshot() отдает все в виде словаря, dump() пишет его в JSON и в
+    текстовом формате Prometheus. Методы можно вызывать из любого потока.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self._endpoints: Dict[str, EndpointStats] = {}
+            self._counters: Counter = Counter()   # (имя, ((метка, значение), ...)) -> значение
+            self._gui_blocked = LatencyHistogram()
+
+    # --- Сбор ---
+
+    def _endpoint(self, endpoint: str) -> EndpointStats:
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = EndpointStats()
+        return stats
+
+    def observe_request(self, endpoint: str, seconds: float, status: Optional[int] = None,
+                        error: Optional[Exception] = None, sent: int = 0, received: int = 0,
+                        gui_thread: bool = False):
+        with self._lock:
+            stats = self._endpoint(endpoint)
+            stats.latency.observe(seconds)
+            if error is not None:
+                stats.errors[type(error).__name__] += 1
+            else:
+                stats.statuses[status] += 1
+            stats.bytes_sent += sent
+            stats.bytes_received += received
+            if gui_thread:
+                stats.gui_thread_requests += 1
+                stats.gui_thread_seconds += seconds
+
+    def add_received(self, endpoint: str, received: int):
+        """Досчитывает тело потокового ответа, прочитанное после возврата из запроса."""
+        with self._lock:
+            self._endpoint(endpoint).bytes_received += received
+
+    def count(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def cache_lookup(self, cache: str, hit: bool):
+        self.count("cache_lookups", cache=cache, result="hit" if hit else "miss")
+
+    def observe_gui_block(self, seconds: float):
+        with self._lock:
+            self._gui_blocked.observe(seconds)
+
+    # --- Выдача ---
+
+    def counter(self, name: str, **labels) -> float:
+        """Сумма счетчика name по всем значениям меток, не указанных в labels."""
+        wanted = set(labels.items())
+        with self._lock:
+            return sum(value for (counter, counter_labels), value in self._counters.items()
+                       if counter == name and wanted <= set(counter_labels))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "started": self.started,
+                "uptime": round(time.time() - self.started, 3),
+                "endpoints": {endpoint: stats.snapshot()
+                              for endpoint, stats in sorted(self._endpoints.items())},
+                "counters": [{"name": name, "labels": dict(labels), "value": value}
+                             for (name, labels), value in sorted(self._counters.items())],
+                "gui_blocked": self._gui_blocked.snapshot(),
+            }
+
+    def to_prometheus(self) -> str:
+        """Все метрики в текстовом формате Prometheus (exposition format 0.0.4)."""
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            counters = sorted(self._counters.items())
+            gui_blocked = self._gui_blocked
+            lines = []
+
+            def metric(name: str, kind: str, help_text: str):
+                lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+
+            def sample(name: str, labels: List[Tuple[str, object]], value):
+                label_text = ",".join(f'{key}="{_escape_label(value)}"' for key, value in labels)
+                lines.append(f"{METRIC_PREFIX}_{name}{{{label_text}}} {value}" if label_text
+                             else f"{METRIC_PREFIX}_{name} {value}")
+
+            def histogram(name: str, labels: list, histogram: LatencyHistogram):
+                cumulative = 0
+                for bound, count in zip([str(b) for b in LATENCY_BUCKETS] + ["+Inf"], histogram.buckets):
+                    cumulative += count
+                    sample(f"{name}_bucket", labels + [("le", bound)], cumulative)
+                sample(f"{name}_sum", labels, round(histogram.total, 6))
+                sample(f"{name}_count", labels, histogram.count)
+
+            metric("request_duration_seconds", "histogram", "Request duration by endpoint")
+            for endpoint, stats in endpoints:
+                histogram("request_duration_seconds", [("endpoint", endpoint)], stats.latency)
+            metric("responses_total", "counter", "Responses by endpoint and HTTP status")
+            for endpoint, stats in endpoints:
+                for status, count in sorted(stats.statuses.items()):
+                    sample("responses_total", [("endpoint", endpoint), ("status", status)], count)
+            metric("request_errors_total", "counter", "Requests that failed without a response")
+            for endpoint, stats in endpoints:
+                for error, count in sorted(stats.errors.items()):
+                    sample("request_errors_total", [("endpoint", endpoint), ("error", error)], count)
+            metric("transferred_bytes_total", "counter", "Request and response body bytes")
+            for endpoint, stats in endpoints:
+                sample("transferred_bytes_total", [("endpoint", endpoint), ("direction", "sent")],
+                       stats.bytes_sent)
+                sample("transferred_bytes_total", [("endpoint", endpoint), ("direction", "received")],
+                       stats.bytes_received)
+            metric("gui_thread_request_seconds_total", "counter",
+                   "Time spent in requests made from the GUI thread")
+            for endpoint, stats in endpoints:
+                if stats.gui_thread_requests:
+                    sample("gui_thread_request_seconds_total", [("endpoint", endpoint)],
+                           round(stats.gui_thread_seconds, 6))
+            metric("gui_blocked_seconds", "histogram", "GUI event loop stalls")
+            histogram("gui_blocked_seconds", [], gui_blocked)
+
+            names = []
+            for (name, _), _ in counters:
+                if name not in names:
+                    names.append(name)
+            for name in names:
+                metric(f"{name}_total", "counter", name.replace("_", " ").capitalize())
+                for (counter, labels), value in counters:
+                    if counter == name:
+                        sample(f"{name}_total", list(labels), value)
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: Optional[str] = None) -> Tuple[str, str]:
+        """Записывает метрики в path.json и path.prom; возвращает пути файлов."""
+        path = path or client_config.NET_STATS_FILE
+        json_path, prom_path = f"{path}.json", f"{path}.prom"
+        _write_atomic(json_path, json.dumps(self.snapshot(), ensure_ascii=False, indent=2))
+        _write_atomic(prom_path, self.to_prometheus())
+        return json_path, prom_path
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _write_atomic(path: str, text: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class GuiBlockMonitor(QObject):
+    """Замеряет задержки цикла событий потока GUI.
+
+    Таймер срабатывает каждые NET_STATS_GUI_TICK_MS; если очередное
+    срабатывание опоздало больше чем на NET_STATS_GUI_BLOCK_MS, все
+    опоздание считается временем, когда окно не отвечало.
+    """
+
+    def __init__(self, stats: NetworkStats, parent=None):
+        super().__init__(parent)
+        self.stats = stats
+        self.interval = client_config.NET_STATS_GUI_TICK_MS / 1000
+        self.threshold = client_config.NET_STATS_GUI_BLOCK_MS / 1000
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self._tick)
+        self._last = time.perf_counter()
+        self.timer.start(client_config.NET_STATS_GUI_TICK_MS)
+
+    def _tick(self):
+        now = time.perf_counter()
+        late = now - self._last - self.interval
+        self._last = now
+        if late >= self.threshold:
+            self.stats.observe_gui_block(late)
+
+
+_network_stats: Optional[NetworkStats] = None
+_network_stats_lock = threading.Lock()
+_gui_monitor: Optional[GuiBlockMonitor] = None
+
+
+def get_network_stats() -> NetworkStats:
+    """Возвращает общие для процесса сетевые метрики."""
+    global _network_stats
+    if _network_stats is None:
+        with _network_stats_lock:
+            if _network_stats is None:
+                _network_stats = NetworkStats()
+                if client_config.NET_STATS_DUMP_ON_EXIT:
+                    atexit.register(_dump_on_exit, _network_stats)
+    return _network_stats
+
+
+def _dump_on_exit(stats: NetworkStats):
+    try:
+        stats.dump()
+    except OSError:
+        pass
+
+
+def watch_gui_thread():
+    """Запускает замер задержек потока GUI (вызывается из потока GUI один раз)."""
+    global _gui_monitor
+    if _gui_monitor is None:
+        _gui_monitor = GuiBlockMonitor(get_network_stats())
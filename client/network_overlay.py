@@ -0,0 +1,130 @@
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QFontDatabase
+from PyQt6.QtWidgets import QFrame, QHBoxLayout, QLabel, QPushButton, QVBoxLayout
+
+from .net_stats import NetworkStats, get_network_stats
+
+TOP_ENDPOINTS = 8       # Сколько эндпоинтов с наибольшим суммарным временем показывать
+REFRESH_MS = 1000
+
+
+def _ms(seconds) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.0f}"
+
+
+def _megabytes(size: int) -> str:
+    return f"{size / 2**20:.2f} МБ"
+
+
+class NetworkOverlay(QFrame):
+    """Панель метрик сети поверх главного окна (переключается F12).
+
+    Обновляется раз в секунду, пока видна; кнопка сохраняет метрики в
+    файлы NET_STATS_FILE.json и .prom, чтобы приложить их к обращению.
+    """
+
+    def __init__(self, parent=None, stats: NetworkStats = None):
+        super().__init__(parent)
+        self.stats = stats or get_network_stats()
+        self.setFrameShape(QFrame.Shape.StyledPanel)
+        self.setAutoFillBackground(True)
+        self.setStyleSheet("NetworkOverlay { background: rgba(255, 255, 240, 235); }")
+
+        layout = QVBoxLayout(self)
+        self.text_label = QLabel()
+        self.text_label.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.text_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        layout.addWidget(self.text_label)
+
+        buttons_layout = QHBoxLayout()
+        self.dump_label = QLabel()
+        dump_btn = QPushButton("Сохранить в файл")
+        dump_btn.clicked.connect(self.dump)
+        reset_btn = QPushButton("Сбросить")
+        reset_btn.clicked.connect(self.reset)
+        buttons_layout.addWidget(self.dump_label, stretch=1)
+        buttons_layout.addWidget(reset_btn)
+        buttons_layout.addWidget(dump_btn)
+        layout.addLayout(buttons_layout)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def toggle(self):
+        self.setVisible(not self.isVisible())
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.timer.start(REFRESH_MS)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    def reposition(self):
+        """Прижимает панель к правому верхнему углу родителя."""
+        parent = self.parentWidget()
+        if parent is None:
+            return
+        self.adjustSize()
+        self.move(max(parent.width() - self.width() - 10, 0), 10)
+        self.raise_()
+
+    def refresh(self):
+        self.text_label.setText(self.summary())
+        self.reposition()
+
+    def summary(self) -> str:
+        snapshot = self.stats.snapshot()
+        endpoints = snapshot["endpoints"]
+        requests = sum(e["latency"]["count"] for e in endpoints.values())
+        errors = sum(sum(e["errors"].values()) for e in endpoints.values())
+        received = sum(e["bytes_received"] for e in endpoints.values())
+        sent = sum(e["bytes_sent"] for e in endpoints.values())
+        gui_requests = sum(e["gui_thread_requests"] for e in endpoints.values())
+        blocked = snapshot["gui_blocked"]
+        minutes, seconds = divmod(int(snapshot["uptime"]), 60)
+
+        caches = {}
+        for counter in snapshot["counters"]:
+            if counter["name"] == "cache_lookups":
+                hits, total = caches.get(counter["labels"]["cache"], (0, 0))
+                hit = counter["labels"]["result"] == "hit"
+                caches[counter["labels"]["cache"]] = (hits + counter["value"] * hit, total + counter["value"])
+
+        lines = [
+            f"Сеть за {minutes:02d}:{seconds:02d}",
+            f"Запросы: {requests}, без ответа: {errors}, "
+            f"повторы: {self.stats.counter('retries'):.0f}, "
+            f"обновления токена: {self.stats.counter('token_refreshes'):.0f}",
+            f"Принято {_megabytes(received)}, отправлено {_megabytes(sent)}",
+            "Кэш (попаданий/обращений): " + (", ".join(
+                f"{cache} {hits:.0f}/{total:.0f}" for cache, (hits, total) in sorted(caches.items())) or "-"),
+            f"Поток GUI: блокировок {blocked['count']}, всего {_ms(blocked['sum'])} мс, "
+            f"макс. {_ms(blocked['max'])} мс; запросов из потока GUI: {gui_requests}",
+            "",
+            f"{'эндпоинт':<40}{'n':>6}{'p50':>7}{'p95':>7}{'макс':>7}{'принято':>12}",
+        ]
+        top = sorted(endpoints.items(), key=lambda item: item[1]["latency"]["sum"], reverse=True)
+        for endpoint, stats in top[:TOP_ENDPOINTS]:
+            latency = stats["latency"]
+            lines.append(f"{endpoint[:39]:<40}{latency['count']:>6}{_ms(latency['p50']):>7}"
+                         f"{_ms(latency['p95']):>7}{_ms(latency['max']):>7}"
+                         f"{_megabytes(stats['bytes_received']):>12}")
+        return "\n".join(lines)
+
+    def dump(self):
+        try:
+            json_path, prom_path = self.stats.dump()
+        except OSError as e:
+            self.dump_label.setText(f"Не удалось сохранить: {e}")
+            return
+        self.dump_label.setText(f"Сохранено: {json_path}, {prom_path}")
+        self.reposition()
+
+    def reset(self):
+        self.stats.reset()
+        self.dump_label.setText("")
+        self.refresh()
@@ -0,0 +1,99 @@
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple
+
+from .movement_outbox import MovementOutcome, OutboxEntry
+from .product_model import ProductTableModel
+
+
+def _movement_delta(movement: dict) -> int:
+    quantity = int(movement.get("quantity", 0))
+    return -quantity if movement.get("movement_type") == "out" else quantity
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+
+class PendingMovements:
+    """Движения склада, уже показанные в таблице, но еще не принятые сервером.
+
+    Остаток в модели = остаток с сервера + сумма неподтвержденных
+    движений товара. track() сразу меняет одну строку модели, settle()
+    по ответу сервера либо ставит остаток из ответа (с поправкой на
+    движения, которые еще в очереди), либо откатывает отклоненное
+    движение. overlay() накладывает неподтвержденные движения на товары,
+    пришедшие с сервера при загрузке, чтобы они не затирали изменения.
+    """
+
+    def __init__(self, model: ProductTableModel):
+        self.model = model
+        self._movements: Dict[str, Tuple[int, int]] = {}   # ключ движения -> (id товара, изменение)
+        self._deltas = Counter()                             # id товара -> сумма изменений
+        self._counts = Counter()                             # id товара -> число движений
+
+    def __len__(self):
+        return len(self._movements)
+
+    def track(self, entries: Iterable[OutboxEntry]):
+        """Показывает движения из очереди в модели."""
+        updated_at = _now_iso()
+        for entry in entries:
+            if entry.key in self._movements:
+                continue
+            product_id = entry.movement["product_id"]
+            delta = _movement_delta(entry.movement)
+            self._movements[entry.key] = (product_id, delta)
+            self._deltas[product_id] += delta
+            self._counts[product_id] += 1
+            self.model.adjust_quantity(product_id, delta, updated_at)
+
+    def settle(self, outcomes: List[MovementOutcome]) -> bool:
+        """Сверяет модель с ответом сервера.
+
+        Возвращает False, если остатки нужно запросить отдельно: сервер
+        принял движение, но не вернул товар, или отклонил его (обычно
+        из-за того, что остаток уже изменили на другом рабочем месте).
+        """
+        complete = True
+        for outcome in outcomes:
+            movement = self._movements.pop(outcome.key, None)
+            if movement is None:
+                continue
+            product_id, delta = movement
+            self._forget(product_id, delta)
+            if outcome.detail is not None:
+                self.model.adjust_quantity(product_id, -delta)
+                complete = False
+            elif outcome.product is not None:
+                self.model.upsert_products(self.overlay([outcome.product]))
+            else:
+                complete = False
+        return complete
+
+    def confirm(self, keys: Iterable[str]):
+        """Забывает движения, которые сервер уже провел (например, по событию склада).
+
+        Модель не меняется: остаток приходит вместе с событием и
+        накладывается через overlay().
+        """
+        for key in keys:
+            movement = self._movements.pop(key, None)
+            if movement is not None:
+                self._forget(*movement)
+
+    def overlay(self, products: List[dict]) -> List[dict]:
+        """Добавляет к остаткам с сервера еще не принятые движения."""
+        if not self._deltas:
+            return products
+        deltas = self._deltas
+        return [dict(product, current_quantity=product["current_quantity"] + deltas[product["id"]])
+                if product["id"] in deltas else product
+                for product in products]
+
+    def _forget(self, product_id: int, delta: int):
+        self._deltas[product_id] -= delta
+        self._counts[product_id] -= 1
+        if not self._counts[product_id]:
+            del self._deltas[product_id]
+            del self._counts[product_id]
@@ -0,0 +1,173 @@
+import csv
+import os
+from typing import List, NamedTuple, Optional
+
+from .auth_session import AuthSession
+from .json_stream import iter_json_items
+from .product_sync import ProductSync
+
+EXPORT_COLUMNS = ["warehouse_id", "warehouse", "id", "product_type_id", "category",
+                  "name", "current_quantity", "updated_at"]
+EXPORT_BATCH_ROWS = 5000  # Строк в одной записываемой странице (row group для Parquet)
+
+# Расширение файла -> формат
+EXPORT_FORMATS = {".csv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+
+class ProductExportError(Exception):
+    """Экспорт невозможен (формат файла, нет pyarrow, ошибка сервера)."""
+
+
+class ExportProgress(NamedTuple):
+    warehouse: str              # склад, который выгружается сейчас
+    rows: int                   # строк записано всего
+    fraction: Optional[float]   # доля выполненной работы, если известна
+
+
+class ExportResult(NamedTuple):
+    path: str
+    rows: int
+    warehouses: int
+    cancelled: bool
+
+
+class _CsvWriter:
+    def __init__(self, path: str):
+        self._file = open(path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.writer(self._file, delimiter=";")
+        self._writer.writerow(EXPORT_COLUMNS)
+
+    def write(self, rows: List[tuple]):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class _ArrowWriter:
+    """Запись страницами в Parquet или Arrow IPC через pyarrow."""
+
+    def __init__(self, path: str, file_format: str):
+        try:
+            import pyarrow
+            import pyarrow.ipc
+            import pyarrow.parquet
+        except ImportError:
+            raise ProductExportError("Для экспорта в Parquet и Arrow установите пакет pyarrow")
+        self._pa = pyarrow
+        self._schema = pyarrow.schema([
+            ("warehouse_id", pyarrow.int64()),
+            ("warehouse", pyarrow.string()),
+            ("id", pyarrow.int64()),
+            ("product_type_id", pyarrow.int64()),
+            ("category", pyarrow.string()),
+            ("name", pyarrow.string()),
+            ("current_quantity", pyarrow.int64()),
+            ("updated_at", pyarrow.string()),
+        ])
+        if file_format == "parquet":
+            self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+        else:
+            self._writer = pyarrow.ipc.new_file(path, self._schema)
+
+    def write(self, rows: List[tuple]):
+        columns = list(zip(*rows))
+        batch = self._pa.record_batch(
+            [self._pa.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+            schema=self._schema)
+        self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+
+
+def export_format(path: str) -> str:
+    file_format = EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if file_format is None:
+        raise ProductExportError("Поддерживаются файлы .csv, .parquet, .arrow и .feather")
+    return file_format
+
+
+def _open_writer(path: str, file_format: str):
+    if file_format == "csv":
+        return _CsvWriter(path)
+    return _ArrowWriter(path, file_format)
+
+
+class ProductExport:
+    """Выгрузка товаров одного или всех складов в CSV, Parquet или Arrow IPC.
+
+    Список товаров каждого склада читается потоком (как ProductSync) и
+    записывается страницами по EXPORT_BATCH_ROWS строк, поэтому память
+    не зависит от размера склада. Файл пишется во временный path.part и
+    переименовывается только после успешного завершения; при отмене или
+    ошибке недописанный файл удаляется.
+
+    Сервер не отдает историю движений, поэтому выгружаются только
+    товары с текущими остатками.
+    """
+
+    def __init__(self, session: AuthSession, path: str, warehouses: Optional[List[dict]] = None):
+        self.session = session
+        self.path = path
+        self.format = export_format(path)
+        self.warehouses = warehouses  # None - все склады пользователя
+
+    def run(self, task) -> ExportResult:
+        """Выполняет экспорт в фоновой задаче, сообщая ExportProgress через task.report()."""
+        warehouses = self.warehouses if self.warehouses is not None else self._load_warehouses()
+        part_path = self.path + ".part"
+        writer = _open_writer(part_path, self.format)
+        rows = 0
+        try:
+            for index, warehouse in enumerate(warehouses):
+                rows = self._export_warehouse(task, writer, warehouse, rows, index, len(warehouses))
+                if task.cancelled:
+                    break
+        except BaseException:
+            writer.close()
+            os.remove(part_path)
+            raise
+        writer.close()
+
+        if task.cancelled:
+            os.remove(part_path)
+            return ExportResult(self.path, rows, len(warehouses), True)
+        os.replace(part_path, self.path)
+        return ExportResult(self.path, rows, len(warehouses), False)
+
+    def _load_warehouses(self) -> List[dict]:
+        response = self.session.get("/warehouses")
+        if response.status_code != 200:
+            raise ProductExportError("Не удалось загрузить список складов")
+        return response.json()
+
+    def _export_warehouse(self, task, writer, warehouse: dict, rows: int, index: int,
+                          count: int) -> int:
+        response = self.session.get(f"/warehouses/{warehouse['id']}/products",
+                                    headers={"Accept": ProductSync.ACCEPT}, stream=True)
+        with response:
+            if response.status_code != 200:
+                raise ProductExportError(f"Не удалось загрузить товары склада «{warehouse['name']}»")
+            total = response.headers.get("Content-Length")
+            total = int(total) if total and total.isdigit() else None
+
+            page = []
+            for product in iter_json_items(response):
+                page.append((warehouse["id"], warehouse["name"], product["id"],
+                             product.get("product_type_id"), product.get("category"),
+                             product["name"], product["current_quantity"],
+                             product.get("updated_at")))
+                if len(page) >= EXPORT_BATCH_ROWS:
+                    if task.cancelled:
+                        return rows
+                    writer.write(page)
+                    rows += len(page)
+                    page = []
+                    fraction = (index + response.raw.tell() / total) / count if total else None
+                    task.report(ExportProgress(warehouse["name"], rows, fraction))
+            if page:
+                writer.write(page)
+                rows += len(page)
+        task.report(ExportProgress(warehouse["name"], rows, (index + 1) / count))
+        return rows
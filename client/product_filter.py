@@ -0,0 +1,247 @@
+from bisect import insort
+from typing import List, Optional
+
+from PyQt6.QtCore import QAbstractProxyModel, QModelIndex, QObject, Qt
+
+from .product_model import ProductTableModel
+
+
+class ProductFilterProxy(QAbstractProxyModel):
+    """Прокси-модель, показывающая заданное подмножество строк источника.
+
+    Сама прокси ничего не фильтрует: список строк вычисляет ProductFilter
+    по своим индексам и передает в set_rows(). rows=None означает, что
+    видны все строки источника в исходном порядке.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: Optional[List[int]] = None
+        self._proxy_rows: Optional[dict] = None
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self._source_reset)
+        model.rowsAboutToBeInserted.connect(self._source_rows_about_to_be_inserted)
+        model.rowsInserted.connect(self._source_rows_inserted)
+        model.dataChanged.connect(self._source_data_changed)
+
+    @property
+    def filtered(self) -> bool:
+        return self._rows is not None
+
+    def set_rows(self, rows: Optional[List[int]]):
+        self.beginResetModel()
+        self._rows = rows
+        self._proxy_rows = None
+        self.endResetModel()
+
+    def append_rows(self, rows: List[int]):
+        """Добавляет в конец видимые строки, появившиеся в источнике."""
+        if not rows or self._rows is None:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._rows.extend(rows)
+        self._proxy_rows = None
+        self.endInsertRows()
+
+    # --- Отображение индексов ---
+
+    def _proxy_row(self, source_row: int) -> Optional[int]:
+        if self._rows is None:
+            return source_row
+        if self._proxy_rows is None:
+            self._proxy_rows = {row: position for position, row in enumerate(self._rows)}
+        return self._proxy_rows.get(source_row)
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or self.sourceModel() is None:
+            return QModelIndex()
+        row = proxy_index.row()
+        source_row = row if self._rows is None else self._rows[row]
+        return self.sourceModel().index(source_row, proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        row = self._proxy_row(source_index.row())
+        if row is None:
+            return QModelIndex()
+        return self.index(row, source_index.column())
+
+    def source_row(self, proxy_row: int) -> int:
+        return proxy_row if self._rows is None else self._rows[proxy_row]
+
+    # --- QAbstractItemModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None:
+            return 0
+        return self.sourceModel().rowCount() if self._rows is None else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.sourceModel() is None:
+            return 0
+        return self.sourceModel().columnCount()
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < self.rowCount()) \
+                or not (0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        return QModelIndex()
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Vertical and role == Qt.ItemDataRole.DisplayRole:
+            return section + 1
+        return self.sourceModel().headerData(section, orientation, role)
+
+    # --- Сигналы источника ---
+
+    def _source_reset(self):
+        self._rows = None
+        self._proxy_rows = None
+        self.endResetModel()
+
+    def _source_rows_about_to_be_inserted(self, parent, first, last):
+        if self._rows is None:
+            self.beginInsertRows(QModelIndex(), first, last)
+
+    def _source_rows_inserted(self, parent, first, last):
+        if self._rows is None:
+            self.endInsertRows()
+
+    def _source_data_changed(self, top_left, bottom_right, roles=()):
+        last_column = self.columnCount() - 1
+        if self._rows is None:
+            self.dataChanged.emit(self.index(top_left.row(), 0),
+                                  self.index(bottom_right.row(), last_column))
+            return
+        for source_row in range(top_left.row(), bottom_right.row() + 1):
+            row = self._proxy_row(source_row)
+            if row is not None:
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last_column))
+
+
+class ProductFilter(QObject):
+    """Поиск по названию и фильтр по категории для таблицы товаров.
+
+    Держит индексы поверх ProductTableModel: названия в нижнем регистре
+    и инвертированный индекс категория -> строки. Если новый запрос
+    содержит предыдущий (пользователь дописал символ), проверяются только
+    строки, найденные в прошлый раз. Результат применяется через
+    ProductFilterProxy, без скрытия строк представления по одной.
+    """
+
+    def __init__(self, source: ProductTableModel, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.proxy = ProductFilterProxy(self)
+        self.proxy.setSourceModel(source)
+
+        self._query = ""
+        self._category: Optional[str] = None
+        self._matches: Optional[List[int]] = None
+        self._matches_query = ""
+        self._matches_category: Optional[str] = None
+        self._rebuild_index()
+
+        # Прокси подключена к сигналам источника раньше, поэтому к моменту
+        # вызова этих слотов она уже обработала изменение
+        source.modelReset.connect(self._source_reset)
+        source.rowsInserted.connect(self._source_rows_inserted)
+        source.dataChanged.connect(self._source_data_changed)
+
+    @property
+    def active(self) -> bool:
+        return bool(self._query) or self._category is not None
+
+    def set_filter(self, query: str, category: Optional[str] = None):
+        """Применяет поисковый запрос и категорию (None - все категории)."""
+        self._query = query.strip().lower()
+        self._category = category
+        self._apply()
+
+    # --- Индексы ---
+
+    def _rebuild_index(self):
+        self._names = []
+        self._row_categories = []
+        self._category_rows = {}
+        self._index_rows(0, self.source.rowCount() - 1)
+
+    def _index_rows(self, first: int, last: int):
+        source = self.source
+        for row in range(first, last + 1):
+            category = source.category(row)
+            self._names.append(source.name(row).lower())
+            self._row_categories.append(category)
+            self._category_rows.setdefault(category, []).append(row)
+
+    def _row_matches(self, row: int) -> bool:
+        if self._category is not None and self._row_categories[row] != self._category:
+            return False
+        return self._query in self._names[row]
+
+    def _find_matches(self) -> Optional[List[int]]:
+        query, category = self._query, self._category
+        if not query and category is None:
+            return None
+
+        previous = self._matches
+        if (query and previous is not None and self._matches_query
+                and self._matches_query in query and self._matches_category == category):
+            candidates = previous
+        elif category is not None:
+            candidates = self._category_rows.get(category, [])
+        else:
+            return [row for row, name in enumerate(self._names) if query in name]
+
+        if not query:
+            return list(candidates)
+        names = self._names
+        return [row for row in candidates if query in names[row]]
+
+    def _apply(self):
+        matches = self._find_matches()
+        self._matches = matches
+        self._matches_query = self._query
+        self._matches_category = self._category
+        self.proxy.set_rows(None if matches is None else list(matches))
+
+    # --- Сигналы источника ---
+
+    def _source_reset(self):
+        self._rebuild_index()
+        self._matches = None
+        if self.active:
+            self._apply()
+
+    def _source_rows_inserted(self, parent, first, last):
+        self._index_rows(first, last)
+        if self.active:
+            visible = [row for row in range(first, last + 1) if self._row_matches(row)]
+            if self._matches is not None:
+                self._matches.extend(visible)
+            self.proxy.append_rows(visible)
+
+    def _source_data_changed(self, top_left, bottom_right, roles=()):
+        membership_changed = False
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            old_matches = self.active and self._row_matches(row)
+            self._names[row] = self.source.name(row).lower()
+            category = self.source.category(row)
+            old_category = self._row_categories[row]
+            if category != old_category:
+                self._category_rows[old_category].remove(row)
+                insort(self._category_rows.setdefault(category, []), row)
+                self._row_categories[row] = category
+            if self.active and old_matches != self._row_matches(row):
+                membership_changed = True
+        if membership_changed:
+            self._matches = None
+            self._apply()
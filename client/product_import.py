@@ -0,0 +1,356 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import client_config
+from .api_client import batch_results, batch_unsupported
+from .auth_session import AuthSession
+from .product_types import ProductTypesError, get_product_type_catalog
+
+HEADER_ALIASES = {
+    "category": ("category", "категория", "категория товара"),
+    "name": ("name", "название", "наименование", "товар"),
+    "quantity": ("quantity", "количество", "остаток", "начальное количество"),
+}
+
+# Ответы, после которых чанк имеет смысл отправить позже, а не считать строки ошибочными
+RETRY_STATUSES = {408, 425, 429}
+
+
+class ProductImportError(Exception):
+    """Файл нельзя импортировать (формат, заголовок, нет openpyxl)."""
+
+
+class RowError(NamedTuple):
+    row: int        # номер строки в файле, заголовок - строка 1
+    message: str
+
+
+class ImportProgress(NamedTuple):
+    rows: int                   # обработано строк данных, включая пропущенные при возобновлении
+    created: int                # создано товаров в этом запуске
+    errors: List[RowError]      # новые ошибки с прошлого отчета
+    fraction: Optional[float]   # доля прочитанного файла, если известна
+
+
+class ImportResult(NamedTuple):
+    rows: int
+    created: int
+    errors: int
+    resumed_from: int           # с какой строки данных продолжен прерванный импорт
+    cancelled: bool
+
+
+class _CsvSource:
+    def __init__(self, path: str):
+        self._raw = open(path, "rb")
+        self._size = os.path.getsize(path) or 1
+        self._text = io.TextIOWrapper(self._raw, encoding="utf-8-sig", newline="")
+        sample = self._text.read(64 * 1024)
+        self._text.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=";,\t")
+        except csv.Error:
+            dialect = csv.excel
+        self._reader = csv.reader(self._text, dialect)
+
+    def __iter__(self):
+        return iter(self._reader)
+
+    def fraction(self) -> Optional[float]:
+        return min(self._raw.tell() / self._size, 1.0)
+
+    def close(self):
+        self._text.close()
+
+
+class _XlsxSource:
+    def __init__(self, path: str):
+        try:
+            import openpyxl
+        except ImportError:
+            raise ProductImportError("Для импорта XLSX установите пакет openpyxl")
+        # read_only читает лист потоком, не загружая книгу в память
+        self._workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        sheet = self._workbook.active
+        self._rows = sheet.iter_rows(values_only=True)
+        self._total = sheet.max_row
+        self._read = 0
+
+    def __iter__(self):
+        for row in self._rows:
+            self._read += 1
+            yield ["" if value is None else str(value) for value in row]
+
+    def fraction(self) -> Optional[float]:
+        return min(self._read / self._total, 1.0) if self._total else None
+
+    def close(self):
+        self._workbook.close()
+
+
+def open_source(path: str):
+    if path.lower().endswith((".xlsx", ".xlsm")):
+        return _XlsxSource(path)
+    return _CsvSource(path)
+
+
+def _header_columns(header: List[str]) -> Dict[str, int]:
+    normalized = [str(cell).strip().lower() for cell in header]
+    columns = {}
+    for field, aliases in HEADER_ALIASES.items():
+        for position, title in enumerate(normalized):
+            if title in aliases:
+                columns[field] = position
+                break
+    missing = [field for field in ("category", "name") if field not in columns]
+    if missing:
+        raise ProductImportError(
+            "В первой строке файла нет столбцов: " + ", ".join(HEADER_ALIASES[f][1] for f in missing))
+    return columns
+
+
+def _parse_row(cells: List[str], columns: Dict[str, int]):
+    """Возвращает (категория, название, количество) или текст ошибки."""
+    def cell(field):
+        position = columns.get(field)
+        return str(cells[position]).strip() if position is not None and position < len(cells) else ""
+
+    category, name, quantity = cell("category"), cell("name"), cell("quantity")
+    if not name:
+        return "Не указано название"
+    if not category:
+        return "Не указана категория"
+    try:
+        quantity = int(float(quantity.replace(",", "."))) if quantity else 0
+    except ValueError:
+        return f"Некорректное количество: {quantity}"
+    if quantity < 0:
+        return "Количество не может быть отрицательным"
+    return category, name, quantity
+
+
+class ImportCheckpoints:
+    """Сохраненный прогресс импортов, чтобы продолжить прерванный.
+
+    Ключ включает размер и время изменения файла: измененный файл
+    импортируется заново с начала.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or client_config.IMPORT_CHECKPOINT_FILE
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(email: str, warehouse_id: int, file_path: str) -> str:
+        stat = os.stat(file_path)
+        source = f"{email}|{warehouse_id}|{os.path.abspath(file_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(source.encode()).hexdigest()[:16]
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, checkpoints: dict):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(checkpoints, f)
+        os.replace(temp_path, self.path)
+
+    def get(self, key: str) -> int:
+        with self._lock:
+            return self._load().get(key, 0)
+
+    def set(self, key: str, rows: int):
+        with self._lock:
+            checkpoints = self._load()
+            checkpoints[key] = rows
+            self._save(checkpoints)
+
+    def clear(self, key: str):
+        with self._lock:
+            checkpoints = self._load()
+            if checkpoints.pop(key, None) is not None:
+                self._save(checkpoints)
+
+
+class ProductImport:
+    """Импорт товаров на склад из CSV или XLSX.
+
+    Файл читается потоком и делится на чанки по IMPORT_CHUNK_SIZE строк.
+    Категории сопоставляются с /product-types по названию, недостающие
+    создаются один раз перед отправкой первого чанка, где они встретились.
+    До IMPORT_PARALLELISM чанков отправляются одновременно: пачкой через
+    /products/batch, если сервер его поддерживает, иначе по одному товару.
+
+    После каждого завершенного по порядку чанка сохраняется контрольная
+    точка, и повторный запуск на том же файле продолжает с нее. Товары
+    отправляются с Idempotency-Key по номеру строки, поэтому строки
+    чанка, прерванного на середине, не задваиваются.
+    """
+
+    def __init__(self, session: AuthSession, warehouse_id: int, path: str,
+                 checkpoints: Optional[ImportCheckpoints] = None):
+        self.session = session
+        self.warehouse_id = warehouse_id
+        self.path = path
+        self.checkpoints = checkpoints or ImportCheckpoints()
+        self.key = ImportCheckpoints.key(session.email, warehouse_id, path)
+        self.batch_supported: Optional[bool] = None
+        self.catalog = get_product_type_catalog(session.email)
+        self._types: Dict[str, int] = {}
+
+    @property
+    def resume_row(self) -> int:
+        return self.checkpoints.get(self.key)
+
+    def run(self, task) -> ImportResult:
+        """Выполняет импорт в фоновой задаче, сообщая ImportProgress через task.report()."""
+        source = open_source(self.path)
+        try:
+            return self._run(task, source)
+        finally:
+            source.close()
+
+    def _run(self, task, source) -> ImportResult:
+        rows = iter(source)
+        header = next(rows, None)
+        if header is None:
+            raise ProductImportError("Файл пуст")
+        columns = _header_columns(header)
+        self._load_types()
+
+        resumed_from = committed = self.resume_row
+        created, error_count = 0, 0
+        pending = deque()  # (future, последняя строка чанка, ошибки разбора)
+        cancelled = False
+
+        def finish_oldest():
+            nonlocal committed, created, error_count
+            future, last_row, parse_errors = pending.popleft()
+            chunk_created, upload_errors = future.result()
+            errors = parse_errors + upload_errors
+            committed = last_row
+            created += chunk_created
+            error_count += len(errors)
+            self.checkpoints.set(self.key, committed)
+            task.report(ImportProgress(committed, created, errors, source.fraction()))
+
+        with ThreadPoolExecutor(max_workers=client_config.IMPORT_PARALLELISM) as executor:
+            try:
+                for chunk, last_row, parse_errors in self._chunks(rows, columns, resumed_from):
+                    if task.cancelled:
+                        cancelled = True
+                        break
+                    self._create_missing_types(executor, chunk)
+                    pending.append((executor.submit(self._upload, chunk), last_row, parse_errors))
+                    if len(pending) >= client_config.IMPORT_PARALLELISM:
+                        finish_oldest()
+                while pending:
+                    finish_oldest()
+            finally:
+                for future, _, _ in pending:
+                    future.cancel()
+
+        if not cancelled:
+            self.checkpoints.clear(self.key)
+        return ImportResult(committed, created, error_count, resumed_from, cancelled)
+
+    def _chunks(self, rows: Iterator[list], columns: Dict[str, int], skip: int):
+        """Выдает (товары чанка с номерами строк, номер последней строки данных, ошибки)."""
+        chunk, errors = [], []
+        data_row = 0
+        for data_row, cells in enumerate(rows, start=1):
+            if data_row <= skip or not any(str(cell).strip() for cell in cells):
+                continue
+            parsed = _parse_row(cells, columns)
+            if isinstance(parsed, str):
+                errors.append(RowError(data_row + 1, parsed))
+            else:
+                chunk.append((data_row + 1,) + parsed)
+            if len(chunk) + len(errors) >= client_config.IMPORT_CHUNK_SIZE:
+                yield chunk, data_row, errors
+                chunk, errors = [], []
+        if chunk or errors:
+            yield chunk, data_row, errors
+
+    # --- Категории ---
+
+    def _load_types(self):
+        # Устаревший список не годится: по нему создавались бы уже существующие категории
+        types = self.catalog.types() if self.catalog.fresh else None
+        if types is None:
+            try:
+                types = self.catalog.fetch()
+            except ProductTypesError as e:
+                raise ProductImportError(f"Не удалось загрузить категории товаров: {e}") from e
+        self._types = {t["category"]: t["id"] for t in types}
+
+    def _create_missing_types(self, executor, chunk):
+        missing = list({category for _, category, _, _ in chunk if category not in self._types})
+        if not missing:
+            return
+        created = list(executor.map(self._create_type, missing))
+        for category, product_type in zip(missing, created):
+            self._types[category] = product_type["id"]
+        # Кэш категорий переписывается один раз на чанк, а не на каждую категорию
+        self.catalog.add_many(created)
+
+    def _create_type(self, category: str) -> dict:
+        response = self.session.post("/product-types", json={"category": category})
+        if response.status_code != 200:
+            detail = self.session.api.error_detail(response, response.text)
+            raise ProductImportError(f"Не удалось создать категорию «{category}»: {detail}")
+        return response.json()
+
+    # --- Отправка товаров ---
+
+    def _product(self, category: str, name: str, quantity: int) -> dict:
+        return {"product_type_id": self._types[category], "name": name, "quantity": quantity}
+
+    def _idempotency_key(self, row: int) -> str:
+        return f"import-{self.key}-{row}"
+
+    def _upload(self, chunk) -> tuple:
+        """Отправляет чанк и возвращает (создано товаров, ошибки строк)."""
+        path = f"/warehouses/{self.warehouse_id}/products"
+        if len(chunk) > 1 and self.batch_supported is not False:
+            response = self.session.post(f"{path}/batch", json={"products": [
+                dict(self._product(*line[1:]), idempotency_key=self._idempotency_key(line[0]))
+                for line in chunk]})
+            results = batch_results(response, len(chunk))
+            if results is not None:
+                self.batch_supported = True
+                errors = []
+                for line, result in zip(chunk, results):
+                    status = result.get("status", 200)
+                    if status != 200:
+                        _check_retry(status)
+                        errors.append(RowError(line[0], result.get("detail") or f"HTTP {status}"))
+                return len(chunk) - len(errors), errors
+            _check_retry(response.status_code)
+            if batch_unsupported(response.status_code):
+                self.batch_supported = False
+
+        errors = []
+        for line in chunk:
+            response = self.session.post(path, json=self._product(*line[1:]),
+                                         headers={"Idempotency-Key": self._idempotency_key(line[0])})
+            _check_retry(response.status_code)
+            if response.status_code != 200:
+                errors.append(RowError(line[0], self.session.api.error_detail(response, response.text)))
+        return len(chunk) - len(errors), errors
+
+
+def _check_retry(status: int):
+    if status >= 500 or status in RETRY_STATUSES:
+        raise ProductImportError(f"Сервер временно недоступен (HTTP {status})")
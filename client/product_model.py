@@ -0,0 +1,216 @@
+import sys
+from array import array
+from collections import Counter
+from typing import Iterable, List, Optional
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+COLUMNS = ["Категория", "Название", "Текущий остаток", "Последнее движение"]
+CATEGORY_COLUMN, NAME_COLUMN, QUANTITY_COLUMN, UPDATED_COLUMN = range(len(COLUMNS))
+
+
+class ProductTableModel(QAbstractTableModel):
+    """Модель таблицы товаров склада.
+
+    Товары хранятся по столбцам (массивы чисел и списки строк) вместо
+    словаря и набора QTableWidgetItem на каждую ячейку. Текст ячейки
+    формируется в data() только для строк, которые сейчас видит
+    QTableView, поэтому стоимость отрисовки не зависит от размера склада.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._clear_columns()
+
+    def _clear_columns(self):
+        self._ids = array('q')
+        self._type_ids: List[Optional[int]] = []
+        self._categories: List[str] = []
+        self._names: List[str] = []
+        self._quantities = array('q')
+        self._updated: List[str] = []
+        self._row_by_id = {}
+        self._category_counts = Counter()
+
+    # --- QAbstractTableModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._ids)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        if orientation == Qt.Orientation.Horizontal:
+            return COLUMNS[section]
+        return section + 1
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == CATEGORY_COLUMN:
+                return self._categories[row]
+            if column == NAME_COLUMN:
+                return self._names[row]
+            if column == QUANTITY_COLUMN:
+                return str(self._quantities[row])
+            return self._updated[row]
+        if role == Qt.ItemDataRole.UserRole:
+            return self._ids[row]
+        return None
+
+    # --- Доступ к данным ---
+
+    def product_id(self, row: int) -> int:
+        return self._ids[row]
+
+    def row_for_id(self, product_id: int) -> Optional[int]:
+        return self._row_by_id.get(product_id)
+
+    def category(self, row: int) -> str:
+        return self._categories[row]
+
+    def name(self, row: int) -> str:
+        return self._names[row]
+
+    def quantity(self, row: int) -> int:
+        return self._quantities[row]
+
+    def product(self, row: int) -> dict:
+        """Возвращает товар в том же виде, в каком его отдает сервер."""
+        return {
+            "id": self._ids[row],
+            "product_type_id": self._type_ids[row],
+            "category": self._categories[row],
+            "name": self._names[row],
+            "current_quantity": self._quantities[row],
+            "updated_at": self._updated[row],
+        }
+
+    def memory_estimate(self) -> int:
+        """Примерный объем памяти, занятой товарами, в байтах.
+
+        Размер строк оценивается по первым строкам таблицы, чтобы не
+        перебирать весь склад.
+        """
+        rows = len(self._ids)
+        if not rows:
+            return 0
+        sample = range(min(rows, 100))
+        strings = sum(sys.getsizeof(self._names[row]) + sys.getsizeof(self._updated[row])
+                      for row in sample) / len(sample)
+        # Два массива чисел, четыре ссылки в списках и запись словаря id -> строка
+        per_row = strings + 2 * self._ids.itemsize + 4 * 8 + 64
+        return int(rows * per_row)
+
+    def categories(self) -> List[str]:
+        """Возвращает отсортированный список категорий товаров склада."""
+        return sorted(category for category, count in self._category_counts.items() if count)
+
+    # --- Обновление данных ---
+
+    @staticmethod
+    def _fields(product: dict):
+        category = product.get("category") or ""
+        return (
+            product.get("product_type_id"),
+            sys.intern(category),
+            product["name"],
+            int(product["current_quantity"]),
+            product.get("updated_at") or "",
+        )
+
+    def _append(self, product: dict):
+        type_id, category, name, quantity, updated = self._fields(product)
+        self._row_by_id[product["id"]] = len(self._ids)
+        self._ids.append(product["id"])
+        self._type_ids.append(type_id)
+        self._categories.append(category)
+        self._names.append(name)
+        self._quantities.append(quantity)
+        self._updated.append(updated)
+        self._category_counts[category] += 1
+
+    def _update_row(self, row: int, product: dict) -> bool:
+        """Обновляет строку и возвращает True, если она изменилась."""
+        type_id, category, name, quantity, updated = self._fields(product)
+        if (self._type_ids[row] == type_id and self._categories[row] == category
+                and self._names[row] == name and self._quantities[row] == quantity
+                and self._updated[row] == updated):
+            return False
+        self._category_counts[self._categories[row]] -= 1
+        self._category_counts[category] += 1
+        self._type_ids[row] = type_id
+        self._categories[row] = category
+        self._names[row] = name
+        self._quantities[row] = quantity
+        self._updated[row] = updated
+        return True
+
+    def _emit_row_changes(self, rows: Iterable[int]):
+        """Сообщает представлению об измененных строках непрерывными диапазонами."""
+        last_column = len(COLUMNS) - 1
+        start = previous = None
+        for row in sorted(rows):
+            if start is None:
+                start = previous = row
+            elif row == previous + 1:
+                previous = row
+            else:
+                self.dataChanged.emit(self.index(start, 0), self.index(previous, last_column))
+                start = previous = row
+        if start is not None:
+            self.dataChanged.emit(self.index(start, 0), self.index(previous, last_column))
+
+    def set_products(self, products: List[dict]):
+        """Заменяет содержимое модели списком товаров с сервера.
+
+        Если набор и порядок товаров не изменился, обновляются только
+        изменившиеся строки; иначе модель сбрасывается целиком.
+        """
+        if len(products) == len(self._ids) and all(
+                self._ids[row] == product["id"] for row, product in enumerate(products)):
+            changed = [row for row, product in enumerate(products)
+                       if self._update_row(row, product)]
+            self._emit_row_changes(changed)
+            return
+
+        self.beginResetModel()
+        self._clear_columns()
+        for product in products:
+            self._append(product)
+        self.endResetModel()
+
+    def adjust_quantity(self, product_id: int, delta: int, updated_at: Optional[str] = None) -> bool:
+        """Меняет остаток одного товара на delta без пересчета остальных строк."""
+        row = self._row_by_id.get(product_id)
+        if row is None:
+            return False
+        self._quantities[row] += delta
+        if updated_at is not None:
+            self._updated[row] = updated_at
+        self.dataChanged.emit(self.index(row, QUANTITY_COLUMN), self.index(row, UPDATED_COLUMN))
+        return True
+
+    def upsert_products(self, products: Iterable[dict]):
+        """Обновляет существующие товары и добавляет новые в конец таблицы."""
+        changed = []
+        new_products = {}
+        for product in products:
+            row = self._row_by_id.get(product["id"])
+            if row is None:
+                new_products[product["id"]] = product
+            elif self._update_row(row, product):
+                changed.append(row)
+        self._emit_row_changes(changed)
+
+        if new_products:
+            first = len(self._ids)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_products) - 1)
+            for product in new_products.values():
+                self._append(product)
+            self.endInsertRows()
@@ -0,0 +1,220 @@
+from bisect import bisect_left
+from itertools import islice
+from typing import Iterator, List, Optional
+
+from PyQt6.QtCore import QAbstractListModel, QEvent, QModelIndex, Qt, pyqtSignal
+from PyQt6.QtWidgets import QLineEdit, QListView
+
+from .product_model import NAME_COLUMN, ProductTableModel
+
+
+class ProductNameIndex:
+    """Индекс названий товаров модели для поиска по началу и подстроке.
+
+    Строится при первом поиске, а не при создании, и сбрасывается при
+    любом изменении модели. Поиск по началу названия - двоичный поиск
+    по отсортированным названиям, по подстроке - просмотр, который
+    останавливается, как только набрано нужное число результатов.
+    """
+
+    def __init__(self, source: ProductTableModel):
+        self.source = source
+        self._names: Optional[List[str]] = None
+        source.modelReset.connect(self.invalidate)
+        source.rowsInserted.connect(self.invalidate)
+        source.dataChanged.connect(self._source_data_changed)
+
+    def invalidate(self, *args):
+        self._names = None
+
+    def _source_data_changed(self, top_left, bottom_right, roles=()):
+        # Изменение остатка не затрагивает названия
+        if top_left.column() <= NAME_COLUMN <= bottom_right.column():
+            self.invalidate()
+
+    def _build(self):
+        source = self.source
+        self._names = [source.name(row).lower() for row in range(source.rowCount())]
+        self._sorted_rows = sorted(range(len(self._names)), key=self._names.__getitem__)
+        self._sorted_names = [self._names[row] for row in self._sorted_rows]
+
+    def matches(self, query: str) -> Iterator[int]:
+        """Выдает строки модели: сначала названия, начинающиеся с query, затем содержащие его."""
+        query = query.strip().lower()
+        if not query:
+            return
+        if self._names is None:
+            self._build()
+        names, sorted_names, sorted_rows = self._names, self._sorted_names, self._sorted_rows
+        position = bisect_left(sorted_names, query)
+        while position < len(sorted_names) and sorted_names[position].startswith(query):
+            yield sorted_rows[position]
+            position += 1
+        for row, name in enumerate(names):
+            if query in name and not name.startswith(query):
+                yield row
+
+    def exact(self, text: str) -> List[int]:
+        """Строки товаров, название которых совпадает с text без учета регистра."""
+        text = text.strip().lower()
+        if self._names is None:
+            self._build()
+        position = bisect_left(self._sorted_names, text)
+        rows = []
+        while position < len(self._sorted_names) and self._sorted_names[position] == text:
+            rows.append(self._sorted_rows[position])
+            position += 1
+        return rows
+
+
+class _MatchesModel(QAbstractListModel):
+    """Найденные товары; следующие страницы запрашиваются при прокрутке списка."""
+
+    PAGE_SIZE = 50
+
+    def __init__(self, source: ProductTableModel, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self._rows: List[int] = []
+        self._pending: Optional[Iterator[int]] = None
+
+    def set_matches(self, matches: Optional[Iterator[int]]):
+        self.beginResetModel()
+        self._rows = []
+        self._pending = matches
+        self._rows.extend(self._take(self.PAGE_SIZE))
+        self.endResetModel()
+
+    def _take(self, count: int) -> List[int]:
+        if self._pending is None:
+            return []
+        rows = list(islice(self._pending, count))
+        if len(rows) < count:
+            self._pending = None
+        return rows
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._pending is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        rows = self._take(self.PAGE_SIZE)
+        if rows:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            source = self.source
+            return f"{source.name(row)} ({source.category(row)}) - Остаток: {source.quantity(row)}"
+        if role == Qt.ItemDataRole.UserRole:
+            return self.source.product_id(row)
+        return None
+
+
+class ProductPicker(QLineEdit):
+    """Поле выбора товара склада с подсказками по мере ввода.
+
+    Работает прямо с ProductTableModel окна склада, поэтому не делает
+    запросов и открывается мгновенно при любом размере склада: индекс
+    названий строится при первом вводе, а в списке подсказок создаются
+    только видимые страницы результатов.
+    """
+
+    product_chosen = pyqtSignal(object)   # id выбранного товара
+    VISIBLE_ITEMS = 15
+
+    def __init__(self, products_model: ProductTableModel, parent=None):
+        super().__init__(parent)
+        self.products_model = products_model
+        self.name_index = ProductNameIndex(products_model)
+        self.matches = _MatchesModel(products_model, self)
+        self.selected_id = None
+        self.setPlaceholderText("Начните вводить название товара")
+
+        # Свой список вместо QCompleter: QCompleter сам дочитывает модель
+        # до конца, и ленивая загрузка результатов теряет смысл
+        self.popup = QListView(self)
+        self.popup.setWindowFlags(Qt.WindowType.Popup)
+        self.popup.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+        self.popup.setFocusProxy(self)
+        self.popup.setUniformItemSizes(True)
+        self.popup.setEditTriggers(QListView.EditTrigger.NoEditTriggers)
+        self.popup.setModel(self.matches)
+        self.popup.clicked.connect(self._activated)
+        self.popup.installEventFilter(self)
+
+        self.textEdited.connect(self._text_edited)
+        # После сброса модели найденные номера строк больше не действительны
+        products_model.modelReset.connect(self._source_reset)
+
+    def _text_edited(self, text):
+        self.selected_id = None
+        self.matches.set_matches(self.name_index.matches(text))
+        if self.matches.rowCount():
+            self._show_popup()
+        else:
+            self.popup.hide()
+
+    def _show_popup(self):
+        rows = min(self.matches.rowCount(), self.VISIBLE_ITEMS)
+        height = self.popup.sizeHintForRow(0) * rows + 2 * self.popup.frameWidth()
+        self.popup.setGeometry(0, 0, self.width(), height)
+        self.popup.move(self.mapToGlobal(self.rect().bottomLeft()))
+        self.popup.setCurrentIndex(self.matches.index(0))
+        self.popup.scrollToTop()
+        self.popup.show()
+
+    def _source_reset(self):
+        self.popup.hide()
+        self.matches.set_matches(None)
+
+    def _activated(self, index):
+        self.popup.hide()
+        if not index.isValid():
+            return
+        product_id = index.data(Qt.ItemDataRole.UserRole)
+        row = self.products_model.row_for_id(product_id)
+        if row is None:
+            return
+        self.selected_id = product_id
+        self.setText(self.products_model.name(row))
+        self.product_chosen.emit(product_id)
+
+    def eventFilter(self, watched, event):
+        if watched is not self.popup or event.type() != QEvent.Type.KeyPress:
+            return super().eventFilter(watched, event)
+        key = event.key()
+        if key in (Qt.Key.Key_Up, Qt.Key.Key_Down, Qt.Key.Key_PageUp, Qt.Key.Key_PageDown):
+            return False  # перемещение по списку
+        if key in (Qt.Key.Key_Return, Qt.Key.Key_Enter, Qt.Key.Key_Tab):
+            self._activated(self.popup.currentIndex())
+            if key != Qt.Key.Key_Tab:
+                self.returnPressed.emit()
+            return True
+        if key == Qt.Key.Key_Escape:
+            self.popup.hide()
+            return True
+        # Остальные клавиши продолжают ввод в поле
+        self.event(event)
+        return True
+
+    def product_id(self):
+        """Возвращает id выбранного товара или товара с точно введенным названием."""
+        if self.selected_id is not None and self.products_model.row_for_id(self.selected_id) is not None:
+            return self.selected_id
+        rows = self.name_index.exact(self.text())
+        return self.products_model.product_id(rows[0]) if len(rows) == 1 else None
+
+    def clear(self):
+        super().clear()
+        self.selected_id = None
+        self.popup.hide()
+        self.matches.set_matches(None)
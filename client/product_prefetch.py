@@ -0,0 +1,247 @@
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Dict, List, NamedTuple, Optional
+
+from PyQt6.QtCore import QObject, QTimer
+
+import client_config
+from .auth_session import AuthSession
+from .local_cache import LocalCache
+from .net_stats import get_network_stats
+from .product_sync import ProductSync
+from .workers import TaskGroup
+
+
+class PrefetchedProducts(NamedTuple):
+    products: List[dict]
+    etag: Optional[str]
+    cursor: Optional[str]
+    fetched_at: float       # time.monotonic() момента сверки с сервером
+
+
+class _Collector:
+    """Подставляется вместо task в ProductSync.fetch_all и собирает партии в список.
+
+    Если склад не помещается в бюджет памяти, товары перестают копиться,
+    но загрузка доходит до конца и прогревает LocalCache.
+    """
+
+    def __init__(self, task, limit: int):
+        self.task = task
+        self.limit = limit
+        self.products: Optional[List[dict]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self.task.cancelled
+
+    def report(self, batch):
+        if self.products is None:
+            return
+        self.products.extend(batch.products)
+        if len(self.products) > self.limit:
+            self.products = None
+
+
+def _merge(products: List[dict], changes: List[dict]) -> List[dict]:
+    if changes:
+        rows = {product["id"]: row for row, product in enumerate(products)}
+        for product in changes:
+            row = rows.get(product["id"])
+            if row is None:
+                products.append(product)
+            else:
+                products[row] = product
+    return products
+
+
+class ProductPrefetcher(QObject):
+    """Фоновый прогрев товаров складов, которые вероятно откроют следующими.
+
+    Кандидаты по убыванию приоритета: склад под курсором, недавно
+    открытые и первые PREFETCH_TOP в списке. Прогрев начинается после
+    паузы PREFETCH_IDLE_MS и только пока открыт главный экран;
+    одновременно идет не больше PREFETCH_CONCURRENCY запросов.
+
+    Для склада с сохраненным списком в LocalCache запрашиваются только
+    изменения, иначе список загружается целиком (и попадает в кэш).
+    Готовые списки держатся в памяти в пределах PREFETCH_MAX_PRODUCTS
+    товаров, давно прогретые вытесняются первыми. take() отдает список
+    WarehouseView при открытии склада; counters считают попадания и
+    промахи для настройки параметров.
+    """
+
+    def __init__(self, session: AuthSession, cache: Optional[LocalCache] = None, parent=None):
+        super().__init__(parent)
+        self.session = session
+        self.cache = cache
+        self.tasks = TaskGroup(self)
+        self.counters = Counter()
+        self._warm: "OrderedDict[int, PrefetchedProducts]" = OrderedDict()
+        self._warm_size = 0
+        self._candidates: List[int] = []
+        self._recent = deque(maxlen=client_config.PREFETCH_RECENT)
+        self._queue: List[int] = []
+        self._running: Dict[int, str] = {}
+        self._retained = set()  # склады, открытые в WarehouseView: их товары уже в памяти
+        self._paused = False
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.timeout.connect(self._start_next)
+
+    # --- Кандидаты ---
+
+    def set_candidates(self, warehouse_ids: List[int]):
+        """Обновляет порядок складов из списка на главном экране."""
+        self._candidates = list(warehouse_ids)
+        known = set(warehouse_ids)
+        for warehouse_id in [w for w in self._warm if w not in known]:
+            self._drop(warehouse_id)
+        self._schedule(client_config.PREFETCH_IDLE_MS)
+
+    def hovered(self, warehouse_id: int):
+        """Склад под курсором прогревается раньше остальных."""
+        if warehouse_id in self._queue:
+            self._queue.remove(warehouse_id)
+        self._queue.insert(0, warehouse_id)
+        if not self._paused:
+            self.idle_timer.start(client_config.PREFETCH_HOVER_MS)
+
+    def opened(self, warehouse_id: int):
+        """Пользователь открыл склад: прогрев приостанавливается до возврата на главный экран."""
+        if warehouse_id in self._recent:
+            self._recent.remove(warehouse_id)
+        self._recent.appendleft(warehouse_id)
+        self.pause()
+
+    def retain(self, warehouse_ids):
+        """Склады с открытым видом не прогреваются: вид сверяет товары сам."""
+        self._retained = set(warehouse_ids)
+        for warehouse_id in self._retained:
+            self.invalidate(warehouse_id)
+
+    def pause(self):
+        self._paused = True
+        self.idle_timer.stop()
+
+    def resume(self):
+        self._paused = False
+        self._schedule(client_config.PREFETCH_IDLE_MS)
+
+    def invalidate(self, warehouse_id: int):
+        """Склад изменился: прогретый список больше не актуален."""
+        self._drop(warehouse_id)
+        key = self._running.pop(warehouse_id, None)
+        if key is not None:
+            self.tasks.cancel(key)
+
+    def stop(self):
+        self.idle_timer.stop()
+        self.tasks.cancel_all()
+        self._running.clear()
+        self._warm.clear()
+        self._warm_size = 0
+
+    # --- Выдача ---
+
+    def take(self, warehouse_id: int) -> Optional[PrefetchedProducts]:
+        """Отдает прогретый список склада; повторно он не выдается."""
+        key = self._running.pop(warehouse_id, None)
+        if key is not None:
+            # Окно склада загрузит товары само, фоновый запрос уже не нужен
+            self.tasks.cancel(key)
+            self.counters["cancelled"] += 1
+        prefetched = self._warm.pop(warehouse_id, None)
+        get_network_stats().cache_lookup("prefetch", prefetched is not None)
+        if prefetched is None:
+            self.counters["misses"] += 1
+            return None
+        self._warm_size -= len(prefetched.products)
+        self.counters["hits"] += 1
+        return prefetched
+
+    def hit_rate(self) -> Optional[float]:
+        opened = self.counters["hits"] + self.counters["misses"]
+        return self.counters["hits"] / opened if opened else None
+
+    # --- Прогрев ---
+
+    def _schedule(self, delay_ms: int):
+        self._queue = self._wanted()
+        if self._queue and not self._paused:
+            self.idle_timer.start(delay_ms)
+
+    def _wanted(self) -> List[int]:
+        wanted = [w for w in self._queue  # наведенные ранее
+                  if w in self._candidates and w not in self._retained]
+        for warehouse_id in list(self._recent) + self._candidates[:client_config.PREFETCH_TOP]:
+            if (warehouse_id in self._candidates and warehouse_id not in wanted
+                    and warehouse_id not in self._retained):
+                wanted.append(warehouse_id)
+        return wanted
+
+    def _fresh(self, warehouse_id: int) -> bool:
+        prefetched = self._warm.get(warehouse_id)
+        return prefetched is not None and \
+            time.monotonic() - prefetched.fetched_at <= client_config.PRODUCTS_MAX_AGE
+
+    def _start_next(self):
+        while (not self._paused and self._queue and
+               len(self._running) < client_config.PREFETCH_CONCURRENCY):
+            warehouse_id = self._queue.pop(0)
+            if (warehouse_id in self._running or warehouse_id in self._retained
+                    or self._fresh(warehouse_id)):
+                continue
+            sync = ProductSync(self.session, warehouse_id, self.cache)
+            key = f"prefetch:{warehouse_id}"
+            self._running[warehouse_id] = key
+            self.counters["started"] += 1
+            self.tasks.run(
+                lambda task, sync=sync: self._fetch(task, sync),
+                lambda result, w=warehouse_id: self._fetched(w, result),
+                lambda error, w=warehouse_id: self._failed(w),
+                key=key
+            )
+
+    def _fetch(self, task, sync: ProductSync) -> Optional[PrefetchedProducts]:
+        limit = client_config.PREFETCH_MAX_PRODUCTS
+        cached = sync.load_cached()
+        if cached is not None:
+            sync.restore(cached)
+            result = sync.fetch_changes()
+            if result.response.status_code not in (200, 304):
+                return None
+            if len(cached.products) > limit:
+                return None
+            return PrefetchedProducts(_merge(cached.products, result.products or []),
+                                      result.etag, result.cursor, time.monotonic())
+
+        collector = _Collector(task, limit)
+        result = sync.fetch_all(collector)
+        if result is None or result.response.status_code != 200 or collector.products is None:
+            return None
+        return PrefetchedProducts(collector.products, result.etag, result.cursor, time.monotonic())
+
+    def _fetched(self, warehouse_id: int, prefetched: Optional[PrefetchedProducts]):
+        self._running.pop(warehouse_id, None)
+        if prefetched is not None:
+            self._drop(warehouse_id)
+            self._warm[warehouse_id] = prefetched
+            self._warm_size += len(prefetched.products)
+            self.counters["prefetched"] += 1
+            # Бюджет памяти: вытесняются давно прогретые склады
+            while self._warm_size > client_config.PREFETCH_MAX_PRODUCTS:
+                evicted = next(iter(self._warm))
+                self._drop(evicted)
+                self.counters["evicted"] += 1
+        self._start_next()
+
+    def _failed(self, warehouse_id: int):
+        self._running.pop(warehouse_id, None)
+        self.counters["failed"] += 1
+        self._start_next()
+
+    def _drop(self, warehouse_id: int):
+        prefetched = self._warm.pop(warehouse_id, None)
+        if prefetched is not None:
+            self._warm_size -= len(prefetched.products)
@@ -0,0 +1,160 @@
+from typing import List, NamedTuple, Optional
+
+import requests
+
+from .auth_session import AuthSession
+from .json_stream import NDJSON_CONTENT_TYPE, iter_json_items
+from .local_cache import CachedProducts, LocalCache
+
+FIRST_BATCH_SIZE = 100   # Примерно один экран таблицы
+BATCH_SIZE = 2000
+
+
+class SyncResult(NamedTuple):
+    response: requests.Response
+    products: Optional[List[dict]]  # None - ошибка или данные не изменились
+    full: bool                      # products - полный список, а не изменения
+    etag: Optional[str]
+    cursor: Optional[str]
+
+
+class ProductBatch(NamedTuple):
+    products: List[dict]
+    first: bool              # первая партия заменяет содержимое таблицы
+    loaded: int              # сколько товаров получено с начала загрузки
+    received: int            # получено байт ответа
+    total: Optional[int]     # размер ответа, если сервер его сообщил
+
+
+def _max_updated_at(products: List[dict], cursor: Optional[str] = None) -> Optional[str]:
+    for product in products:
+        updated_at = product.get("updated_at")
+        if updated_at and (cursor is None or updated_at > cursor):
+            cursor = updated_at
+    return cursor
+
+
+class ProductSync:
+    """Инкрементальная синхронизация списка товаров склада.
+
+    Повторные загрузки выполняются условным запросом (If-None-Match) с
+    курсором updated_since - временем последнего известного изменения.
+    Если данные не изменились, сервер отвечает 304 без тела. Если сервер
+    не поддерживает updated_since и вернул весь список, изменения все
+    равно выделяются на клиенте по полю updated_at, чтобы в модель
+    попали только измененные строки.
+
+    Методы fetch_* выполняются в фоновом потоке и не меняют состояние:
+    его фиксирует commit() в потоке GUI после применения результата.
+    Если передан cache, полученные с сервера данные сохраняются в нем,
+    и при следующем открытии склада синхронизация продолжается с
+    сохраненного курсора (load_cached + restore).
+    """
+
+    ACCEPT = f"{NDJSON_CONTENT_TYPE}, application/json"
+
+    def __init__(self, session: AuthSession, warehouse_id: int,
+                 cache: Optional[LocalCache] = None):
+        self.session = session
+        self.warehouse_id = warehouse_id
+        self.cache = cache
+        self.etag: Optional[str] = None
+        self.cursor: Optional[str] = None
+
+    @property
+    def path(self) -> str:
+        return f"/warehouses/{self.warehouse_id}/products"
+
+    @property
+    def synced(self) -> bool:
+        return self.cursor is not None or self.etag is not None
+
+    def load_cached(self, task=None) -> Optional[CachedProducts]:
+        if self.cache is None:
+            return None
+        return self.cache.products(self.session.email, self.warehouse_id)
+
+    def restore(self, cached: CachedProducts):
+        """Продолжает синхронизацию с состояния, сохраненного в кэше."""
+        self.etag = cached.etag
+        self.cursor = cached.cursor
+
+    def _cache(self, method: str, *args):
+        if self.cache is not None:
+            getattr(self.cache, method)(self.session.email, self.warehouse_id, *args)
+
+    def fetch_all(self, task=None) -> Optional[SyncResult]:
+        """Загружает весь список товаров потоком.
+
+        Без task возвращает полный список в SyncResult. С task товары
+        передаются партиями ProductBatch через task.report() по мере
+        разбора ответа, а итоговый SyncResult содержит пустой список
+        изменений. Отмена задачи прерывает загрузку и закрывает
+        соединение; в этом случае возвращается None.
+        """
+        response = self.session.get(self.path, headers={"Accept": self.ACCEPT}, stream=True)
+        with response:
+            if response.status_code != 200:
+                response.content  # тело ошибки читается до закрытия ответа
+                return SyncResult(response, None, True, None, None)
+
+            total = response.headers.get("Content-Length")
+            total = int(total) if total and total.isdigit() else None
+            self._cache("begin_products")
+            products, batch = [], []
+            cursor, loaded, first = None, 0, True
+            batch_size = FIRST_BATCH_SIZE
+            for product in iter_json_items(response):
+                updated_at = product.get("updated_at")
+                if updated_at and (cursor is None or updated_at > cursor):
+                    cursor = updated_at
+                if task is None:
+                    products.append(product)
+                    continue
+                batch.append(product)
+                if len(batch) >= batch_size:
+                    if task.cancelled:
+                        return None
+                    loaded += len(batch)
+                    task.report(ProductBatch(batch, first, loaded, response.raw.tell(), total))
+                    self._cache("append_products", batch)
+                    batch, first, batch_size = [], False, BATCH_SIZE
+
+            etag = response.headers.get("ETag")
+            if task is None:
+                self._cache("append_products", products)
+                self._cache("finish_products", etag, cursor)
+                return SyncResult(response, products, True, etag, cursor)
+            if task.cancelled:
+                return None
+            if batch or first:
+                loaded += len(batch)
+                task.report(ProductBatch(batch, first, loaded, response.raw.tell(), total))
+                self._cache("append_products", batch)
+            self._cache("finish_products", etag, cursor)
+            return SyncResult(response, [], False, etag, cursor)
+
+    def fetch_changes(self, task=None) -> SyncResult:
+        if not self.synced:
+            return self.fetch_all()
+
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        params = {"updated_since": self.cursor} if self.cursor else None
+        response = self.session.get(self.path, headers=headers, params=params)
+        if response.status_code == 304:
+            return SyncResult(response, None, False, self.etag, self.cursor)
+        if response.status_code != 200:
+            return SyncResult(response, None, False, None, None)
+
+        cursor = self.cursor
+        changes = [product for product in response.json()
+                   if cursor is None or (product.get("updated_at") or "") >= cursor]
+        etag, cursor = response.headers.get("ETag"), _max_updated_at(changes, cursor)
+        self._cache("update_products", changes, etag, cursor)
+        return SyncResult(response, changes, False, etag, cursor)
+
+    def commit(self, result: SyncResult):
+        """Запоминает состояние после того, как результат применен к модели."""
+        if result.response.status_code in (200, 304):
+            self.etag = result.etag
+            self.cursor = result.cursor
@@ -0,0 +1,133 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt
+
+import client_config
+from .auth_session import AuthSession, get_session
+from .local_cache import LocalCache, get_local_cache
+
+
+class ProductTypeModel(QAbstractListModel):
+    """Категории товаров для QComboBox и QCompleter: название и id в UserRole."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._types: List[dict] = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._types)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        product_type = self._types[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return product_type["category"]
+        if role == Qt.ItemDataRole.UserRole:
+            return product_type["id"]
+        return None
+
+    def set_types(self, types: List[dict]):
+        # Один сброс модели вместо addItem на каждую категорию
+        self.beginResetModel()
+        self._types = list(types)
+        self.endResetModel()
+
+
+class ProductTypeCatalog:
+    """Категории товаров пользователя, общие для всех окон и диалогов.
+
+    Список хранится в памяти и считается свежим PRODUCT_TYPES_TTL секунд
+    после загрузки с сервера; до этого диалоги берут его без запросов.
+    Созданная категория сразу добавляется в список (и в LocalCache), а
+    invalidate() помечает список устаревшим, если категории могли
+    измениться иначе. Методы можно вызывать из фоновых потоков.
+    """
+
+    def __init__(self, session: AuthSession, cache: Optional[LocalCache] = None):
+        self.session = session
+        self.cache = cache
+        self._lock = threading.Lock()
+        self._types: Optional[List[dict]] = None
+        self._loaded_at: Optional[float] = None
+        self._seeded = False
+
+    @property
+    def email(self) -> str:
+        return self.session.email
+
+    def types(self) -> Optional[List[dict]]:
+        """Возвращает известный список категорий (возможно, устаревший) или None."""
+        with self._lock:
+            if self._types is None and not self._seeded and self.cache is not None:
+                # Список из прошлого запуска показывается, пока идет обновление
+                self._seeded = True
+                self._types = self.cache.product_types(self.email)
+            return None if self._types is None else list(self._types)
+
+    @property
+    def fresh(self) -> bool:
+        with self._lock:
+            return (self._loaded_at is not None and
+                    time.monotonic() - self._loaded_at <= client_config.PRODUCT_TYPES_TTL)
+
+    def fetch(self, task=None) -> List[dict]:
+        """Загружает категории с сервера (в фоновом потоке)."""
+        response = self.session.get("/product-types")
+        if response.status_code != 200:
+            raise ProductTypesError(self.session.api.error_detail(
+                response, "Не удалось загрузить типы товаров"))
+        types = response.json()
+        self.replace(types)
+        return types
+
+    def replace(self, types: List[dict]):
+        """Запоминает список категорий, только что полученный с сервера."""
+        with self._lock:
+            self._types = list(types)
+            self._loaded_at = time.monotonic()
+        if self.cache is not None:
+            self.cache.store_product_types(self.email, types)
+
+    def add(self, product_type: dict):
+        """Добавляет созданную на сервере категорию."""
+        self.add_many([product_type])
+
+    def add_many(self, product_types: List[dict]):
+        """Добавляет созданные на сервере категории одной записью в кэш."""
+        if not product_types:
+            return
+        with self._lock:
+            if self._types is None:
+                self._loaded_at = None
+                return
+            ids = {t["id"] for t in product_types}
+            self._types = [t for t in self._types if t["id"] not in ids]
+            self._types.extend(product_types)
+            types = list(self._types)
+        if self.cache is not None:
+            self.cache.store_product_types(self.email, types)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = None
+
+
+class ProductTypesError(Exception):
+    """Сервер не вернул список категорий."""
+
+
+_catalogs: Dict[str, ProductTypeCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_product_type_catalog(email: str) -> ProductTypeCatalog:
+    """Возвращает общий для процесса каталог категорий пользователя."""
+    with _catalogs_lock:
+        catalog = _catalogs.get(email)
+        if catalog is None:
+            catalog = ProductTypeCatalog(get_session(email), get_local_cache())
+            _catalogs[email] = catalog
+        return catalog
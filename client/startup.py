@@ -0,0 +1,132 @@
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, List, NamedTuple, Optional
+
+from PyQt6.QtCore import QEvent, QObject
+
+import client_config
+
+
+class StartupPhase(NamedTuple):
+    name: str
+    duration: float     # длительность фазы, секунды
+    elapsed: float      # время от запуска процесса до конца фазы, секунды
+    background: bool    # выполнялась в фоновом потоке параллельно с остальными
+
+
+class _FirstPaintFilter(QObject):
+    def __init__(self, profile: "StartupProfile", phase: str, finish: bool):
+        super().__init__()
+        self.profile = profile
+        self.phase = phase
+        self.finish = finish
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.Paint:
+            watched.removeEventFilter(self)
+            self.profile.mark(self.phase)
+            if self.finish:
+                self.profile.finish()
+        return False
+
+
+class StartupProfile:
+    """Замеры фаз запуска клиента: импорт модулей, создание окон, первая отрисовка.
+
+    Фазы потока GUI считаются последовательно от предыдущей отметки,
+    фоновые (предзагрузка модулей) - отдельно и помечаются в отчете.
+    Отчет печатается в stderr при STARTUP_REPORT или аргументе
+    --startup-report; после finish() новые отметки не принимаются.
+    """
+
+    def __init__(self, started: Optional[float] = None, enabled: Optional[bool] = None):
+        self.started = started if started is not None else time.perf_counter()
+        if enabled is None:
+            enabled = client_config.STARTUP_REPORT or "--startup-report" in sys.argv
+        self.enabled = enabled
+        self.phases: List[StartupPhase] = []
+        self.finished = False
+        self._last = self.started
+        self._lock = threading.Lock()
+        self._filters = []
+
+    def mark(self, name: str):
+        """Завершает фазу потока GUI, начатую предыдущей отметкой."""
+        now = time.perf_counter()
+        with self._lock:
+            if self.finished:
+                return
+            self.phases.append(StartupPhase(name, now - self._last, now - self.started, False))
+            self._last = now
+
+    @contextmanager
+    def phase(self, name: str, background: bool = False):
+        """Замеряет блок кода как отдельную фазу."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            now = time.perf_counter()
+            with self._lock:
+                if not self.finished:
+                    self.phases.append(StartupPhase(name, now - start, now - self.started, background))
+                    if not background:
+                        self._last = now
+
+    def watch_first_paint(self, widget, name: str, finish: bool = False):
+        """Отмечает фазу name, когда окно будет отрисовано в первый раз."""
+        if self.finished:
+            return
+        paint_filter = _FirstPaintFilter(self, name, finish)
+        self._filters.append(paint_filter)
+        widget.installEventFilter(paint_filter)
+
+    def preload(self, modules: Iterable[str]):
+        """Импортирует модули в фоне, чтобы первое обращение к ним не ждало импорта."""
+        from .workers import run_detached
+
+        def load(task):
+            for module in modules:
+                if module not in sys.modules:
+                    with self.phase(f"импорт {module}", background=True):
+                        importlib.import_module(module)
+
+        run_detached(load)
+
+    def finish(self):
+        with self._lock:
+            if self.finished:
+                return
+            self.finished = True
+        self._filters = []
+        if self.enabled:
+            print(self.report(), file=sys.stderr)
+
+    def report(self) -> str:
+        lines = ["Запуск клиента, мс:", f"  {'фаза':<44}{'длительность':>14}{'от запуска':>12}"]
+        for phase in self.phases:
+            name = phase.name + (" (фон)" if phase.background else "")
+            lines.append(f"  {name:<44}{phase.duration * 1000:>14.1f}{phase.elapsed * 1000:>12.1f}")
+        return "\n".join(lines)
+
+
+_startup_profile: Optional[StartupProfile] = None
+
+
+def start_profile(started: float) -> StartupProfile:
+    """Начинает замер запуска; started - момент запуска client_main."""
+    global _startup_profile
+    _startup_profile = StartupProfile(started)
+    return _startup_profile
+
+
+def get_startup_profile() -> StartupProfile:
+    """Возвращает замер текущего запуска (завершенный, если запуск уже прошел)."""
+    global _startup_profile
+    if _startup_profile is None:
+        _startup_profile = StartupProfile(enabled=False)
+        _startup_profile.finished = True
+    return _startup_profile
@@ -1,45 +1,306 @@
+import atexit
 import json
 import os
-from typing import Optional, Dict
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import client_config
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+KEYRING_SERVICE = "warehouse-client"
+_CHANGE_CHECK_INTERVAL = 1.0  # Как часто проверять, не изменил ли файл другой экземпляр, секунды
+
+
+def _load_keyring():
+    try:
+        import keyring
+        import keyring.errors
+    except ImportError:
+        return None
+    return keyring
+
+
+def _apply(records: Dict[str, dict], changes: Dict[str, Optional[dict]]):
+    for email, record in changes.items():
+        if record is None:
+            records.pop(email, None)
+        else:
+            records[email] = record
+
 
 class TokenStorage:
-    def __init__(self, storage_file: str = "user_tokens.json"):
-        self.storage_file = storage_file
-        self.tokens: Dict[str, dict] = self._load_tokens()
+    """Токены пользователей, общие для всего процесса (см. get_token_storage).
+
+    Файл читается при первом обращении, а затем только если его изменил
+    другой экземпляр клиента. Изменения хранятся в памяти и записываются
+    не чаще раза в TOKEN_SAVE_DELAY секунд: под блокировкой файла он
+    перечитывается, к нему применяются только свои изменения, и результат
+    записывается во временный файл с fsync и переименованием. Поэтому
+    несколько клиентов на одной машине не затирают токены друг друга,
+    а сбой во время записи не оставляет файл наполовину записанным.
 
-    def _load_tokens(self) -> Dict[str, dict]:
-        if os.path.exists(self.storage_file):
+    Если включен TOKEN_KEYRING и установлен пакет keyring, токены хранятся
+    в системном хранилище паролей, а в файле остаются только email и срок
+    действия токена.
+    """
+
+    def __init__(self, storage_file: Optional[str] = None, use_keyring: Optional[bool] = None):
+        self.storage_file = storage_file or client_config.TOKEN_FILE
+        if use_keyring is None:
+            use_keyring = client_config.TOKEN_KEYRING
+        self.keyring = _load_keyring() if use_keyring else None
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._records: Optional[Dict[str, dict]] = None  # None - файл еще не прочитан
+        self._changes: Dict[str, Optional[dict]] = {}     # email -> новая запись, None - удалить
+        self._secrets: Dict[str, tuple] = {}              # email -> (stamp записи, токены из keyring)
+        self._signature = None
+        self._checked_at = 0.0
+        self._timer: Optional[threading.Timer] = None
+        atexit.register(self.flush)
+
+    # --- Файл ---
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.storage_file)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_file(self) -> Dict[str, dict]:
+        try:
+            with open(self.storage_file, 'r') as f:
+                records = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            # Поврежденный файл: сохраненные сессии потеряны, вход потребуется заново
+            return {}
+        return records if isinstance(records, dict) else {}
+
+    def _write_file(self, records: Dict[str, dict]):
+        directory = os.path.dirname(os.path.abspath(self.storage_file))
+        # mkstemp создает файл с правами 0600: токены не видны другим пользователям
+        fd, temp_path = tempfile.mkstemp(
+            dir=directory, prefix=os.path.basename(self.storage_file) + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(records, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.storage_file)
+        except BaseException:
             try:
-                with open(self.storage_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-
-    def _save_tokens(self):
-        with open(self.storage_file, 'w') as f:
-            json.dump(self.tokens, f)
-
-    def store_tokens(self, email: str, access_token: str, refresh_token: str):
-        self.tokens[email] = {
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    @contextmanager
+    def _file_lock(self):
+        """Блокировка файла между процессами на время чтения-изменения-записи."""
+        with open(self.storage_file + ".lock", 'a+') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                else:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _load(self):
+        """Читает файл при первом обращении и после изменения другим экземпляром."""
+        now = time.monotonic()
+        if self._records is not None and now - self._checked_at < _CHANGE_CHECK_INTERVAL:
+            return
+        self._checked_at = now
+        signature = self._stat()
+        if self._records is not None and signature == self._signature:
+            return
+        records = self._read_file()
+        # Еще не записанные изменения новее прочитанного файла
+        _apply(records, self._changes)
+        self._records = records
+        self._signature = signature
+
+    def flush(self):
+        """Записывает накопленные изменения на диск.
+
+        Запись идет без блокировки данных в памяти, поэтому чтение токенов
+        другими потоками не ждет fsync.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._changes:
+                    return
+                changes, self._changes = self._changes, {}
+            try:
+                with self._file_lock():
+                    records = self._read_file()
+                    _apply(records, changes)
+                    self._write_file(records)
+                    signature = self._stat()
+            except OSError:
+                # Изменения остаются в памяти и попадут в файл при следующей записи
+                with self._lock:
+                    changes.update(self._changes)
+                    self._changes = changes
+                return
+            with self._lock:
+                # Изменения, сделанные во время записи, новее записанного файла
+                _apply(records, self._changes)
+                self._records = records
+                self._signature = signature
+                self._checked_at = time.monotonic()
+
+    def _schedule_flush(self):
+        if self._timer is None:
+            self._timer = threading.Timer(client_config.TOKEN_SAVE_DELAY, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _change(self, email: str, record: Optional[dict]):
+        self._load()
+        if record is None:
+            self._records.pop(email, None)
+        else:
+            self._records[email] = record
+        self._changes[email] = record
+
+    # --- Системное хранилище паролей ---
+
+    def _keyring_store(self, email: str, tokens: dict) -> bool:
+        try:
+            self.keyring.set_password(KEYRING_SERVICE, email, json.dumps(
+                {"access_token": tokens["access_token"], "refresh_token": tokens["refresh_token"]}))
+        except self.keyring.errors.KeyringError:
+            return False
+        return True
+
+    def _keyring_tokens(self, email: str, record: dict) -> Optional[dict]:
+        cached = self._secrets.get(email)
+        if cached is None or cached[0] != record.get("stamp"):
+            try:
+                secret = self.keyring.get_password(KEYRING_SERVICE, email)
+            except self.keyring.errors.KeyringError:
+                secret = None
+            if secret is None:
+                return None
+            try:
+                cached = (record.get("stamp"), json.loads(secret))
+            except ValueError:
+                return None
+            self._secrets[email] = cached
+        return dict(cached[1], expires_at=record.get("expires_at"))
+
+    def _keyring_delete(self, email: str):
+        self._secrets.pop(email, None)
+        if self.keyring is None:
+            return
+        try:
+            self.keyring.delete_password(KEYRING_SERVICE, email)
+        except self.keyring.errors.KeyringError:
+            pass
+
+    # --- Токены ---
+
+    def store_tokens(self, email: str, access_token: str, refresh_token: str,
+                     expires_at: Optional[float] = None):
+        tokens = {
             "access_token": access_token,
-            "refresh_token": refresh_token
+            "refresh_token": refresh_token,
+            "expires_at": expires_at
         }
-        self._save_tokens()
+        with self._lock:
+            record = tokens
+            if self.keyring is not None and self._keyring_store(email, tokens):
+                # stamp меняется при каждом обновлении, чтобы другие экземпляры
+                # перечитали токены из keyring
+                record = {"keyring": True, "stamp": uuid.uuid4().hex, "expires_at": expires_at}
+                self._secrets[email] = (record["stamp"], tokens)
+            self._change(email, record)
+            self._schedule_flush()
 
     def get_tokens(self, email: str) -> Optional[dict]:
-        return self.tokens.get(email)
+        with self._lock:
+            self._load()
+            record = self._records.get(email)
+            if record is None:
+                return None
+            if record.get("keyring"):
+                if self.keyring is None:
+                    return None
+                return self._keyring_tokens(email, record)
+            return dict(record)
 
     def clear_tokens(self, email: str):
-        if email in self.tokens:
-            del self.tokens[email]
-            self._save_tokens()
+        with self._lock:
+            self._load()
+            if email not in self._records:
+                return
+            self._change(email, None)
+            self._keyring_delete(email)
+            self._schedule_flush()
 
     def clear_all(self):
-        self.tokens = {}
-        if os.path.exists(self.storage_file):
-            os.remove(self.storage_file)
+        with self._lock:
+            self._load()
+            for email in self._records:
+                self._keyring_delete(email)
+            self._records = {}
+            self._changes = {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            with self._file_lock():
+                try:
+                    os.remove(self.storage_file)
+                except FileNotFoundError:
+                    pass
+            self._signature = None
+
+    def emails(self) -> List[str]:
+        """Возвращает email пользователей с сохраненными токенами."""
+        with self._lock:
+            self._load()
+            return list(self._records)
 
     def get_all_tokens(self) -> Dict[str, dict]:
         """Возвращает все сохраненные токены."""
-        return self.tokens.copy()  # Возвращаем копию для безопасности 
\ No newline at end of file
+        with self._lock:
+            self._load()
+            tokens = {email: self.get_tokens(email) for email in self._records}
+        return {email: value for email, value in tokens.items() if value is not None}
+
+
+_token_storage: Optional[TokenStorage] = None
+_token_storage_lock = threading.Lock()
+
+
+def get_token_storage() -> TokenStorage:
+    """Возвращает общий для процесса экземпляр TokenStorage."""
+    global _token_storage
+    if _token_storage is None:
+        with _token_storage_lock:
+            if _token_storage is None:
+                _token_storage = TokenStorage()
+    return _token_storage
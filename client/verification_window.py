@@ -1,15 +1,17 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout,
                             QLabel, QPushButton, QLineEdit, QMessageBox)
 from PyQt6.QtCore import Qt, QTimer
-import requests
-import client_config as client_config
-from client.token_storage import TokenStorage
+from client.api_client import get_api_client
+from client.auth_session import get_session_manager, token_expiry
+from client.workers import TaskGroup
 
 class VerificationWindow(QMainWindow):
     def __init__(self, email):
         super().__init__()
         self.email = email
-        self.token_storage = TokenStorage()
+        self.token_storage = get_session_manager().token_storage
+        self.api = get_api_client()
+        self.tasks = TaskGroup(self)
         self.remaining_time = 300  # 5 минут в секундах
         self.resend_cooldown = 60  # 60 секунд задержка
         self.initUI()
@@ -41,9 +43,9 @@ class VerificationWindow(QMainWindow):
         layout.addWidget(self.timer_label)
 
         # Кнопки
-        verify_button = QPushButton("Подтвердить")
-        verify_button.clicked.connect(self.verify_code)
-        layout.addWidget(verify_button)
+        self.verify_button = QPushButton("Подтвердить")
+        self.verify_button.clicked.connect(self.verify_code)
+        layout.addWidget(self.verify_button)
 
         self.resend_button = QPushButton("Отправить код повторно")
         self.resend_button.clicked.connect(self.resend_code)
@@ -85,41 +87,54 @@ class VerificationWindow(QMainWindow):
 
     def verify_code(self):
         code = self.code_input.text()
-        try:
-            response = requests.post(f'{client_config.SERVER_URL}/verify',
-                                   json={'email': self.email, 'code': code})
-            
-            if response.status_code == 200:
-                data = response.json()
-                self.token_storage.store_tokens(
-                    self.email,
-                    data['access_token'],
-                    data['refresh_token']
-                )
-                print(f"Код подтвержден для пользователя {self.email}")
-                self.open_main_window(self.email)
-            else:
-                error_data = response.json()
-                error_message = error_data.get("detail", "Неверный код подтверждения")
-                QMessageBox.warning(self, 'Ошибка', error_message)
-        except:
-            QMessageBox.warning(self, 'Ошибка', 'Ошибка подключения к серверу')
+        self.verify_button.setEnabled(False)
+        self.tasks.run(
+            lambda task: self.api.post('/verify',
+                                       json={'email': self.email, 'code': code}),
+            self.verify_finished,
+            self.connection_failed
+        )
+
+    def verify_finished(self, response):
+        self.verify_button.setEnabled(True)
+        if response.status_code == 200:
+            data = response.json()
+            self.token_storage.store_tokens(
+                self.email,
+                data['access_token'],
+                data['refresh_token'],
+                token_expiry(data)
+            )
+            self.open_main_window(self.email)
+        else:
+            error_message = self.api.error_detail(response, "Неверный код подтверждения")
+            QMessageBox.warning(self, 'Ошибка', error_message)
 
     def resend_code(self):
-        try:
-            response = requests.post(f'{client_config.SERVER_URL}/login',
-                                   json={'email': self.email, 'password': ''})
-            if response.status_code == 200:
-                QMessageBox.information(self, 'Успех', 'Новый код отправлен')
-                self.remaining_time = 300  # Сбрасываем таймер кода
-                self.startCodeTimer()
-                self.disableResendButton()
-            else:
-                error_data = response.json()
-                error_message = error_data.get("detail", "Ошибка отправки кода")
-                QMessageBox.warning(self, 'Ошибка', error_message)
-        except:
-            QMessageBox.warning(self, 'Ошибка', 'Ошибка подключения к серверу')
+        self.resend_button.setEnabled(False)
+        self.tasks.run(
+            lambda task: self.api.post('/login',
+                                       json={'email': self.email, 'password': ''}),
+            self.resend_finished,
+            self.connection_failed
+        )
+
+    def resend_finished(self, response):
+        if response.status_code == 200:
+            QMessageBox.information(self, 'Успех', 'Новый код отправлен')
+            self.remaining_time = 300  # Сбрасываем таймер кода
+            self.startCodeTimer()
+            self.disableResendButton()
+        else:
+            self.resend_button.setEnabled(True)
+            error_message = self.api.error_detail(response, "Ошибка отправки кода")
+            QMessageBox.warning(self, 'Ошибка', error_message)
+
+    def connection_failed(self, error):
+        self.verify_button.setEnabled(True)
+        if not self.cooldown_timer.isActive():
+            self.resend_button.setEnabled(True)
+        QMessageBox.warning(self, 'Ошибка', 'Ошибка подключения к серверу')
 
     def open_main_window(self, email):
         # Импортируем здесь для избежания циклического импорта
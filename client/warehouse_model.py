@@ -0,0 +1,101 @@
+from typing import Dict, List, Optional
+
+from PyQt6.QtCore import QAbstractListModel, QModelIndex, Qt
+
+
+class WarehouseListModel(QAbstractListModel):
+    """Модель списка складов пользователя.
+
+    Строка хранит весь словарь склада с сервера, идентификатор доступен
+    через UserRole, а склад по id находится без перебора строк. Склады с
+    одинаковыми названиями различаются по id.
+
+    set_warehouses() сравнивает новый список с текущим и сообщает
+    представлению только об удаленных, добавленных и переименованных
+    строках, поэтому выделение и прокрутка при обновлении сохраняются.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._warehouses: List[dict] = []
+        self._row_by_id: Dict[int, int] = {}
+
+    # --- QAbstractListModel ---
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._warehouses)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        warehouse = self._warehouses[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return warehouse['name']
+        if role == Qt.ItemDataRole.UserRole:
+            return warehouse['id']
+        return None
+
+    # --- Доступ к складам ---
+
+    def warehouse(self, row: int) -> dict:
+        return self._warehouses[row]
+
+    def warehouse_by_id(self, warehouse_id: int) -> Optional[dict]:
+        row = self._row_by_id.get(warehouse_id)
+        return None if row is None else self._warehouses[row]
+
+    def row_for_id(self, warehouse_id: int) -> Optional[int]:
+        return self._row_by_id.get(warehouse_id)
+
+    def warehouses(self) -> List[dict]:
+        return list(self._warehouses)
+
+    # --- Изменение ---
+
+    def set_warehouses(self, warehouses: List[dict]):
+        """Приводит список к warehouses, изменяя только отличающиеся строки."""
+        ids = {warehouse['id'] for warehouse in warehouses}
+        for row in reversed(range(len(self._warehouses))):
+            if self._warehouses[row]['id'] not in ids:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self._warehouses[row]
+                self.endRemoveRows()
+        self._index()
+
+        # Порядок оставшихся складов изменился: проще перестроить список целиком
+        remaining = [warehouse['id'] for warehouse in warehouses if warehouse['id'] in self._row_by_id]
+        if remaining != [warehouse['id'] for warehouse in self._warehouses]:
+            self.beginResetModel()
+            self._warehouses = [dict(warehouse) for warehouse in warehouses]
+            self._index()
+            self.endResetModel()
+            return
+
+        for row, warehouse in enumerate(warehouses):
+            if row < len(self._warehouses) and self._warehouses[row]['id'] == warehouse['id']:
+                if self._warehouses[row] != warehouse:
+                    self._warehouses[row] = dict(warehouse)
+                    index = self.index(row)
+                    self.dataChanged.emit(index, index)
+            else:
+                self.beginInsertRows(QModelIndex(), row, row)
+                self._warehouses.insert(row, dict(warehouse))
+                self.endInsertRows()
+        self._index()
+
+    def add_warehouse(self, warehouse: dict):
+        """Добавляет созданный склад в конец списка или обновляет существующий."""
+        row = self._row_by_id.get(warehouse['id'])
+        if row is not None:
+            self._warehouses[row] = dict(warehouse)
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+            return
+        row = len(self._warehouses)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._warehouses.append(dict(warehouse))
+        self._row_by_id[warehouse['id']] = row
+        self.endInsertRows()
+
+    def _index(self):
+        self._row_by_id = {warehouse['id']: row for row, warehouse in enumerate(self._warehouses)}
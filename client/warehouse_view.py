@@ -1,166 +1,354 @@
+import sqlite3
+import time
+
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QPushButton, QTableWidget, QTableWidgetItem, QLabel,
-                             QLineEdit, QComboBox, QSpinBox, QDialog, QMessageBox)
-from PyQt6.QtCore import Qt
-import requests
-from .token_storage import TokenStorage
+                             QPushButton, QTableView, QHeaderView, QLabel,
+                             QLineEdit, QComboBox, QSpinBox, QDialog, QMessageBox,
+                             QProgressBar, QCompleter, QTableWidget, QTableWidgetItem,
+                             QFileDialog, QListWidget)
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QColor
 import client_config
+from .api_client import network_error_message
+from .auth_session import SessionExpiredError, get_session
+from .live_updates import LiveUpdates
+from .local_cache import get_local_cache
+from .movement_outbox import get_movement_outbox
+from .net_stats import get_network_stats
+from .pending_movements import PendingMovements
+from .product_export import ProductExport, ProductExportError
+from .product_filter import ProductFilter
+from .product_import import ProductImport, ProductImportError
+from .product_model import ProductTableModel
+from .product_picker import ProductPicker
+from .product_sync import ProductSync
+from .product_types import ProductTypeModel, get_product_type_catalog
+from .workers import TaskGroup
 
 class WarehouseView(QWidget):
-    def __init__(self, warehouse_id, warehouse_name, email, parent=None):
+    SEARCH_DEBOUNCE_MS = 150  # Пауза ввода, после которой применяется поиск
+
+    def __init__(self, warehouse_id, warehouse_name, email, parent=None, prefetched=None):
         super().__init__(parent)
         self.warehouse_id = warehouse_id
         self.warehouse_name = warehouse_name
         self.email = email
-        self.token_storage = TokenStorage()
+        self.session = get_session(email)
+        self.tasks = TaskGroup(self)
+        self.products_model = ProductTableModel(self)
+        self.product_filter = ProductFilter(self.products_model, self)
+        self.product_sync = ProductSync(self.session, warehouse_id, get_local_cache())
+        self.synced_at = None  # когда товары последний раз сверялись с сервером
+        self.full_load = None  # идущая загрузка полного списка товаров
+        self.sync_after_load = False
+        self.outbox = get_movement_outbox(email)
+        # Движения из очереди сразу видны в таблице и сверяются по ответу сервера
+        self.pending_movements = PendingMovements(self.products_model)
+        self.pending_movements.track(self.outbox.pending(warehouse_id))
+        self.outbox.changed.connect(self.outbox_changed)
+        self.outbox.queued.connect(self.movements_queued)
+        self.outbox.settled.connect(self.movements_settled)
+        # Изменения других рабочих мест приходят потоком событий после первой сверки с сервером
+        self.live = LiveUpdates(self.session, warehouse_id, self)
+        self.live.changed.connect(self.live_changed)
+        self.live.connected.connect(self.live_connected)
+        self.live.poll.connect(self.live_poll)
         self.setup_ui()
-        # Проверяем доступ при инициализации
-        if not self.check_access():
-            self.go_back()
+        self.update_pending_label()
+        # Сначала показываем прогретые или сохраненные товары, затем сверяем их с сервером
+        if prefetched is not None:
+            self.show_prefetched(prefetched)
+        else:
+            self.load_cached_products()
+
+    def show_prefetched(self, prefetched):
+        """Показывает товары, загруженные заранее на главном экране"""
+        self.products_model.set_products(self.pending_movements.overlay(prefetched.products))
+        self.product_sync.restore(prefetched)
+        self.synced_at = prefetched.fetched_at
+        self.update_categories()
+        self.live.start()
+        # Недавно сверенный с сервером список не запрашивается повторно
+        self.revalidate()
+
+    def load_cached_products(self):
+        """Показывает товары из локального кэша, пока идет обращение к серверу"""
+        self.set_loading(True, "Загрузка товаров...")
+        self.tasks.run(
+            self.product_sync.load_cached,
+            self.cached_products_loaded,
+            lambda error: self.refresh_products(),
+            key="products"
+        )
+
+    def cached_products_loaded(self, cached):
+        get_network_stats().cache_lookup("local", cached is not None)
+        if cached is not None:
+            self.products_model.set_products(self.pending_movements.overlay(cached.products))
+            self.product_sync.restore(cached)
+            self.update_categories()
+            self.set_loading(False)
+        self.refresh_products()
+
+    def refresh_products(self):
+        """Загружает товары склада; тот же запрос проверяет доступ к складу.
+
+        Если список уже есть в кэше, запрашиваются только изменения,
+        иначе список загружается целиком и первая партия сразу
+        заполняет таблицу.
+        """
+        if self.product_sync.synced:
+            self.sync_products()
+        else:
+            self.load_products()
+
+    def revalidate(self):
+        """Сверяет товары с сервером при повторном показе склада.
+
+        Свежий список (PRODUCTS_MAX_AGE) не запрашивается, прерванная
+        загрузка начинается заново, иначе запрашиваются только изменения.
+        """
+        if self.tasks.busy or self.live.is_connected:
+            return  # при подключенном потоке событий список и так актуален
+        if (self.product_sync.synced and self.synced_at is not None and
+                time.monotonic() - self.synced_at <= client_config.PRODUCTS_MAX_AGE):
             return
-        self.load_products()
+        self.refresh_products()
 
-    def check_access(self):
-        """Проверяет доступ к складу"""
-        headers = self.get_auth_headers()
-        if not headers:
-            return False
+    def memory_estimate(self) -> int:
+        return self.products_model.memory_estimate()
 
-        try:
-            response = requests.get(
-                f"{client_config.SERVER_URL}/warehouses/{self.warehouse_id}/products",
-                headers=headers,
-                timeout=client_config.API_TIMEOUT
-            )
-            return response.status_code == 200
-        except:
-            return False
-
-    def get_auth_headers(self):
-        """Получает заголовки авторизации с автоматическим обновлением токена"""
-        tokens = self.token_storage.get_tokens(self.email)
-        if not tokens:
-            QMessageBox.warning(self, "Ошибка", "Токены не найдены")
-            self.go_back()
-            return None
+    def access_denied(self):
+        """Склад удален или недоступен пользователю"""
+        self.set_loading(False)
+        # Главное окно закроет склад и обновит список складов
+        main_window = self.window()
+        if isinstance(main_window, QMainWindow):
+            main_window.warehouse_unavailable(self.warehouse_id)
+        self.go_back()
 
-        headers = {"Authorization": f"Bearer {tokens['access_token']}"}
-        
-        try:
-            response = requests.get(
-                f"{client_config.SERVER_URL}/test-auth",
-                headers=headers,
-                timeout=client_config.API_TIMEOUT
-            )
-            if response.status_code == 200:
-                return headers
-            
-            # Если токен истек, пробуем обновить
-            response = requests.post(
-                f"{client_config.SERVER_URL}/refresh-token",
-                json={"current_refresh_token": tokens["refresh_token"]},
-                timeout=client_config.API_TIMEOUT
-            )
-            if response.status_code == 200:
-                data = response.json()
-                self.token_storage.store_tokens(
-                    self.email,
-                    data["access_token"],
-                    data["refresh_token"]
-                )
-                return {"Authorization": f"Bearer {data['access_token']}"}
-            else:
-                QMessageBox.warning(self, "Ошибка", "Сессия истекла")
-                if self.parent():
-                    self.parent().logout()
-                return None
-        except requests.exceptions.Timeout:
-            QMessageBox.warning(self, "Ошибка", "Сервер не отвечает")
-            return None
-        except requests.exceptions.ConnectionError:
-            QMessageBox.warning(self, "Ошибка", "Не удалось подключиться к серверу")
-            return None
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Ошибка проверки сессии: {str(e)}")
-            return None
+    def session_expired(self):
+        """Сообщает об истечении сессии и возвращает к окну входа"""
+        QMessageBox.warning(self, "Ошибка", "Сессия истекла")
+        main_window = self.window()
+        if isinstance(main_window, QMainWindow):
+            main_window.logout()
+
+    def stop(self):
+        """Отменяет запросы и подписку на события, когда склад закрывается"""
+        self.tasks.cancel_all()
+        self.live.stop()
 
     def go_back(self):
         """Возвращает на главный экран"""
+        self.tasks.cancel_all()
         # Ищем главное окно в иерархии родителей
         main_window = self.window()
         if isinstance(main_window, QMainWindow):
             main_window.show_main_screen()
 
+    def set_loading(self, loading, message=""):
+        """Показывает состояние загрузки вместо заблокированного окна"""
+        self.loading_label.setText(message if loading else "")
+        self.control_widget.setEnabled(not loading)
+        self.products_table.setEnabled(not loading)
+        if not loading:
+            self.progress_bar.hide()
+
     def load_products(self):
-        headers = self.get_auth_headers()
-        if not headers:
-            self.go_back()
+        """Загружает полный список товаров склада потоком, по частям"""
+        self.set_loading(True, "Загрузка товаров...")
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.show()
+        self.sync_after_load = False
+        self.full_load = self.tasks.run(
+            self.product_sync.fetch_all,
+            self.full_products_loaded,
+            self.products_failed,
+            self.products_batch_loaded,
+            key="products"
+        )
+
+    def products_batch_loaded(self, batch):
+        # Первая партия показывается сразу, остальные дописываются в конец таблицы
+        products = self.pending_movements.overlay(batch.products)
+        if batch.first:
+            self.products_model.set_products(products)
+            self.control_widget.setEnabled(True)
+            self.products_table.setEnabled(True)
+        else:
+            self.products_model.upsert_products(products)
+        self.loading_label.setText(f"Загружено товаров: {batch.loaded}...")
+        if batch.total:
+            self.progress_bar.setRange(0, batch.total)
+            self.progress_bar.setValue(min(batch.received, batch.total))
+
+    def sync_products(self):
+        """Загружает только изменения товаров с момента прошлой загрузки"""
+        if self.full_load is not None and not self.full_load.cancelled:
+            # Таблица доступна с первой партии: изменения запрашиваются после
+            # загрузки полного списка, а не прерывают ее
+            self.sync_after_load = True
             return
-            
-        try:
-            response = requests.get(
-                f"{client_config.SERVER_URL}/warehouses/{self.warehouse_id}/products",
-                headers=headers,
-                timeout=client_config.API_TIMEOUT
-            )
-            if response.status_code == 200:
-                products = response.json()
-                self.update_products_table(products)
-                self.update_categories(products)
-            else:
-                QMessageBox.warning(self, "Ошибка", f"Не удалось загрузить список товаров: {response.text}")
+        self.loading_label.setText("Обновление...")
+        self.tasks.run(
+            self.product_sync.fetch_changes,
+            self.products_loaded,
+            self.sync_failed,
+            key="products"
+        )
+
+    def full_products_loaded(self, result):
+        self.full_load = None
+        self.products_loaded(result)
+        if self.sync_after_load:
+            self.sync_after_load = False
+            if self.product_sync.synced:
+                self.sync_products()
+
+    def products_loaded(self, result):
+        self.set_loading(False)
+        if result is None:
+            return
+        if result.response.status_code == 304:
+            self.synced_at = time.monotonic()
+            self.live.start()
+            return
+        if result.response.status_code in (403, 404):
+            self.access_denied()
+            return
+        if result.products is None:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось загрузить список товаров: {result.response.text}")
+            if result.full:
                 self.go_back()
-        except requests.exceptions.Timeout:
-            QMessageBox.warning(self, "Ошибка", "Сервер не отвечает")
-            self.go_back()
-        except requests.exceptions.ConnectionError:
-            QMessageBox.warning(self, "Ошибка", "Не удалось подключиться к серверу")
-            self.go_back()
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Ошибка при загрузке товаров: {str(e)}")
+            return
+
+        products = self.pending_movements.overlay(result.products)
+        if result.full:
+            self.products_model.set_products(products)
+        else:
+            self.products_model.upsert_products(products)
+        self.product_sync.commit(result)
+        self.synced_at = time.monotonic()
+        self.update_categories()
+        self.live.start()
+
+    def products_failed(self, error):
+        self.full_load = None
+        self.sync_after_load = False
+        self.set_loading(False)
+        if isinstance(error, SessionExpiredError):
+            self.session_expired()
+        else:
+            QMessageBox.warning(self, "Ошибка", network_error_message(error, "Ошибка при загрузке товаров"))
             self.go_back()
 
-    def update_products_table(self, products):
-        self.products_table.setRowCount(len(products))
-        for row, product in enumerate(products):
-            self.products_table.setItem(row, 0, QTableWidgetItem(product["category"]))
-            self.products_table.setItem(row, 1, QTableWidgetItem(product["name"]))
-            self.products_table.setItem(row, 2, QTableWidgetItem(str(product["current_quantity"])))
-            self.products_table.setItem(row, 3, QTableWidgetItem(product["updated_at"]))
+    def sync_failed(self, error):
+        # Уже загруженные товары остаются на экране
+        self.set_loading(False)
+        if isinstance(error, SessionExpiredError):
+            self.session_expired()
+        else:
+            QMessageBox.warning(self, "Ошибка", network_error_message(error, "Ошибка при обновлении товаров"))
+
+    def outbox_changed(self, warehouse_id):
+        if warehouse_id == self.warehouse_id:
+            self.update_pending_label()
+
+    def movements_queued(self, warehouse_id, entries):
+        if warehouse_id == self.warehouse_id:
+            self.pending_movements.track(entries)
+
+    def movements_settled(self, warehouse_id, outcomes):
+        # Остатки берутся из ответов сервера; дельта-запрос нужен, только если их там нет
+        if warehouse_id != self.warehouse_id:
+            return
+        if not self.pending_movements.settle(outcomes) and self.product_sync.synced:
+            self.sync_products()
 
-    def update_categories(self, products):
-        categories = set(product["category"] for product in products)
+    def live_changed(self, products, movement_keys):
+        # Пачка событий за кадр применяется одним обновлением модели
+        self.pending_movements.confirm(movement_keys)
+        if products:
+            categories = self.products_model.categories()
+            self.products_model.upsert_products(self.pending_movements.overlay(products))
+            self.synced_at = time.monotonic()
+            # Товар другого рабочего места мог добавить категорию в фильтр
+            if self.products_model.categories() != categories:
+                self.update_categories()
+
+    def live_connected(self):
+        # События, случившиеся до подключения, забираем дельта-запросом
+        if self.product_sync.synced and not self.tasks.busy:
+            self.sync_products()
+
+    def live_poll(self):
+        # Поток событий недоступен: видимый склад опрашивается дельта-запросами
+        if self.isVisible() and self.product_sync.synced and not self.tasks.busy:
+            self.sync_products()
+
+    def update_pending_label(self):
+        pending = self.outbox.pending_count(self.warehouse_id)
+        text = f"Ожидают отправки: {pending}" if pending else ""
+        if not self.outbox.store.durable:
+            text = ". ".join(filter(None, [text, "Очередь движений не сохраняется на диск"]))
+        self.pending_label.setText(text)
+
+    def update_categories(self):
+        # Сигналы блокируются, чтобы фильтр не пересчитывался на каждый пункт списка
+        selected = self.category_filter.currentText()
+        self.category_filter.blockSignals(True)
         self.category_filter.clear()
         self.category_filter.addItem("Все категории")
-        self.category_filter.addItems(sorted(categories))
+        self.category_filter.addItems(self.products_model.categories())
+        index = self.category_filter.findText(selected)
+        self.category_filter.setCurrentIndex(max(index, 0))
+        self.category_filter.blockSignals(False)
+        if index < 0 and selected != "Все категории":
+            self.filter_products()
 
     def filter_products(self):
-        search_text = self.search_input.text().lower()
-        category = self.category_filter.currentText()
-        
-        for row in range(self.products_table.rowCount()):
-            name = self.products_table.item(row, 0).text().lower()
-            product_category = self.products_table.item(row, 0).text()
-            
-            name_match = search_text in name
-            category_match = category == "Все категории" or category == product_category
-            
-            self.products_table.setRowHidden(row, not (name_match and category_match))
+        self.search_timer.stop()
+        category = None
+        if self.category_filter.currentIndex() > 0:
+            category = self.category_filter.currentText()
+        self.product_filter.set_filter(self.search_input.text(), category)
 
     def show_add_type_dialog(self):
-        dialog = AddProductTypeDialog(self.email, self)
-        if dialog and dialog.exec() == QDialog.DialogCode.Accepted:
-            self.load_products()
+        # Новая категория попадает в ProductTypeCatalog, товары склада от нее не меняются
+        AddProductTypeDialog(self.email, self).exec()
 
     def show_add_product_dialog(self):
         dialog = AddProductDialog(self.warehouse_id, self.email, self)
         if dialog and dialog.exec() == QDialog.DialogCode.Accepted:
-            self.load_products()
+            self.product_added(dialog.product)
+
+    def product_added(self, product):
+        """Добавляет созданный товар в таблицу без перезагрузки списка"""
+        if product and "id" in product and "current_quantity" in product:
+            self.products_model.upsert_products([product])
+            self.update_categories()
+        else:
+            self.sync_products()
 
     def show_movement_dialog(self):
-        dialog = ProductMovementDialog(self.warehouse_id, self.email, self)
-        if dialog and dialog.exec() == QDialog.DialogCode.Accepted:
-            self.load_products()
+        # Остаток в таблице меняется сразу, как только движение попадает в очередь
+        dialog = ProductMovementDialog(self.warehouse_id, self.email, self.products_model, self)
+        dialog.exec()
+
+    def show_import_dialog(self):
+        dialog = ImportProductsDialog(self.warehouse_id, self.email, self)
+        if dialog.exec() == QDialog.DialogCode.Accepted:
+            self.sync_products()
+
+    def show_export_dialog(self):
+        # Отмена экспорта - закрытие диалога: задачи диалога отменяются в done()
+        dialog = ExportProductsDialog(self.warehouse_id, self.warehouse_name, self.email, self)
+        dialog.exec()
+
+    def show_movement_document_dialog(self):
+        dialog = MovementDocumentDialog(self.warehouse_id, self.email, self.products_model, self)
+        dialog.exec()
 
     def setup_ui(self):
         """Настройка пользовательского интерфейса"""
@@ -176,17 +364,33 @@ class WarehouseView(QWidget):
         title_label.setStyleSheet("font-size: 16px; font-weight: bold;")
         
         stats_label = QLabel("Статистика склада")
+        self.pending_label = QLabel()
+        self.loading_label = QLabel()
         top_panel.addWidget(back_button)
         top_panel.addWidget(title_label)
         top_panel.addWidget(stats_label)
         top_panel.addStretch()
+        top_panel.addWidget(self.pending_label)
+        top_panel.addWidget(self.loading_label)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setFixedWidth(150)
+        self.progress_bar.setTextVisible(False)
+        self.progress_bar.hide()
+        top_panel.addWidget(self.progress_bar)
 
         # Панель управления
-        control_panel = QHBoxLayout()
+        self.control_widget = QWidget()
+        control_panel = QHBoxLayout(self.control_widget)
+        control_panel.setContentsMargins(0, 0, 0, 0)
         
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Поиск товаров...")
-        self.search_input.textChanged.connect(self.filter_products)
+        # Поиск применяется после паузы ввода, а не на каждое нажатие
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.filter_products)
+        self.search_input.textChanged.connect(self.search_timer.start)
         
         self.category_filter = QComboBox()
         self.category_filter.addItem("Все категории")
@@ -200,30 +404,66 @@ class WarehouseView(QWidget):
         
         add_movement_btn = QPushButton("Движение товара")
         add_movement_btn.clicked.connect(self.show_movement_dialog)
+
+        movement_document_btn = QPushButton("Документ движения")
+        movement_document_btn.clicked.connect(self.show_movement_document_dialog)
+
+        import_btn = QPushButton("Импорт")
+        import_btn.clicked.connect(self.show_import_dialog)
+
+        export_btn = QPushButton("Экспорт")
+        export_btn.clicked.connect(self.show_export_dialog)
         
         control_panel.addWidget(self.search_input)
         control_panel.addWidget(self.category_filter)
         control_panel.addWidget(add_type_btn)
         control_panel.addWidget(add_product_btn)
         control_panel.addWidget(add_movement_btn)
+        control_panel.addWidget(movement_document_btn)
+        control_panel.addWidget(import_btn)
+        control_panel.addWidget(export_btn)
 
         # Таблица товаров
-        self.products_table = QTableWidget()
-        self.products_table.setColumnCount(4)
-        self.products_table.setHorizontalHeaderLabels([
-            "Категория", "Название", "Текущий остаток", "Последнее движение"
-        ])
+        self.products_table = QTableView()
+        self.products_table.setModel(self.product_filter.proxy)
         self.products_table.horizontalHeader().setStretchLastSection(True)
+        # Фиксированная высота строк: представлению не нужно измерять каждую строку
+        self.products_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
 
         main_layout.addLayout(top_panel)
-        main_layout.addLayout(control_panel)
+        main_layout.addWidget(self.control_widget)
         main_layout.addWidget(self.products_table)
 
-class AddProductTypeDialog(QDialog):
+class ApiDialog(QDialog):
+    """Базовый диалог склада с фоновыми запросами к серверу"""
+
     def __init__(self, email, parent=None):
         super().__init__(parent)
         self.email = email
-        self.token_storage = TokenStorage()
+        self.session = get_session(email)
+        self.tasks = TaskGroup(self)
+
+    def done(self, result):
+        # Ответы на запросы закрытого диалога больше не нужны
+        self.tasks.cancel_all()
+        super().done(result)
+
+    def request_failed(self, error, context):
+        self.save_btn.setEnabled(True)
+        if isinstance(error, SessionExpiredError):
+            QMessageBox.warning(self, "Ошибка", "Сессия истекла")
+            self.reject()
+        else:
+            QMessageBox.warning(self, "Ошибка", network_error_message(error, context))
+
+    def submit(self, fn, on_success, context):
+        """Отправляет данные формы в фоне, блокируя кнопку сохранения"""
+        self.save_btn.setEnabled(False)
+        self.tasks.run(fn, on_success, lambda error: self.request_failed(error, context))
+
+class AddProductTypeDialog(ApiDialog):
+    def __init__(self, email, parent=None):
+        super().__init__(email, parent)
         self.setup_ui()
 
     def setup_ui(self):
@@ -234,12 +474,12 @@ class AddProductTypeDialog(QDialog):
         self.category_input.setPlaceholderText("Категория товара")
 
         buttons_layout = QHBoxLayout()
-        save_btn = QPushButton("Сохранить")
-        save_btn.clicked.connect(self.save_type)
+        self.save_btn = QPushButton("Сохранить")
+        self.save_btn.clicked.connect(self.save_type)
         cancel_btn = QPushButton("Отмена")
         cancel_btn.clicked.connect(self.reject)
         
-        buttons_layout.addWidget(save_btn)
+        buttons_layout.addWidget(self.save_btn)
         buttons_layout.addWidget(cancel_btn)
 
         layout.addWidget(QLabel("Категория:"))
@@ -247,33 +487,34 @@ class AddProductTypeDialog(QDialog):
         layout.addLayout(buttons_layout)
 
     def save_type(self):
-        tokens = self.token_storage.get_tokens(self.email)
-        if not tokens:
-            QMessageBox.warning(self, "Ошибка", "Сессия истекла")
-            self.reject()
-            return
+        category = self.category_input.text()
+        self.submit(
+            lambda task: self.session.post("/product-types", json={"category": category}),
+            self.type_saved,
+            "Ошибка при сохранении типа товара"
+        )
 
-        try:
-            response = requests.post(
-                f"{client_config.SERVER_URL}/product-types",
-                headers={"Authorization": f"Bearer {tokens['access_token']}"},
-                json={
-                    "category": self.category_input.text()
-                }
-            )
-            if response.status_code == 200:
-                self.accept()
+    def type_saved(self, response):
+        self.save_btn.setEnabled(True)
+        if response.status_code == 200:
+            # Новая категория сразу доступна в диалоге добавления товара
+            catalog = get_product_type_catalog(self.email)
+            product_type = self.session.api.json(response, {})
+            if "id" in product_type:
+                catalog.add(product_type)
             else:
-                QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить тип товара: {response.text}")
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Ошибка при сохранении типа товара: {str(e)}")
+                catalog.invalidate()
+            self.accept()
+        else:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить тип товара: {response.text}")
 
-class AddProductDialog(QDialog):
+class AddProductDialog(ApiDialog):
     def __init__(self, warehouse_id, email, parent=None):
-        super().__init__(parent)
+        super().__init__(email, parent)
         self.warehouse_id = warehouse_id
-        self.email = email
-        self.token_storage = TokenStorage()
+        self.catalog = get_product_type_catalog(email)
+        self.types_model = ProductTypeModel(self)
+        self.product = None  # созданный товар из ответа сервера
         self.setup_ui()
         self.load_product_types()
 
@@ -281,8 +522,18 @@ class AddProductDialog(QDialog):
         self.setWindowTitle("Добавить товар на склад")
         layout = QVBoxLayout(self)
 
+        # Категорию можно выбрать из списка или найти вводом части названия
         self.type_combo = QComboBox()
-        self.type_combo.setPlaceholderText("Выберите категорию товара")
+        self.type_combo.setEditable(True)
+        self.type_combo.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+        self.type_combo.setModel(self.types_model)
+        self.type_combo.view().setUniformItemSizes(True)
+        self.type_combo.lineEdit().setPlaceholderText("Выберите категорию товара")
+        completer = QCompleter(self.types_model, self)
+        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        completer.setFilterMode(Qt.MatchFlag.MatchContains)
+        completer.setMaxVisibleItems(15)
+        self.type_combo.setCompleter(completer)
         
         self.name_input = QLineEdit()
         self.name_input.setPlaceholderText("Название товара")
@@ -292,12 +543,12 @@ class AddProductDialog(QDialog):
         self.quantity_input.setValue(0)
 
         buttons_layout = QHBoxLayout()
-        save_btn = QPushButton("Сохранить")
-        save_btn.clicked.connect(self.save_product)
+        self.save_btn = QPushButton("Сохранить")
+        self.save_btn.clicked.connect(self.save_product)
         cancel_btn = QPushButton("Отмена")
         cancel_btn.clicked.connect(self.reject)
         
-        buttons_layout.addWidget(save_btn)
+        buttons_layout.addWidget(self.save_btn)
         buttons_layout.addWidget(cancel_btn)
 
         layout.addWidget(QLabel("Категория товара:"))
@@ -309,71 +560,95 @@ class AddProductDialog(QDialog):
         layout.addLayout(buttons_layout)
 
     def load_product_types(self):
-        tokens = self.token_storage.get_tokens(self.email)
-        if not tokens:
-            QMessageBox.warning(self, "Ошибка", "Сессия истекла")
-            self.reject()
+        # Свежий список категорий берется из памяти без запроса к серверу,
+        # устаревший показывается сразу и обновляется в фоне
+        types = self.catalog.types()
+        if types is not None:
+            self.show_product_types(types)
+        else:
+            self.type_combo.lineEdit().setPlaceholderText("Загрузка категорий...")
+        fresh = self.catalog.fresh
+        get_network_stats().cache_lookup("product_types", fresh)
+        if fresh:
             return
+        self.tasks.run(
+            self.catalog.fetch,
+            self.product_types_loaded,
+            lambda error: self.request_failed(error, "Ошибка при загрузке типов товаров")
+        )
 
-        try:
-            response = requests.get(
-                f"{client_config.SERVER_URL}/product-types",
-                headers={"Authorization": f"Bearer {tokens['access_token']}"}
-            )
-            if response.status_code == 200:
-                types = response.json()
-                self.type_combo.clear()
-                for t in types:
-                    self.type_combo.addItem(t['category'], t['id'])
-            else:
-                QMessageBox.warning(self, "Ошибка", "Не удалось загрузить типы товаров")
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Ошибка при загрузке типов товаров: {str(e)}")
+    def product_types_loaded(self, types):
+        self.type_combo.lineEdit().setPlaceholderText("Выберите категорию товара")
+        self.show_product_types(types)
+
+    def show_product_types(self, types):
+        selected = self.type_combo.currentData()
+        text = self.type_combo.currentText()
+        self.types_model.set_types(types)
+        index = self.type_combo.findData(selected) if selected is not None else -1
+        self.type_combo.setCurrentIndex(index)
+        if index < 0:
+            # Введенный текст не теряется при обновлении списка
+            self.type_combo.setEditText(text)
+
+    def selected_type_id(self):
+        """Возвращает id категории, выбранной в списке или введенной полностью"""
+        text = self.type_combo.currentText().strip()
+        index = self.type_combo.currentIndex()
+        if index < 0 or self.type_combo.itemText(index) != text:
+            index = self.type_combo.findText(text, Qt.MatchFlag.MatchFixedString)
+        return self.type_combo.itemData(index) if index >= 0 else None
 
     def save_product(self):
-        tokens = self.token_storage.get_tokens(self.email)
-        if not tokens:
-            QMessageBox.warning(self, "Ошибка", "Сессия истекла")
-            self.reject()
+        product_type_id = self.selected_type_id()
+        if product_type_id is None:
+            QMessageBox.warning(self, "Ошибка", "Выберите категорию товара")
             return
 
-        try:
-            product_type_id = self.type_combo.currentData()
-            if product_type_id is None:
-                QMessageBox.warning(self, "Ошибка", "Выберите категорию товара")
-                return
-                
-            response = requests.post(
-                f"{client_config.SERVER_URL}/warehouses/{self.warehouse_id}/products",
-                headers={"Authorization": f"Bearer {tokens['access_token']}"},
-                json={
-                    "product_type_id": product_type_id,
-                    "name": self.name_input.text(),
-                    "quantity": self.quantity_input.value()
-                }
-            )
-            if response.status_code == 200:
-                self.accept()
-            else:
-                QMessageBox.warning(self, "Ошибка", f"Не удалось добавить товар: {response.text}")
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Ошибка при добавлении товара: {str(e)}")
+        data = {
+            "product_type_id": product_type_id,
+            "name": self.name_input.text(),
+            "quantity": self.quantity_input.value()
+        }
+        self.submit(
+            lambda task: self.session.post(
+                f"/warehouses/{self.warehouse_id}/products", json=data),
+            self.product_saved,
+            "Ошибка при добавлении товара"
+        )
+
+    def product_saved(self, response):
+        self.save_btn.setEnabled(True)
+        if response.status_code == 200:
+            try:
+                self.product = response.json()
+            except ValueError:
+                self.product = None
+            self.accept()
+        else:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось добавить товар: {response.text}")
 
 class ProductMovementDialog(QDialog):
-    def __init__(self, warehouse_id, email, parent=None):
+    """Движение одного товара.
+
+    Товар выбирается из модели уже открытого склада через ProductPicker,
+    поэтому диалог не загружает список товаров и открывается сразу.
+    """
+
+    def __init__(self, warehouse_id, email, products_model, parent=None):
         super().__init__(parent)
         self.warehouse_id = warehouse_id
         self.email = email
-        self.token_storage = TokenStorage()
+        self.products_model = products_model
         self.setup_ui()
-        self.load_products()
 
     def setup_ui(self):
         self.setWindowTitle("Движение товара")
+        self.resize(500, self.sizeHint().height())
         layout = QVBoxLayout(self)
 
-        self.product_combo = QComboBox()
-        self.product_combo.setPlaceholderText("Выберите товар")
+        self.product_picker = ProductPicker(self.products_model, self)
+        self.product_picker.product_chosen.connect(self.product_chosen)
         
         self.movement_type = QComboBox()
         self.movement_type.addItems(["Приход", "Расход"])
@@ -385,16 +660,16 @@ class ProductMovementDialog(QDialog):
         self.comment_input.setPlaceholderText("Комментарий к операции")
 
         buttons_layout = QHBoxLayout()
-        save_btn = QPushButton("Сохранить")
-        save_btn.clicked.connect(self.save_movement)
+        self.save_btn = QPushButton("Сохранить")
+        self.save_btn.clicked.connect(self.save_movement)
         cancel_btn = QPushButton("Отмена")
         cancel_btn.clicked.connect(self.reject)
         
-        buttons_layout.addWidget(save_btn)
+        buttons_layout.addWidget(self.save_btn)
         buttons_layout.addWidget(cancel_btn)
 
         layout.addWidget(QLabel("Товар:"))
-        layout.addWidget(self.product_combo)
+        layout.addWidget(self.product_picker)
         layout.addWidget(QLabel("Тип движения:"))
         layout.addWidget(self.movement_type)
         layout.addWidget(QLabel("Количество:"))
@@ -403,59 +678,380 @@ class ProductMovementDialog(QDialog):
         layout.addWidget(self.comment_input)
         layout.addLayout(buttons_layout)
 
-    def load_products(self):
-        tokens = self.token_storage.get_tokens(self.email)
-        if not tokens:
-            QMessageBox.warning(self, "Ошибка", "Сессия истекла")
-            self.reject()
+    def product_chosen(self, product_id):
+        self.quantity_input.setFocus()
+        self.quantity_input.selectAll()
+
+    def save_movement(self):
+        product_id = self.product_picker.product_id()
+        if product_id is None:
+            QMessageBox.warning(self, "Ошибка", "Выберите товар из списка")
             return
 
+        movement_type = "in" if self.movement_type.currentText() == "Приход" else "out"
+        data = {
+            "product_id": product_id,
+            "quantity": self.quantity_input.value(),
+            "movement_type": movement_type,
+            "comment": self.comment_input.text() if self.comment_input.text() else None
+        }
+        # Движение записывается в локальную очередь и отправляется в фоне,
+        # поэтому диалог закрывается сразу, даже без связи с сервером
         try:
-            response = requests.get(
-                f"{client_config.SERVER_URL}/warehouses/{self.warehouse_id}/products",
-                headers={"Authorization": f"Bearer {tokens['access_token']}"}
-            )
-            if response.status_code == 200:
-                products = response.json()
-                self.product_combo.clear()
-                for p in products:
-                    self.product_combo.addItem(
-                        f"{p['name']} ({p['category']}) - Остаток: {p['current_quantity']}",
-                        p['id']
-                    )
-            else:
-                QMessageBox.warning(self, "Ошибка", "Не удалось загрузить товары")
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Ошибка при загрузке товаров: {str(e)}")
+            get_movement_outbox(self.email).add(self.warehouse_id, data)
+        except sqlite3.Error as e:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить движение товара: {e}")
+            return
+        self.accept()
 
-    def save_movement(self):
-        tokens = self.token_storage.get_tokens(self.email)
-        if not tokens:
-            QMessageBox.warning(self, "Ошибка", "Сессия истекла")
-            self.reject()
+class MovementDocumentDialog(QDialog):
+    """Документ движения: приход или расход нескольких товаров сразу.
+
+    Товары выбираются из уже загруженной модели склада, поэтому диалог
+    не обращается к серверу. Расход проверяется по известным остаткам
+    до отправки, а строки документа ставятся в очередь движений одной
+    транзакцией и уходят на сервер пачками.
+    """
+
+    def __init__(self, warehouse_id, email, products_model, parent=None):
+        super().__init__(parent)
+        self.warehouse_id = warehouse_id
+        self.email = email
+        self.products_model = products_model
+        self.lines = []  # [(product_id, QSpinBox)] в порядке добавления
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.setWindowTitle("Документ движения товаров")
+        self.resize(700, 500)
+        layout = QVBoxLayout(self)
+
+        self.movement_type = QComboBox()
+        self.movement_type.addItems(["Приход", "Расход"])
+        self.movement_type.currentIndexChanged.connect(self.validate)
+
+        self.comment_input = QLineEdit()
+        self.comment_input.setPlaceholderText("Комментарий к документу")
+
+        # Поиск товара по началу и подстроке названия среди товаров склада
+        self.product_input = ProductPicker(self.products_model, self)
+        self.product_input.product_chosen.connect(self.product_chosen)
+        self.product_input.returnPressed.connect(self.add_line)
+
+        self.quantity_input = QSpinBox()
+        self.quantity_input.setRange(1, 1000000)
+
+        add_line_btn = QPushButton("Добавить строку")
+        add_line_btn.clicked.connect(self.add_line)
+
+        line_layout = QHBoxLayout()
+        line_layout.addWidget(self.product_input, stretch=1)
+        line_layout.addWidget(self.quantity_input)
+        line_layout.addWidget(add_line_btn)
+
+        self.lines_table = QTableWidget(0, 4)
+        self.lines_table.setHorizontalHeaderLabels(["Товар", "Категория", "Остаток", "Количество"])
+        self.lines_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.lines_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+
+        remove_line_btn = QPushButton("Удалить строку")
+        remove_line_btn.clicked.connect(self.remove_line)
+
+        self.status_label = QLabel()
+
+        buttons_layout = QHBoxLayout()
+        self.save_btn = QPushButton("Провести")
+        self.save_btn.clicked.connect(self.save_document)
+        cancel_btn = QPushButton("Отмена")
+        cancel_btn.clicked.connect(self.reject)
+        buttons_layout.addWidget(remove_line_btn)
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(self.save_btn)
+        buttons_layout.addWidget(cancel_btn)
+
+        layout.addWidget(QLabel("Тип движения:"))
+        layout.addWidget(self.movement_type)
+        layout.addWidget(QLabel("Комментарий:"))
+        layout.addWidget(self.comment_input)
+        layout.addWidget(QLabel("Товар и количество:"))
+        layout.addLayout(line_layout)
+        layout.addWidget(self.lines_table)
+        layout.addWidget(self.status_label)
+        layout.addLayout(buttons_layout)
+        self.validate()
+
+    def product_chosen(self, product_id):
+        self.quantity_input.setFocus()
+        self.quantity_input.selectAll()
+
+    def add_line(self):
+        product_id = self.product_input.product_id()
+        if product_id is None:
+            QMessageBox.warning(self, "Ошибка", "Выберите товар из списка")
+            return
+        row = self.products_model.row_for_id(product_id)
+        quantity = self.quantity_input.value()
+
+        # Повторный товар увеличивает количество в существующей строке
+        for line_id, spin in self.lines:
+            if line_id == product_id:
+                spin.setValue(spin.value() + quantity)
+                break
+        else:
+            table_row = self.lines_table.rowCount()
+            self.lines_table.insertRow(table_row)
+            self.lines_table.setItem(table_row, 0, QTableWidgetItem(self.products_model.name(row)))
+            self.lines_table.setItem(table_row, 1, QTableWidgetItem(self.products_model.category(row)))
+            self.lines_table.setItem(table_row, 2, QTableWidgetItem())
+            spin = QSpinBox()
+            spin.setRange(1, 1000000)
+            spin.setValue(quantity)
+            spin.valueChanged.connect(self.validate)
+            self.lines_table.setCellWidget(table_row, 3, spin)
+            self.lines.append((product_id, spin))
+
+        self.product_input.clear()
+        self.quantity_input.setValue(1)
+        self.product_input.setFocus()
+        self.validate()
+
+    def remove_line(self):
+        table_row = self.lines_table.currentRow()
+        if table_row < 0:
+            return
+        self.lines_table.removeRow(table_row)
+        del self.lines[table_row]
+        self.validate()
+
+    def validate(self):
+        """Сверяет расход с известными остатками и блокирует проведение при нехватке"""
+        outgoing = self.movement_type.currentText() == "Расход"
+        shortages = 0
+        for table_row, (product_id, spin) in enumerate(self.lines):
+            row = self.products_model.row_for_id(product_id)
+            stock = self.products_model.quantity(row) if row is not None else 0
+            item = self.lines_table.item(table_row, 2)
+            item.setText(str(stock))
+            short = outgoing and spin.value() > stock
+            item.setData(Qt.ItemDataRole.ForegroundRole, QColor(Qt.GlobalColor.red) if short else None)
+            shortages += short
+
+        if shortages:
+            self.status_label.setText(f"Недостаточно товара в строках: {shortages}")
+        else:
+            self.status_label.setText(f"Строк в документе: {len(self.lines)}")
+        self.save_btn.setEnabled(bool(self.lines) and not shortages)
+
+    def save_document(self):
+        movement_type = "in" if self.movement_type.currentText() == "Приход" else "out"
+        comment = self.comment_input.text() or None
+        movements = [{
+            "product_id": product_id,
+            "quantity": spin.value(),
+            "movement_type": movement_type,
+            "comment": comment
+        } for product_id, spin in self.lines]
+        try:
+            get_movement_outbox(self.email).add_many(self.warehouse_id, movements)
+        except sqlite3.Error as e:
+            QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить документ: {e}")
             return
+        self.accept()
+
+class ImportProductsDialog(ApiDialog):
+    """Импорт товаров на склад из CSV или XLSX с прогрессом и ошибками по строкам"""
+
+    MAX_SHOWN_ERRORS = 1000  # Остальные ошибки только подсчитываются
+
+    def __init__(self, warehouse_id, email, parent=None):
+        super().__init__(email, parent)
+        self.warehouse_id = warehouse_id
+        self.product_import = None
+        self.imported = False
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.setWindowTitle("Импорт товаров")
+        self.resize(600, 450)
+        layout = QVBoxLayout(self)
+
+        file_layout = QHBoxLayout()
+        self.file_input = QLineEdit()
+        self.file_input.setReadOnly(True)
+        self.file_input.setPlaceholderText("Файл CSV или XLSX: Категория, Название, Количество")
+        choose_btn = QPushButton("Выбрать...")
+        choose_btn.clicked.connect(self.choose_file)
+        file_layout.addWidget(self.file_input)
+        file_layout.addWidget(choose_btn)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.status_label = QLabel()
+        self.errors_list = QListWidget()
+
+        buttons_layout = QHBoxLayout()
+        self.save_btn = QPushButton("Импортировать")
+        self.save_btn.setEnabled(False)
+        self.save_btn.clicked.connect(self.start_import)
+        self.cancel_btn = QPushButton("Закрыть")
+        self.cancel_btn.clicked.connect(self.cancel_import)
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(self.save_btn)
+        buttons_layout.addWidget(self.cancel_btn)
+
+        layout.addLayout(file_layout)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.status_label)
+        layout.addWidget(QLabel("Ошибки:"))
+        layout.addWidget(self.errors_list)
+        layout.addLayout(buttons_layout)
+
+    def choose_file(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Файл с товарами", "", "Таблицы (*.csv *.xlsx *.xlsm);;Все файлы (*)")
+        if not path:
+            return
+        self.file_input.setText(path)
+        self.product_import = ProductImport(self.session, self.warehouse_id, path)
+        resume_row = self.product_import.resume_row
+        if resume_row:
+            self.status_label.setText(f"Импорт этого файла был прерван, он продолжится со строки {resume_row + 2}")
+            self.save_btn.setText("Продолжить импорт")
+        else:
+            self.status_label.setText("")
+            self.save_btn.setText("Импортировать")
+        self.save_btn.setEnabled(True)
+
+    def start_import(self):
+        self.imported = True
+        self.errors_list.clear()
+        self.error_count = 0
+        self.save_btn.setEnabled(False)
+        self.cancel_btn.setText("Остановить")
+        self.status_label.setText("Импорт...")
+        self.tasks.run(
+            self.product_import.run,
+            self.import_finished,
+            self.import_failed,
+            self.import_progress,
+            key="import"
+        )
+
+    def import_progress(self, progress):
+        if progress.fraction is not None:
+            self.progress_bar.setValue(int(progress.fraction * 1000))
+        self.status_label.setText(f"Обработано строк: {progress.rows}, создано товаров: {progress.created}")
+        for error in progress.errors:
+            self.error_count += 1
+            if self.errors_list.count() < self.MAX_SHOWN_ERRORS:
+                self.errors_list.addItem(f"Строка {error.row}: {error.message}")
+
+    def import_finished(self, result):
+        self.cancel_btn.setText("Закрыть")
+        if not result.cancelled:
+            self.progress_bar.setValue(self.progress_bar.maximum())
+        message = f"Создано товаров: {result.created}, строк с ошибками: {result.errors}"
+        if result.resumed_from:
+            message += f" (продолжено со строки {result.resumed_from + 2})"
+        self.status_label.setText(message)
 
+    def import_failed(self, error):
+        self.cancel_btn.setText("Закрыть")
+        self.save_btn.setEnabled(True)
+        self.save_btn.setText("Продолжить импорт")
+        if isinstance(error, ProductImportError):
+            message = str(error)
+        elif isinstance(error, SessionExpiredError):
+            message = "Сессия истекла"
+        else:
+            message = network_error_message(error, "Ошибка импорта")
+        self.status_label.setText(f"Импорт прерван: {message}")
+
+    def cancel_import(self):
+        # Отмена останавливает импорт после отправляемых чанков; прогресс сохранен
+        if self.imported:
+            self.accept()
+        else:
+            self.reject()
+
+class ExportProductsDialog(ApiDialog):
+    """Экспорт товаров склада или всех складов в фоне с прогрессом и отменой"""
+
+    def __init__(self, warehouse_id, warehouse_name, email, parent=None):
+        super().__init__(email, parent)
+        self.warehouse = {"id": warehouse_id, "name": warehouse_name}
+        self.setup_ui()
+
+    def setup_ui(self):
+        self.setWindowTitle("Экспорт товаров")
+        layout = QVBoxLayout(self)
+
+        self.scope_combo = QComboBox()
+        self.scope_combo.addItems([f"Склад «{self.warehouse['name']}»", "Все склады"])
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 1000)
+        self.status_label = QLabel()
+
+        buttons_layout = QHBoxLayout()
+        self.save_btn = QPushButton("Экспортировать...")
+        self.save_btn.clicked.connect(self.start_export)
+        self.cancel_btn = QPushButton("Закрыть")
+        self.cancel_btn.clicked.connect(self.reject)
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(self.save_btn)
+        buttons_layout.addWidget(self.cancel_btn)
+
+        layout.addWidget(QLabel("Что выгрузить:"))
+        layout.addWidget(self.scope_combo)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.status_label)
+        layout.addLayout(buttons_layout)
+
+    def start_export(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Сохранить товары", "",
+            "CSV (*.csv);;Parquet (*.parquet);;Arrow IPC (*.arrow *.feather)")
+        if not path:
+            return
+        warehouses = [self.warehouse] if self.scope_combo.currentIndex() == 0 else None
         try:
-            product_id = self.product_combo.currentData()
-            if product_id is None:
-                QMessageBox.warning(self, "Ошибка", "Выберите товар")
-                return
-                
-            movement_type = "in" if self.movement_type.currentText() == "Приход" else "out"
-            
-            response = requests.post(
-                f"{client_config.SERVER_URL}/warehouses/{self.warehouse_id}/movements",
-                headers={"Authorization": f"Bearer {tokens['access_token']}"},
-                json={
-                    "product_id": product_id,
-                    "quantity": self.quantity_input.value(),
-                    "movement_type": movement_type,
-                    "comment": self.comment_input.text() if self.comment_input.text() else None
-                }
-            )
-            if response.status_code == 200:
-                self.accept()
-            else:
-                QMessageBox.warning(self, "Ошибка", f"Не удалось сохранить движение товара: {response.text}")
-        except Exception as e:
-            QMessageBox.warning(self, "Ошибка", f"Ошибка при сохранении движения: {str(e)}") 
\ No newline at end of file
+            product_export = ProductExport(self.session, path, warehouses)
+        except ProductExportError as e:
+            QMessageBox.warning(self, "Ошибка", str(e))
+            return
+
+        self.save_btn.setEnabled(False)
+        self.scope_combo.setEnabled(False)
+        self.cancel_btn.setText("Отменить")
+        self.progress_bar.setValue(0)
+        self.status_label.setText("Экспорт...")
+        self.tasks.run(
+            product_export.run,
+            self.export_finished,
+            self.export_failed,
+            self.export_progress,
+            key="export"
+        )
+
+    def export_progress(self, progress):
+        if progress.fraction is not None:
+            self.progress_bar.setValue(int(progress.fraction * 1000))
+        self.status_label.setText(f"{progress.warehouse}: выгружено строк {progress.rows}")
+
+    def export_finished(self, result):
+        self.progress_bar.setValue(self.progress_bar.maximum())
+        self.cancel_btn.setText("Закрыть")
+        self.status_label.setText(f"Выгружено строк: {result.rows} в файл {result.path}")
+
+    def export_failed(self, error):
+        self.save_btn.setEnabled(True)
+        self.scope_combo.setEnabled(True)
+        self.cancel_btn.setText("Закрыть")
+        if isinstance(error, (ProductExportError, OSError)):
+            message = str(error)
+        elif isinstance(error, SessionExpiredError):
+            message = "Сессия истекла"
+        else:
+            message = network_error_message(error, "Ошибка экспорта")
+        self.status_label.setText(f"Экспорт не выполнен: {message}")
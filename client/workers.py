@@ -0,0 +1,172 @@
+import threading
+from typing import Callable, Optional
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+import client_config
+
+_thread_pool: Optional[QThreadPool] = None
+
+
+def network_thread_pool() -> QThreadPool:
+    """Пул потоков для сетевых запросов, общий для всех окон."""
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = QThreadPool()
+        _thread_pool.setMaxThreadCount(client_config.API_POOL_SIZE)
+    return _thread_pool
+
+
+class Task(QObject):
+    """Фоновая задача: функция fn(task), выполняемая в пуле потоков.
+
+    fn не должна обращаться к виджетам - результат и ошибка передаются
+    в поток GUI сигналами finished и failed. Промежуточные данные можно
+    передавать через report(), а долгие функции должны периодически
+    проверять cancelled и завершаться, если задача отменена.
+    """
+
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    progress = pyqtSignal(object)
+
+    def __init__(self, fn: Callable[['Task'], object]):
+        super().__init__()
+        self.fn = fn
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def report(self, value):
+        if not self.cancelled:
+            self.progress.emit(value)
+
+
+class _TaskRunner(QRunnable):
+    def __init__(self, task: Task):
+        super().__init__()
+        self.task = task
+
+    def run(self):
+        task = self.task
+        try:
+            result = task.fn(task)
+        except Exception as e:
+            failed, value = True, e
+        else:
+            failed, value = False, result
+        try:
+            (task.failed if failed else task.finished).emit(value)
+        except RuntimeError:
+            # Объект задачи уже удален: приложение завершается, пока шел запрос
+            pass
+
+
+def run_detached(fn: Callable[[Task], object]) -> Task:
+    """Запускает задачу, результат которой никому не нужен (например, /logout)."""
+    task = Task(fn)
+    network_thread_pool().start(_TaskRunner(task))
+    return task
+
+
+class TaskGroup(QObject):
+    """Фоновые задачи, принадлежащие окну или виджету.
+
+    Колбэки вызываются в потоке GUI и только для неотмененных задач,
+    поэтому после cancel_all() (например, когда пользователь ушел со
+    склада) результаты устаревших запросов просто отбрасываются.
+    Задача с тем же key, что и у выполняющейся, отменяет предыдущую.
+    Долгие задачи (подписки на события сервера) запускаются с
+    dedicated=True в отдельном потоке, чтобы не занимать пул запросов.
+    """
+
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, parent: QObject):
+        super().__init__(parent)
+        self._tasks = {}
+        self._keys = {}
+        # Отмененные задачи удерживаются до завершения, чтобы их сигналы
+        # не приходили от уже удаленного объекта
+        self._running = set()
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._tasks)
+
+    def run(self, fn: Callable[[Task], object], on_success: Optional[Callable] = None,
+            on_error: Optional[Callable] = None, on_progress: Optional[Callable] = None,
+            key: Optional[str] = None, dedicated: bool = False) -> Task:
+        if key is not None:
+            self.cancel(key)
+
+        task = Task(fn)
+        self._tasks[task] = (on_success, on_error, on_progress)
+        self._running.add(task)
+        if key is not None:
+            self._keys[key] = task
+        task.finished.connect(self._on_finished)
+        task.failed.connect(self._on_failed)
+        task.progress.connect(self._on_progress)
+
+        if len(self._tasks) == 1:
+            self.busy_changed.emit(True)
+        if dedicated:
+            threading.Thread(target=_TaskRunner(task).run, daemon=True).start()
+        else:
+            network_thread_pool().start(_TaskRunner(task))
+        return task
+
+    def cancel(self, key: str):
+        task = self._keys.pop(key, None)
+        if task is not None:
+            task.cancel()
+            self._forget(task)
+
+    def cancel_all(self):
+        for task in list(self._tasks):
+            task.cancel()
+            self._forget(task)
+        self._keys.clear()
+
+    def _forget(self, task: Task):
+        if self._tasks.pop(task, None) is not None and not self._tasks:
+            self.busy_changed.emit(False)
+        for key, keyed in list(self._keys.items()):
+            if keyed is task:
+                del self._keys[key]
+
+    def _callbacks(self, task: Task):
+        if task.cancelled or task not in self._tasks:
+            return None
+        return self._tasks[task]
+
+    def _on_finished(self, result):
+        task = self.sender()
+        self._running.discard(task)
+        callbacks = self._callbacks(task)
+        if callbacks is None:
+            return
+        self._forget(task)
+        if callbacks[0] is not None:
+            callbacks[0](result)
+
+    def _on_failed(self, error):
+        task = self.sender()
+        self._running.discard(task)
+        callbacks = self._callbacks(task)
+        if callbacks is None:
+            return
+        self._forget(task)
+        if callbacks[1] is not None:
+            callbacks[1](error)
+
+    def _on_progress(self, value):
+        callbacks = self._callbacks(self.sender())
+        if callbacks is not None and callbacks[2] is not None:
+            callbacks[2](value)
@@ -1,6 +1,60 @@
 # Настройки сервера
 SERVER_URL = "http://localhost:5000"
 API_TIMEOUT = 5
+API_POOL_SIZE = 10  # Максимум keep-alive соединений в пуле ApiClient
+TOKEN_REFRESH_MARGIN = 60  # За сколько секунд до истечения обновлять токен доступа
+SESSION_CHECK_DEADLINE = 5  # Общий срок проверки сохраненных сессий при запуске, секунды
+WAREHOUSES_MAX_AGE = 60  # Через сколько секунд список складов обновляется при возврате на главный экран
+PRODUCTS_MAX_AGE = 30  # Сколько секунд загруженный список товаров показывается без повторного запроса
+PRODUCT_TYPES_TTL = 300  # Сколько секунд список категорий товаров используется без запроса к серверу
+
+# Хранилище токенов
+TOKEN_FILE = "user_tokens.json"
+TOKEN_SAVE_DELAY = 1  # Через сколько секунд после изменения записывать токены на диск
+TOKEN_KEYRING = False  # Хранить токены в системном хранилище паролей (нужен пакет keyring)
+
+# Локальный кэш
+CACHE_FILE = "client_cache.db"  # SQLite-файл рядом с user_tokens.json
+CACHE_MAX_PRODUCTS = 500000  # Сколько товаров всех складов хранить в кэше
+CACHE_MAX_WAREHOUSES = 20  # Сколько складов хранить в кэше
+
+# Открытые склады, которые держатся в памяти для быстрого возврата
+WAREHOUSE_VIEWS_MAX = 3  # Сколько складов держать открытыми
+WAREHOUSE_VIEWS_MAX_MB = 256  # Сколько памяти (оценка, МБ) могут занимать их товары
+
+# Фоновый прогрев складов на главном экране
+PREFETCH_TOP = 3  # Сколько складов с начала списка прогревать
+PREFETCH_RECENT = 3  # Сколько недавно открытых складов прогревать
+PREFETCH_CONCURRENCY = 2  # Сколько складов прогревается одновременно
+PREFETCH_MAX_PRODUCTS = 200000  # Сколько прогретых товаров держать в памяти
+PREFETCH_IDLE_MS = 500  # Пауза после обновления списка складов перед прогревом, мс
+PREFETCH_HOVER_MS = 200  # Сколько мс курсор должен пробыть над складом, чтобы начать его прогрев
+
+# Очередь движений товара
+OUTBOX_FILE = "client_outbox.db"  # Неотправленные движения, рядом с user_tokens.json
+OUTBOX_BATCH_SIZE = 50  # Сколько движений отправлять одним запросом
+OUTBOX_RETRY_MIN = 2  # Пауза перед первым повтором отправки, секунды
+OUTBOX_RETRY_MAX = 60  # Максимальная пауза между повторами, секунды
+
+# Живые обновления открытых складов
+LIVE_FRAME_MS = 16  # Изменения из потока событий применяются не чаще раза за кадр, мс
+LIVE_POLL_INTERVAL = 15  # Период дельта-запросов, пока поток событий недоступен, секунды
+LIVE_READ_TIMEOUT = 45  # Сколько секунд ждать данных или пинга в потоке событий до переподключения
+LIVE_RETRY_MIN = 1  # Пауза перед первым переподключением потока событий, секунды
+LIVE_RETRY_MAX = 60  # Максимальная пауза между переподключениями, секунды
+
+# Импорт товаров из файла
+IMPORT_CHUNK_SIZE = 500  # Строк файла в одном чанке
+IMPORT_PARALLELISM = 4  # Сколько чанков отправлять одновременно
+IMPORT_CHECKPOINT_FILE = "import_checkpoints.json"  # Прогресс прерванных импортов
+
+# Диагностика
+STARTUP_REPORT = False  # Печатать в stderr время фаз запуска (то же, что аргумент --startup-report)
+NET_STATS_FILE = "net_stats"  # Метрики сети пишутся в net_stats.json и net_stats.prom рядом с user_tokens.json
+NET_STATS_DUMP_ON_EXIT = True  # Сохранять метрики сети при выходе из клиента
+NET_STATS_GUI_TICK_MS = 100  # Период проверки, отвечает ли поток GUI, мс
+NET_STATS_GUI_BLOCK_MS = 50  # Задержка потока GUI, которая считается блокировкой, мс
+NET_OVERLAY = False  # Показывать панель метрик сети в главном окне при входе (переключается F12)
 
 # Настройки безопасности
 HASH_SALT = "your_secure_salt_here"  # Соль для хэширования паролей 
\ No newline at end of file
@@ -1,13 +1,37 @@
+import time
+started = time.perf_counter()
+
 import sys
+from PyQt6.QtCore import QTimer
 from PyQt6.QtWidgets import QApplication
-from client.login_window import LoginWindow
+from client.startup import start_profile
+from client.token_storage import get_token_storage
 
 if __name__ == '__main__':
+    # Окна и сетевые модули (requests) импортируются по мере надобности,
+    # чтобы окно входа появилось как можно раньше
+    profile = start_profile(started)
+    profile.mark("импорт PyQt6")
     app = QApplication(sys.argv)
+    profile.mark("создание QApplication")
+
+    has_sessions = bool(get_token_storage().emails())
+    profile.mark("чтение сохраненных сессий")
+
+    with profile.phase("импорт окна входа"):
+        from client.login_window import LoginWindow
     login_window = LoginWindow()
-    
-    # Проверяем сессию перед показом окна
-    if not login_window.check_saved_session():
-        login_window.show()
-    
-    sys.exit(app.exec()) 
\ No newline at end of file
+    profile.mark("создание окна входа")
+    # Без сохраненных сессий запуск заканчивается первой отрисовкой окна входа,
+    # иначе - открытием главного окна или завершением проверки сессий
+    profile.watch_first_paint(login_window, "первая отрисовка окна входа", finish=not has_sessions)
+    login_window.show()
+
+    modules = ["client.auth_session"]
+    if has_sessions:
+        modules.append("client.main_window")
+        # Сохраненные сессии проверяются в фоне после первой отрисовки, окно при этом не блокируется
+        QTimer.singleShot(0, login_window.check_saved_session)
+    profile.preload(modules)
+
+    sys.exit(app.exec())
@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import client_config  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def client_files(tmp_path, monkeypatch):
+    """Файлы клиента (токены, кэши, метрики) создаются во временном каталоге теста."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(client_config, "TOKEN_KEYRING", False)
+    monkeypatch.setattr(client_config, "NET_STATS_DUMP_ON_EXIT", False)
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
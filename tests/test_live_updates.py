@@ -0,0 +1,140 @@
+import time
+
+import pytest
+
+import client_config
+from client.api_client import ApiClient
+from client.auth_session import AuthSession, token_expiry
+from client.live_updates import LiveUpdates, iter_server_events
+from client.token_storage import TokenStorage
+from tools.stand_in_server import StandInServer
+
+EMAIL = "live@example.com"
+WAREHOUSE_ID = 1
+
+
+def wait_for(qapp, predicate, timeout=5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        qapp.processEvents()
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return predicate()
+
+
+@pytest.fixture
+def server_factory():
+    servers = []
+
+    def start(**kwargs):
+        server = StandInServer(products_per_warehouse=5, warehouses=1, events_keepalive=0.2,
+                               **kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def live_factory(qapp, tmp_path):
+    created = []
+
+    def create(server):
+        tokens = server.state.issue_tokens(EMAIL)
+        storage = TokenStorage(str(tmp_path / "tokens.json"), use_keyring=False)
+        storage.store_tokens(EMAIL, tokens["access_token"], tokens["refresh_token"],
+                             token_expiry(tokens))
+        session = AuthSession(EMAIL, storage, ApiClient(base_url=server.url))
+        live = LiveUpdates(session, WAREHOUSE_ID)
+        changes, polls, connections = [], [], []
+        live.changed.connect(lambda products, keys: changes.append((products, keys)))
+        live.poll.connect(lambda: polls.append(time.monotonic()))
+        live.connected.connect(lambda: connections.append(time.monotonic()))
+        live.changes, live.polls, live.connections = changes, polls, connections
+        created.append(live)
+        return live
+
+    yield create
+    for live in created:
+        live.stop()
+
+
+def move(server, key, quantity=1):
+    status, _ = server.state.apply_movement(
+        WAREHOUSE_ID, {"product_id": 1, "quantity": quantity, "movement_type": "in"}, key)
+    assert status == 200
+
+
+def test_iter_server_events_parses_split_chunks():
+    stream = (b': connected\n\nid: 1\nevent: movement\ndata: {"product": {"id": 1}}\n\n'
+              b'id: 2\ndata: not json\n\n'
+              b'id: 3\nevent: product\ndata: {"product":\ndata:  {"id": 2}}\r\n\r\n')
+    chunks = [stream[i:i + 7] for i in range(0, len(stream), 7)]
+
+    events = list(iter_server_events(chunks))
+
+    assert [(event.id, event.type, event.data) for event in events] == [
+        ("1", "movement", {"product": {"id": 1}}),
+        ("3", "product", {"product": {"id": 2}}),
+    ]
+
+
+def test_events_are_applied_once_per_frame(qapp, monkeypatch, server_factory, live_factory):
+    monkeypatch.setattr(client_config, "LIVE_FRAME_MS", 200)
+    server = server_factory()
+    live = live_factory(server)
+    live.start()
+    assert wait_for(qapp, lambda: live.is_connected)
+
+    for key in ("k1", "k2", "k3"):
+        move(server, key)
+
+    assert wait_for(qapp, lambda: live.changes)
+    wait_for(qapp, lambda: False, timeout=0.3)
+    assert len(live.changes) == 1
+    products, keys = live.changes[0]
+    assert keys == ["k1", "k2", "k3"]
+    assert [(p["id"], p["current_quantity"]) for p in products] == [(1, 13)]
+
+
+def test_dropped_stream_polls_and_resumes_from_last_event(qapp, monkeypatch, server_factory,
+                                                          live_factory):
+    monkeypatch.setattr(client_config, "LIVE_FRAME_MS", 1)
+    monkeypatch.setattr(client_config, "LIVE_POLL_INTERVAL", 0.05)
+    monkeypatch.setattr(client_config, "LIVE_RETRY_MIN", 0.5)
+    server = server_factory()
+    live = live_factory(server)
+    live.start()
+    assert wait_for(qapp, lambda: live.is_connected)
+    move(server, "before-drop")
+    assert wait_for(qapp, lambda: live.changes)
+    last_event_id = live.last_event_id
+
+    server.drop_streams()
+    assert wait_for(qapp, lambda: not live.is_connected)
+    # Пока поток оборван, изменения запрашиваются опросом
+    move(server, "while-dropped")
+    polls_before = len(live.polls)
+    assert wait_for(qapp, lambda: len(live.polls) > polls_before)
+
+    # Переподключение продолжает поток с последнего полученного события
+    assert wait_for(qapp, lambda: len(live.connections) == 2)
+    assert wait_for(qapp, lambda: any("while-dropped" in keys for _, keys in live.changes))
+    assert int(live.last_event_id) > int(last_event_id)
+    assert not live.poll_timer.isActive()
+
+
+def test_server_without_events_falls_back_to_polling(qapp, monkeypatch, server_factory,
+                                                     live_factory):
+    monkeypatch.setattr(client_config, "LIVE_POLL_INTERVAL", 0.05)
+    server = server_factory(events=False)
+    live = live_factory(server)
+    live.start()
+
+    assert wait_for(qapp, lambda: live.supported is False)
+    assert wait_for(qapp, lambda: len(live.polls) >= 2)
+    assert not live.is_connected
+    assert not live.retry_timer.isActive()
@@ -0,0 +1,192 @@
+"""Бенчмарк сетевых обращений на типичные действия пользователя.
+
+Прогоняет последовательности запросов, которые выполняют окна клиента,
+против локального сервера-заглушки и печатает для каждого действия
+число HTTP-запросов, новых TCP-соединений, переданных байт и время
+выполнения:
+
+    python -m tools.bench_round_trips --latency 0.02 --repeat 5
+
+"legacy" - вызовы через модульные requests.get/post (новое соединение
+на каждый запрос) с проверкой /test-auth перед каждым запросом,
+"pooled" - те же вызовы через общий ApiClient, "session" - текущий
+клиент: ApiClient и AuthSession без предварительной проверки токена,
+таблица склада из локального кэша с инкрементальным обновлением
+(If-None-Match + updated_since) и подпиской на события склада, товары
+для движения берутся из таблицы, категории - из кэша, а ответы на
+движение и добавление товара применяются к таблице без перезагрузки.
+"""
+import argparse
+import time
+import uuid
+
+import requests
+
+from client.api_client import ApiClient
+from tools.stand_in_server import StandInServer
+
+EMAIL = 'bench@example.com'
+WAREHOUSE_ID = 1
+
+
+def legacy_transport(server: StandInServer):
+    def call(method, path, token=None, **kwargs):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        return requests.request(method, f'{server.url}{path}', headers=headers, **kwargs)
+    return call
+
+
+def pooled_transport(server: StandInServer):
+    api = ApiClient(base_url=server.url)
+    return api.request
+
+
+def session_transport(server: StandInServer):
+    api = ApiClient(base_url=server.url)
+
+    def call(method, path, token=None, **kwargs):
+        return api.request(method, path, token=token, **kwargs)
+    call.products_cursor = ProductsCursor()
+    return call
+
+
+def auth_preflight(call, token, preflight):
+    if preflight:
+        call('GET', '/test-auth', token=token)
+
+
+class ProductsCursor:
+    """Состояние ProductSync: ETag и время последнего изменения."""
+
+    def __init__(self):
+        self.etag = None
+        self.cursor = None
+
+    def refresh(self, call, token):
+        headers = {'If-None-Match': self.etag} if self.etag else {}
+        params = {'updated_since': self.cursor} if self.cursor else None
+        response = call('GET', f'/warehouses/{WAREHOUSE_ID}/products', token=token,
+                        headers=headers, params=params)
+        if response.status_code == 200:
+            self.etag = response.headers.get('ETag')
+            self.cursor = max((p['updated_at'] for p in response.json()), default=self.cursor)
+
+
+def reload_products(call, token, preflight):
+    # WarehouseView.sync_products после сохранения в диалоге
+    auth_preflight(call, token, preflight)
+    if preflight:
+        call('GET', f'/warehouses/{WAREHOUSE_ID}/products', token=token)
+    else:
+        call.products_cursor.refresh(call, token)
+
+
+def action_restore_session(call, token, preflight):
+    # LoginWindow.check_saved_session + MainWindow.load_warehouses
+    call('GET', '/test-auth', token=token)
+    auth_preflight(call, token, preflight)
+    call('GET', '/warehouses', token=token)
+
+
+def action_open_warehouse(call, token, preflight):
+    # MainWindow.warehouse_selected + WarehouseView.check_access/load_products
+    if not preflight:
+        # Таблица из локального кэша сверяется с сервером, затем открывается поток событий
+        call.products_cursor.refresh(call, token)
+        call('GET', f'/warehouses/{WAREHOUSE_ID}/events', token=token, stream=True,
+             headers={'Accept': 'text/event-stream'}).close()
+        return
+    auth_preflight(call, token, preflight)
+    call('GET', '/warehouses', token=token)
+    auth_preflight(call, token, preflight)
+    call('GET', f'/warehouses/{WAREHOUSE_ID}/products', token=token)
+    auth_preflight(call, token, preflight)
+    call('GET', f'/warehouses/{WAREHOUSE_ID}/products', token=token)
+
+
+def action_movement(call, token, preflight):
+    # ProductMovementDialog.load_products/save_movement + WarehouseView.load_products
+    if not preflight:
+        # Товары выбираются из таблицы, остаток приходит в ответе на движение
+        call('POST', f'/warehouses/{WAREHOUSE_ID}/movements', token=token,
+             json={'product_id': 1, 'quantity': 1, 'movement_type': 'in', 'comment': None},
+             headers={'Idempotency-Key': str(uuid.uuid4())})
+        return
+    call('GET', f'/warehouses/{WAREHOUSE_ID}/products', token=token)
+    call('POST', f'/warehouses/{WAREHOUSE_ID}/movements', token=token,
+         json={'product_id': 1, 'quantity': 1, 'movement_type': 'in', 'comment': None})
+    reload_products(call, token, preflight)
+
+
+def action_add_product(call, token, preflight):
+    # AddProductDialog.load_product_types/save_product + WarehouseView.load_products
+    if not preflight:
+        # Категории из кэша ProductTypeCatalog, созданный товар - из ответа
+        call('POST', f'/warehouses/{WAREHOUSE_ID}/products', token=token,
+             json={'product_type_id': 1, 'name': 'Новый товар', 'quantity': 1})
+        return
+    call('GET', '/product-types', token=token)
+    call('POST', f'/warehouses/{WAREHOUSE_ID}/products', token=token,
+         json={'product_type_id': 1, 'name': 'Новый товар', 'quantity': 1})
+    reload_products(call, token, preflight)
+
+
+ACTIONS = [
+    ('Восстановление сессии', action_restore_session),
+    ('Открытие склада', action_open_warehouse),
+    ('Движение товара', action_movement),
+    ('Добавление товара', action_add_product),
+]
+
+TRANSPORTS = [
+    ('legacy', legacy_transport, True),
+    ('pooled', pooled_transport, True),
+    ('session', session_transport, False),
+]
+
+
+def run(latency: float, products: int, repeat: int):
+    server = StandInServer(latency=latency, products_per_warehouse=products).start()
+    token = server.state.issue_tokens(EMAIL)['access_token']
+    rows = []
+    try:
+        for transport_name, make_transport, preflight in TRANSPORTS:
+            call = make_transport(server)
+            # Прогрев: в pooled-режиме соединение открывается один раз
+            call('GET', '/test-auth', token=token)
+            if hasattr(call, 'products_cursor'):
+                # Таблица склада уже загружена, дальше - только изменения
+                call.products_cursor.refresh(call, token)
+            for action_name, action in ACTIONS:
+                server.stats.reset()
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    action(call, token, preflight)
+                elapsed = (time.perf_counter() - started) / repeat
+                rows.append((action_name, transport_name,
+                             server.stats.total_requests / repeat,
+                             server.stats.connections / repeat,
+                             server.stats.bytes_sent / repeat,
+                             elapsed * 1000))
+    finally:
+        server.stop()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Задержка ответа сервера-заглушки, секунды')
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f'{"Действие":<24}{"Режим":<10}{"Запросов":>10}{"Соединений":>12}{"Байт":>12}{"мс":>10}')
+    for action_name, transport_name, total, connections, sent, ms in run(
+            args.latency, args.products, args.repeat):
+        print(f'{action_name:<24}{transport_name:<10}{total:>10.1f}{connections:>12.1f}'
+              f'{sent:>12.0f}{ms:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,461 @@
+"""Локальный сервер-заглушка API склада.
+
+Реализует подмножество эндпоинтов настоящего сервера в памяти процесса
+и считает входящие запросы и TCP-соединения. Движения и созданные товары
+публикуются в поток событий склада /warehouses/{id}/events
+(Server-Sent Events). Используется бенчмарками из tools/ и для ручной
+проверки клиента без доступа к серверу:
+
+    python -m tools.stand_in_server --port 5000 --products 1000
+"""
+import argparse
+import base64
+import json
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+ACCESS_TOKEN_LIFETIME = 15 * 60
+EVENTS_KEPT = 10000      # Сколько последних событий склада доступно для продолжения потока
+EVENTS_KEEPALIVE = 15    # Пауза между комментариями-пингами в потоке событий, секунды
+
+
+def _b64(data: dict) -> str:
+    raw = json.dumps(data, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')
+
+
+class ServerStats:
+    """Счетчики запросов и соединений сервера-заглушки."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.requests = Counter()
+        self.bytes_sent = 0
+
+    def reset(self):
+        with self.lock:
+            self.connections = 0
+            self.requests.clear()
+            self.bytes_sent = 0
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+
+class StandInState:
+    """Данные сервера-заглушки: пользователи, склады, товары и токены."""
+
+    def __init__(self, products_per_warehouse: int = 100, warehouses: int = 3):
+        self.lock = threading.Lock()
+        self.access_tokens = {}
+        self.refresh_tokens = {}
+        self.product_types = [{'id': i + 1, 'category': f'Категория {i + 1}'} for i in range(10)]
+        self.warehouses = []
+        self.products = {}
+        self.versions = Counter()
+        self.request_results = {}
+        self._next_product_id = 1
+        # Поток событий: склад -> [(номер, событие)], номера сквозные для всех складов
+        self.events = defaultdict(lambda: deque(maxlen=EVENTS_KEPT))
+        self.events_changed = threading.Condition()
+        self._last_event_id = 0
+        for i in range(warehouses):
+            warehouse = {'id': i + 1, 'name': f'Склад {i + 1}'}
+            self.warehouses.append(warehouse)
+            self.products[warehouse['id']] = []
+            for _ in range(products_per_warehouse):
+                self.add_product(warehouse['id'], self._next_product_id % 10 + 1,
+                                 f'Товар {self._next_product_id}', 10)
+
+    def add_product(self, warehouse_id: int, product_type_id: int, name: str, quantity: int) -> dict:
+        category = next((t['category'] for t in self.product_types
+                         if t['id'] == product_type_id), None)
+        product = {
+            'id': self._next_product_id,
+            'product_type_id': product_type_id,
+            'category': category,
+            'name': name,
+            'current_quantity': quantity,
+            'updated_at': _now_iso(),
+        }
+        self._next_product_id += 1
+        self.products[warehouse_id].append(product)
+        self.versions[warehouse_id] += 1
+        return product
+
+    def apply_movement(self, warehouse_id: int, body: dict, idempotency_key: str = None):
+        """Проводит движение и возвращает (статус, ответ); повтор ключа отдает прежний ответ."""
+        return self._once(idempotency_key,
+                          lambda: self._apply_movement(warehouse_id, body, idempotency_key))
+
+    def create_product(self, warehouse_id: int, body: dict, idempotency_key: str = None):
+        """Создает товар и возвращает (статус, ответ); повтор ключа отдает прежний ответ."""
+        def create():
+            if warehouse_id not in self.products:
+                return 404, {'detail': 'Склад не найден'}
+            if not any(t['id'] == body.get('product_type_id') for t in self.product_types):
+                return 400, {'detail': 'Категория не найдена'}
+            product = self.add_product(warehouse_id, body.get('product_type_id'),
+                                       body.get('name'), body.get('quantity', 0))
+            self.publish(warehouse_id, {'type': 'product', 'product': dict(product)})
+            return 200, product
+        return self._once(idempotency_key, create)
+
+    def _once(self, idempotency_key, fn):
+        with self.lock:
+            if idempotency_key in self.request_results:
+                return self.request_results[idempotency_key]
+            result = fn()
+            if idempotency_key:
+                self.request_results[idempotency_key] = result
+            return result
+
+    def publish(self, warehouse_id: int, event: dict):
+        """Добавляет событие в поток склада и будит ожидающие его соединения."""
+        with self.events_changed:
+            self._last_event_id += 1
+            self.events[warehouse_id].append((self._last_event_id, event))
+            self.events_changed.notify_all()
+
+    def last_event_id(self) -> int:
+        with self.events_changed:
+            return self._last_event_id
+
+    def wait_events(self, warehouse_id: int, after: int, timeout: float) -> list:
+        """Возвращает события склада с номером больше after, ожидая их до timeout секунд."""
+        def pending():
+            return [item for item in self.events.get(warehouse_id, ()) if item[0] > after]
+        with self.events_changed:
+            events = pending()
+            if not events:
+                self.events_changed.wait(timeout)
+                events = pending()
+            return events
+
+    def _apply_movement(self, warehouse_id: int, body: dict, idempotency_key: str = None):
+        products = self.products.get(warehouse_id, [])
+        product = next((p for p in products if p['id'] == body.get('product_id')), None)
+        if product is None:
+            return 404, {'detail': 'Товар не найден'}
+        delta = body.get('quantity', 0)
+        if body.get('movement_type') == 'out':
+            if product['current_quantity'] < delta:
+                return 400, {'detail': 'Недостаточно товара'}
+            delta = -delta
+        product['current_quantity'] += delta
+        product['updated_at'] = _now_iso()
+        self.versions[warehouse_id] += 1
+        self.publish(warehouse_id, {'type': 'movement', 'product': dict(product),
+                                    'movement': dict(body, idempotency_key=idempotency_key)})
+        return 200, {'message': 'ok', 'product': dict(product)}
+
+    def etag(self, warehouse_id: int) -> str:
+        return f'"{warehouse_id}-{self.versions[warehouse_id]}"'
+
+    def issue_tokens(self, email: str, lifetime: int = ACCESS_TOKEN_LIFETIME) -> dict:
+        exp = int(time.time()) + lifetime
+        nonce = len(self.access_tokens) + len(self.refresh_tokens)
+        access = '.'.join([_b64({'alg': 'none', 'typ': 'JWT'}),
+                           _b64({'sub': email, 'exp': exp, 'n': nonce}), ''])
+        refresh = f'refresh-{email}-{nonce}'
+        with self.lock:
+            self.access_tokens[access] = (email, exp)
+            self.refresh_tokens[refresh] = email
+        return {'access_token': access, 'refresh_token': refresh, 'token_type': 'bearer'}
+
+    def user_for(self, token: str):
+        entry = self.access_tokens.get(token)
+        if entry and entry[1] > time.time():
+            return entry[0]
+        return None
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.stats.lock:
+            self.server.stats.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self) -> StandInState:
+        return self.server.state
+
+    def _count(self):
+        route = re.sub(r'/\d+', '/{id}', urlsplit(self.path).path)
+        with self.server.stats.lock:
+            self.server.stats.requests[f'{self.command} {route}'] += 1
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def _send_json(self, data, status: int = 200, headers: dict = None):
+        body = json.dumps(data, ensure_ascii=False).encode()
+        self._send_body(body, 'application/json', status, headers)
+
+    def _send_list(self, items: list, headers: dict = None):
+        """Отдает список как NDJSON, если клиент его принимает, иначе JSON-массивом."""
+        if 'application/x-ndjson' not in self.headers.get('Accept', ''):
+            return self._send_json(items, headers=headers)
+        body = ''.join(json.dumps(item, ensure_ascii=False) + '\n' for item in items).encode()
+        self._send_body(body, 'application/x-ndjson', 200, headers)
+
+    def _send_body(self, body: bytes, content_type: str, status: int, headers: dict = None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        with self.server.stats.lock:
+            self.server.stats.bytes_sent += len(body)
+        self.wfile.write(body)
+
+    def _send_events(self, warehouse_id: int):
+        """Отдает поток событий склада (text/event-stream), пока клиент не отключится.
+
+        Ответ передается частями (chunked), чтобы каждое событие доходило
+        до клиента сразу. Заголовок Last-Event-ID продолжает поток с
+        последнего полученного события, если оно еще хранится.
+        """
+        last_id = self.headers.get('Last-Event-ID', '')
+        after = int(last_id) if last_id.isdigit() else self.state.last_event_id()
+        self.close_connection = True
+        generation = self.server.streams_generation
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        try:
+            self._send_chunk(b': connected\n\n')
+            while not self.server.closing and generation == self.server.streams_generation:
+                events = self.state.wait_events(warehouse_id, after, self.server.events_keepalive)
+                if not events:
+                    self._send_chunk(b': keepalive\n\n')
+                    continue
+                after = events[-1][0]
+                self._send_chunk(''.join(
+                    f"id: {event_id}\nevent: {event['type']}\n"
+                    f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+                    for event_id, event in events).encode())
+            self.wfile.write(b'0\r\n\r\n')
+        except (ConnectionError, OSError):
+            pass
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        with self.server.stats.lock:
+            self.server.stats.bytes_sent += len(data)
+
+    def _send_not_modified(self, etag: str):
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def _user(self):
+        auth = self.headers.get('Authorization', '')
+        if not auth.startswith('Bearer '):
+            return None
+        return self.state.user_for(auth[len('Bearer '):])
+
+    def _unauthorized(self):
+        self._send_json({'detail': 'Не авторизован'}, 401)
+
+    def do_GET(self):
+        self._count()
+        url = urlsplit(self.path)
+        path, query = url.path, parse_qs(url.query)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        user = self._user()
+        if user is None:
+            return self._unauthorized()
+        if path == '/test-auth':
+            return self._send_json({'message': 'ok', 'email': user})
+        if path == '/warehouses':
+            return self._send_json(self.state.warehouses)
+        if path == '/product-types':
+            return self._send_json(self.state.product_types)
+        match = re.fullmatch(r'/warehouses/(\d+)/events', path)
+        if match and self.server.events:
+            warehouse_id = int(match.group(1))
+            if warehouse_id not in self.state.products:
+                return self._send_json({'detail': 'Склад не найден'}, 404)
+            return self._send_events(warehouse_id)
+        match = re.fullmatch(r'/warehouses/(\d+)/products', path)
+        if match:
+            warehouse_id = int(match.group(1))
+            products = self.state.products.get(warehouse_id)
+            if products is None:
+                return self._send_json({'detail': 'Склад не найден'}, 404)
+            with self.state.lock:
+                etag = self.state.etag(warehouse_id)
+                if self.headers.get('If-None-Match') == etag:
+                    return self._send_not_modified(etag)
+                since = query.get('updated_since', [None])[0]
+                if since:
+                    products = [p for p in products if p['updated_at'] >= since]
+                else:
+                    products = list(products)
+            return self._send_list(products, headers={'ETag': etag})
+        self._send_json({'detail': 'Not Found'}, 404)
+
+    def do_POST(self):
+        self._count()
+        path = urlsplit(self.path).path
+        body = self._read_json()
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if path in ('/login', '/register'):
+            return self._send_json({'message': 'Код для входа отправлен на ваш email'})
+        if path == '/verify':
+            return self._send_json(self.state.issue_tokens(body.get('email', '')))
+        if path == '/refresh-token':
+            with self.state.lock:
+                email = self.state.refresh_tokens.pop(body.get('current_refresh_token'), None)
+            if email is None:
+                return self._send_json({'detail': 'Недействительный refresh token'}, 401)
+            return self._send_json(self.state.issue_tokens(email))
+
+        user = self._user()
+        if user is None:
+            return self._unauthorized()
+        if path == '/logout':
+            return self._send_json({'message': 'ok'})
+        if path == '/warehouses':
+            with self.state.lock:
+                warehouse = {'id': len(self.state.warehouses) + 1, 'name': body.get('name')}
+                self.state.warehouses.append(warehouse)
+                self.state.products[warehouse['id']] = []
+            return self._send_json(warehouse)
+        if path == '/product-types':
+            with self.state.lock:
+                product_type = {'id': len(self.state.product_types) + 1,
+                                'category': body.get('category')}
+                self.state.product_types.append(product_type)
+            return self._send_json(product_type)
+        match = re.fullmatch(r'/warehouses/(\d+)/products', path)
+        if match:
+            status, data = self.state.create_product(
+                int(match.group(1)), body, self.headers.get('Idempotency-Key'))
+            return self._send_json(data, status)
+        match = re.fullmatch(r'/warehouses/(\d+)/products/batch', path)
+        if match and self.server.batch_products:
+            results = []
+            for product in body.get('products', []):
+                status, data = self.state.create_product(
+                    int(match.group(1)), product, product.get('idempotency_key'))
+                results.append(dict(data, status=status))
+            return self._send_json({'results': results})
+        match = re.fullmatch(r'/warehouses/(\d+)/movements', path)
+        if match:
+            status, data = self.state.apply_movement(
+                int(match.group(1)), body, self.headers.get('Idempotency-Key'))
+            return self._send_json(data, status)
+        match = re.fullmatch(r'/warehouses/(\d+)/movements/batch', path)
+        if match and self.server.batch_movements:
+            results = []
+            for movement in body.get('movements', []):
+                status, data = self.state.apply_movement(
+                    int(match.group(1)), movement, movement.get('idempotency_key'))
+                results.append(dict(data, status=status))
+            return self._send_json({'results': results})
+        self._send_json({'detail': 'Not Found'}, 404)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, latency: float = 0.0, batch_movements: bool = True,
+                 batch_products: bool = True, events: bool = True,
+                 events_keepalive: float = EVENTS_KEEPALIVE, **state_kwargs):
+        super().__init__(('127.0.0.1', port), StandInHandler)
+        self.state = StandInState(**state_kwargs)
+        self.stats = ServerStats()
+        self.latency = latency
+        self.batch_movements = batch_movements
+        self.batch_products = batch_products
+        self.events = events
+        self.events_keepalive = events_keepalive
+        self.closing = False
+        self.streams_generation = 0
+        self._thread = None
+
+    def handle_error(self, request, client_address):
+        # Клиент закрыл соединение, не дочитав ответ (например, отменил загрузку)
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'StandInServer':
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def drop_streams(self):
+        """Завершает открытые потоки событий, как при обрыве связи; новые подключения принимаются."""
+        self.streams_generation += 1
+        with self.state.events_changed:
+            self.state.events_changed.notify_all()
+
+    def stop(self):
+        # Открытые потоки событий завершаются на ближайшем пробуждении
+        self.closing = True
+        with self.state.events_changed:
+            self.state.events_changed.notify_all()
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Сервер-заглушка API склада')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--products', type=int, default=100,
+                        help='Количество товаров на каждом складе')
+    parser.add_argument('--warehouses', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Искусственная задержка ответа, секунды')
+    parser.add_argument('--no-events', action='store_true',
+                        help='Не поддерживать /warehouses/{id}/events (клиент перейдет на опрос)')
+    args = parser.parse_args()
+
+    server = StandInServer(args.port, args.latency, events=not args.no_events,
+                           products_per_warehouse=args.products, warehouses=args.warehouses)
+    print(f'Сервер-заглушка запущен на {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()